@@ -0,0 +1,141 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from typing import Any, Dict, List, Optional, Tuple
+
+# Ensure src is in path
+sys.path.append(os.getcwd())
+
+DEFAULT_SYMBOLS = ["NIFTY", "BANKNIFTY", "FINNIFTY", "MIDCPNIFTY"]
+# Scans in flight at once; LLM calls are further limited by LLM_MAX_CONCURRENCY
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", 8))
+
+
+def resolve_pairs(symbols: List[str], expiries: List[str] = None, per_symbol: int = 3) -> List[Tuple[str, str]]:
+    """(underlying, expiry) pairs: the given expiries for every symbol, else each symbol's next `per_symbol`."""
+    from src.integration.option_chain_client import get_available_expiry_dates
+    pairs = []
+    for symbol in symbols:
+        for expiry in expiries or get_available_expiry_dates(symbol)[:per_symbol]:
+            pairs.append((symbol, expiry))
+    return pairs
+
+
+async def prefetch(symbols: List[str]) -> Dict[str, Any]:
+    """
+    Fetches everything that does not depend on the expiry once for the whole batch:
+    spot and VIX quotes, lot sizes and strategy rules land in their module caches,
+    and the market research is returned to be passed to every scan.
+    """
+    from src.integration.option_chain_client import fetch_last_close, INDEX_TICKERS, VIX_TICKER
+    from src.quant_engine.option_chain_builder import get_lot_size
+    from src.knowledge.vector_store import query_strategy_rules_batch, PRECOMPUTED_TOPICS
+    from src.agents.market_researcher import aperform_market_research
+    from src.integration.llm_client import collect_llm_failures
+
+    print(f"--- [Batch] Prefetching quotes, lot sizes, rules and research for {', '.join(symbols)} ---")
+    blocking = [asyncio.to_thread(fetch_last_close, INDEX_TICKERS.get(symbol, "^NSEI")) for symbol in symbols]
+    blocking.append(asyncio.to_thread(fetch_last_close, VIX_TICKER))
+    blocking += [asyncio.to_thread(get_lot_size, symbol) for symbol in symbols]
+    blocking.append(asyncio.to_thread(query_strategy_rules_batch, PRECOMPUTED_TOPICS))
+    with collect_llm_failures() as failures:
+        results = await asyncio.gather(aperform_market_research({}), *blocking, return_exceptions=True)
+    research = results[0]
+    for result in results[1:]:
+        if isinstance(result, Exception):
+            # The scans fetch it again and report the failure per pair
+            print(f"⚠️ [Batch] Prefetch failed: {result}")
+    if isinstance(research, Exception) or failures:
+        # Degraded research is not shared; each scan runs its own researcher
+        print(f"⚠️ [Batch] Shared research unavailable: {failures[0] if failures else research}")
+        return {}
+    return {"shared_research": research["research_data"]}
+
+
+async def run_batch(pairs: List[Tuple[str, str]], concurrency: int = BATCH_CONCURRENCY,
+                    strategy: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Runs the graph once per (underlying, expiry) pair, `concurrency` at a time.
+    Returns:
+        {pairs, wall_s, prefetch_s, candidates (ranked), errors: {"SYMBOL EXPIRY": message}}
+    """
+    from main_graph import app
+    from src.integration.graph_checkpoints import run_config
+    from src.quant_engine.candidates import rank_candidates
+
+    start = time.perf_counter()
+    shared = await prefetch(sorted({symbol for symbol, _ in pairs}))
+    prefetch_s = time.perf_counter() - start
+
+    semaphore = asyncio.Semaphore(concurrency)
+    results, errors = [], {}
+
+    async def scan(symbol: str, expiry: str):
+        state = {"symbol": symbol, "user_selected_expiry": expiry, **shared}
+        if strategy:
+            state["user_selected_strategy"] = strategy
+        async with semaphore:
+            try:
+                results.append(await app.ainvoke(state, run_config()))
+            except Exception as e:
+                print(f"❌ [Batch] {symbol} {expiry} failed: {e}")
+                errors[f"{symbol} {expiry}"] = str(e)
+
+    await asyncio.gather(*(scan(symbol, expiry) for symbol, expiry in pairs))
+    return {
+        "pairs": len(pairs),
+        "wall_s": time.perf_counter() - start,
+        "prefetch_s": prefetch_s,
+        "candidates": rank_candidates(results),
+        "errors": errors,
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    print(f"pairs={report['pairs']} wall={report['wall_s']:.2f}s prefetch={report['prefetch_s']:.2f}s "
+          f"errors={len(report['errors'])}")
+    print(f"{'#':>3} {'symbol':<11} {'expiry':<12} {'dte':>4} {'strategy':<15} {'risk':<12} "
+          f"{'credit':>10} {'margin':>11} {'RoM %':>7} {'ann. %':>8}")
+
+    def number(value, fmt):
+        return format(value, fmt) if value is not None else "-"
+
+    for c in report["candidates"]:
+        rom = c["return_on_margin"] * 100 if c["return_on_margin"] is not None else None
+        annualized = c["annualized_return"] * 100 if c["annualized_return"] is not None else None
+        flag = " (degraded)" if c["degraded"] else ""
+        print(f"{c['rank']:>3} {c['symbol'] or '-':<11} {c['expiry'] or '-':<12} {number(c['dte'], '>4')} "
+              f"{c['strategy'] or '-':<15} {c['risk_status'] or '-':<12} {number(c['net_credit'], '>10,.0f')} "
+              f"{number(c['margin_estimate'], '>11,.0f')} {number(rom, '>7.2f')} {number(annualized, '>8.1f')}{flag}")
+    for pair, message in report["errors"].items():
+        print(f"  {pair}: {message}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scan several underlyings and expiries and rank the trade candidates")
+    parser.add_argument("--symbols", nargs="+", default=DEFAULT_SYMBOLS)
+    parser.add_argument("--expiries", nargs="+", help="DD-MMM-YYYY expiries for every symbol (default: the next --per-symbol)")
+    parser.add_argument("--per-symbol", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY)
+    parser.add_argument("--strategy", help="Force a strategy for every scan instead of the strategist's pick")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    from src.observability.tracing import export_run
+    from src.integration.llm_client import run_async
+    pairs = resolve_pairs([s.upper() for s in args.symbols], args.expiries, args.per_symbol)
+    report = run_async(run_batch(pairs, args.concurrency, args.strategy))
+    trace_path = export_run(time.strftime("batch-%Y%m%d-%H%M%S"))
+    if trace_path:
+        report["trace"] = trace_path
+    if args.json:
+        print("\n\n__JSON_START__")
+        print(json.dumps(report, indent=2, default=str))
+        print("__JSON_END__")
+    else:
+        print_report(report)
+        if trace_path:
+            print(f"trace: {trace_path}")
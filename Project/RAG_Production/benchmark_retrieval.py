@@ -0,0 +1,174 @@
+import re
+import sys
+import json
+import time
+import os
+import argparse
+import resource
+import subprocess
+import tempfile
+
+import numpy as np
+
+# Ensure src is in path
+sys.path.append(os.getcwd())
+
+# Keyword-heavy queries against the bundled PDFs in data/.
+# A hit is any returned chunk matching the expected pattern.
+QUERIES = [
+    ("VIX", r"\bVIX\b"),
+    ("CBOE Volatility Index VIX", r"\bVIX\b"),
+    ("delta moved from 0.15 to 0.20 gamma", r"0\.15.*0\.20|gamma"),
+    ("STRATEGY 13. SHORT STRANGLE", r"short strangle"),
+    ("Short Strangle", r"short strangle"),
+    ("bear put spread", r"bear put spread"),
+    ("write naked puts", r"naked puts?"),
+    ("stop loss", r"stop.loss"),
+    ("margin requirement covered call", r"margin requirement"),
+    ("calendar spread", r"calendar spread"),
+    ("early exercise", r"early exercise"),
+    ("S&P 500 implied volatilities", r"implied volatilit"),
+]
+
+# Natural-language option-strategy questions: (question, source PDF, expected chunk pattern).
+# A retrieved chunk is relevant when it comes from the expected source PDF (a substring
+# of the file name) and matches the pattern; QUERIES have no source and score by pattern only.
+QUESTIONS = [
+    ("When should I use a long straddle?", "Option-Strategies", r"long straddle"),
+    ("What is the risk of selling a short straddle?", "Option-Strategies", r"short straddle"),
+    ("How does a bull call spread make money?", "Option-Strategies", r"bull call spread"),
+    ("What is the breakeven of a strategy?", "Option-Strategies", r"breakeven"),
+    ("How does a butterfly spread work?", "Option-Strategies", r"butterfly"),
+    ("How do I protect a stock position with a collar?", "Basic of option guide", r"collar"),
+    ("What is a protective put?", "Basic of option guide", r"protective put"),
+    ("How does writing a covered call generate income?", "Basic of option guide", r"covered call"),
+    ("How does time decay affect option sellers?", "Robert_Ward", r"time decay|theta"),
+    ("What is a ratio spread?", "Robert_Ward", r"ratio spread"),
+    ("How much margin does selling options require?", "dokumen.pub", r"margin"),
+    ("How do I manage a short strangle when the market moves?", "dokumen.pub", r"strangle"),
+] + [(query, "", pattern) for query, pattern in QUERIES]
+
+MODES = ["vector", "keyword", "hybrid"]
+
+def evaluate(k: int = 3, modes: list = None, questions: list = None) -> dict:
+    """
+    Scores the current knowledge base (uncached retrieval).
+    Returns:
+        {mode: {recall, mrr, p50_ms, p99_ms}}
+    """
+    from src.knowledge.vector_store import search_chunks, chunk_sources
+
+    questions = questions or QUESTIONS
+    sources = chunk_sources()
+    report = {}
+    for mode in modes or MODES:
+        hits = 0
+        reciprocal_ranks = []
+        latencies = []
+        for question, source, pattern in questions:
+            start = time.perf_counter()
+            chunks = search_chunks([question], k=k, mode=mode)[question]
+            latencies.append((time.perf_counter() - start) * 1000)
+            rank = next((i + 1 for i, (chunk_id, chunk) in enumerate(chunks)
+                         if source.lower() in sources.get(chunk_id, "").lower()
+                         and re.search(pattern, chunk, re.IGNORECASE | re.DOTALL)), None)
+            hits += rank is not None
+            reciprocal_ranks.append(1 / rank if rank else 0.0)
+        report[mode] = {
+            "recall": hits / len(questions),
+            "mrr": float(np.mean(reciprocal_ranks)),
+            "p50_ms": float(np.percentile(latencies, 50)),
+            "p99_ms": float(np.percentile(latencies, 99)),
+        }
+    return report
+
+def run(k: int = 3):
+    """Quick comparison of the retrieval modes on the existing index."""
+    print(f"{'mode':<8} {'recall@' + str(k):>9} {'mrr':>6} {'p50 ms':>8} {'p99 ms':>8}")
+    for mode, stats in evaluate(k).items():
+        print(f"{mode:<8} {stats['recall']:>9.2f} {stats['mrr']:>6.2f} {stats['p50_ms']:>8.1f} {stats['p99_ms']:>8.1f}")
+
+def _dir_size_mb(path: str) -> float:
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+    return total / 1e6
+
+def _worker(chunk_size: int, ks: list):
+    """Runs inside a scratch directory: builds the index, evaluates, prints one JSON line."""
+    from src.knowledge.vector_store import ingest_documents, DB_DIR
+
+    start = time.perf_counter()
+    ingest_documents(chunk_size=chunk_size, chunk_overlap=chunk_size // 5)
+    build_seconds = time.perf_counter() - start
+
+    results = {str(k): evaluate(k) for k in ks}
+    print("__BENCH__" + json.dumps({
+        "build_s": build_seconds,
+        "index_mb": _dir_size_mb(DB_DIR),
+        # ru_maxrss is in KB on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "results": results,
+    }))
+
+def run_config(chunk_size: int, backend: str, ks: list, vector_backend: str = "chroma") -> dict:
+    """
+    Builds a fresh index for one (chunk size, embedding backend, vector backend) configuration in a
+    scratch directory (the real index and embedding cache are untouched)
+    and evaluates it for every k. Runs in a subprocess so memory is per config.
+    """
+    project_dir = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="rag-bench-") as scratch:
+        # data/ for ingestion, models/ for the default (cwd-relative) EMBEDDING_MODEL_PATH
+        for name in ('data', 'models'):
+            if os.path.exists(os.path.join(project_dir, name)):
+                os.symlink(os.path.join(project_dir, name), os.path.join(scratch, name))
+        env = dict(os.environ, EMBEDDING_BACKEND=backend, VECTOR_BACKEND=vector_backend,
+                   HF_HUB_OFFLINE="1", TRANSFORMERS_OFFLINE="1",
+                   PYTHONPATH=project_dir)
+        proc = subprocess.run(
+            [sys.executable, os.path.join(project_dir, 'benchmark_retrieval.py'),
+             "--worker", str(chunk_size), ",".join(map(str, ks))],
+            cwd=scratch, env=env, capture_output=True, text=True
+        )
+    for line in proc.stdout.splitlines():
+        if line.startswith("__BENCH__"):
+            return json.loads(line[len("__BENCH__"):])
+    raise RuntimeError(f"Benchmark worker failed for chunk_size={chunk_size} backend={backend} "
+                       f"vector_backend={vector_backend}:\n{proc.stderr[-2000:]}")
+
+def run_matrix(chunk_sizes: list, backends: list, ks: list, vector_backends: list = None):
+    print(f"{'store':<7} {'backend':<10} {'chunk':>6} {'k':>3} {'mode':<8} {'recall':>7} {'mrr':>6} "
+          f"{'p50 ms':>8} {'p99 ms':>8} {'build s':>8} {'index MB':>9} {'rss MB':>7}")
+    for vector_backend in vector_backends or ["chroma"]:
+        for backend in backends:
+            for chunk_size in chunk_sizes:
+                result = run_config(chunk_size, backend, ks, vector_backend)
+                for k, by_mode in result["results"].items():
+                    for mode, stats in by_mode.items():
+                        print(f"{vector_backend:<7} {backend:<10} {chunk_size:>6} {k:>3} {mode:<8} {stats['recall']:>7.2f} "
+                              f"{stats['mrr']:>6.2f} {stats['p50_ms']:>8.1f} {stats['p99_ms']:>8.1f} "
+                              f"{result['build_s']:>8.1f} {result['index_mb']:>9.1f} {result['peak_rss_mb']:>7.0f}")
+
+if __name__ == "__main__":
+    if len(sys.argv) == 4 and sys.argv[1] == "--worker":
+        _worker(int(sys.argv[2]), [int(k) for k in sys.argv[3].split(",")])
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser(description="Offline retrieval quality/latency benchmark")
+    parser.add_argument("--matrix", action="store_true",
+                        help="Rebuild the index per configuration instead of using the existing one")
+    parser.add_argument("--k", default="3", help="Comma separated k values")
+    parser.add_argument("--chunk-sizes", default="1000", help="Comma separated chunk sizes (matrix mode)")
+    parser.add_argument("--backends", default="minilm", help="Comma separated embedding backends (matrix mode)")
+    parser.add_argument("--vector-backends", default="chroma",
+                        help="Comma separated vector backends, e.g. chroma,qdrant (matrix mode)")
+    args = parser.parse_args()
+
+    ks = [int(k) for k in args.k.split(",")]
+    if args.matrix:
+        run_matrix([int(c) for c in args.chunk_sizes.split(",")], args.backends.split(","), ks,
+                   args.vector_backends.split(","))
+    else:
+        for k in ks:
+            run(k)
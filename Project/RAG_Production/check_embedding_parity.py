@@ -0,0 +1,64 @@
+import sys
+import time
+import os
+
+import numpy as np
+
+# Ensure src is in path
+sys.path.append(os.getcwd())
+
+from pypdf import PdfReader
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from src.knowledge.embeddings import get_embedding_backend
+from benchmark_retrieval import QUERIES
+
+# Compares the quantized ONNX backend against the reference MiniLM model on
+# chunks from the bundled PDFs. Run after exporting the model:
+#   python -m src.knowledge.embeddings export models/all-MiniLM-L6-v2-onnx
+#   python check_embedding_parity.py
+SAMPLE_PAGES = 40
+MIN_COSINE = 0.98
+MIN_TOPK_OVERLAP = 0.8
+
+def load_sample_chunks() -> list:
+    splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+    chunks = []
+    data_dir = os.path.join(os.getcwd(), 'data')
+    for file in sorted(os.listdir(data_dir)):
+        if file.endswith(".pdf"):
+            for page in PdfReader(os.path.join(data_dir, file)).pages[:SAMPLE_PAGES]:
+                chunks.extend(splitter.split_text(page.extract_text() or ""))
+    return chunks
+
+def embed(backend: str, texts: list, queries: list):
+    embeddings, model_id = get_embedding_backend(backend)
+    start = time.perf_counter()
+    docs = np.array(embeddings.embed_documents(texts))
+    seconds = time.perf_counter() - start
+    return model_id, docs, np.array(embeddings.embed_documents(queries)), seconds
+
+def run(k: int = 3) -> bool:
+    chunks = load_sample_chunks()
+    queries = [query for query, _ in QUERIES]
+    print(f"Embedding {len(chunks)} chunks and {len(queries)} queries with both backends...")
+
+    ref_id, ref_docs, ref_queries, ref_seconds = embed("minilm", chunks, queries)
+    new_id, new_docs, new_queries, new_seconds = embed("onnx-int8", chunks, queries)
+
+    # Both backends return L2-normalized vectors, so dot product = cosine
+    cosines = np.sum(ref_docs * new_docs, axis=1)
+    ref_top = np.argsort(-ref_queries @ ref_docs.T, axis=1)[:, :k]
+    new_top = np.argsort(-new_queries @ new_docs.T, axis=1)[:, :k]
+    overlap = np.mean([len(set(a) & set(b)) / k for a, b in zip(ref_top, new_top)])
+
+    print(f"{ref_id}: {ref_seconds:.1f}s | {new_id}: {new_seconds:.1f}s "
+          f"({ref_seconds / max(new_seconds, 1e-9):.1f}x)")
+    print(f"Cosine similarity: mean={cosines.mean():.4f} min={cosines.min():.4f}")
+    print(f"Top-{k} overlap: {overlap:.2f}")
+
+    ok = cosines.mean() >= MIN_COSINE and overlap >= MIN_TOPK_OVERLAP
+    print("✅ Parity OK" if ok else "❌ Parity check failed")
+    return ok
+
+if __name__ == "__main__":
+    sys.exit(0 if run() else 1)
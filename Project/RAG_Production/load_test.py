@@ -0,0 +1,165 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import contextlib
+from collections import defaultdict
+
+import numpy as np
+
+# Ensure src is in path
+sys.path.append(os.getcwd())
+
+AGENTS = ["market_researcher", "position_monitor", "strategist", "risk_manager"]
+
+
+def configure_offline(llm_url: str, cache: bool):
+    """Points every external dependency at the offline stand-ins (before the graph is imported)."""
+    os.environ["OFFLINE_MODE"] = "1"
+    os.environ["OPENAI_API_KEY"] = os.environ["GROQ_API_KEY"] = "offline"
+    os.environ["OPENAI_BASE_URL"] = os.environ["GROQ_BASE_URL"] = llm_url
+    if not cache:
+        # Every run must reach the LLM endpoint
+        os.environ["LLM_CACHE_DIR"] = ""
+        os.environ["NODE_CACHE"] = "0"
+        for agent in AGENTS:
+            os.environ[f"LLM_CACHE_TTL_{agent.upper()}"] = "0"
+
+
+def make_node_timer():
+    """LangChain callback that records the wall time of every graph node run."""
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class NodeTimer(BaseCallbackHandler):
+        def __init__(self):
+            self.started = {}
+            self.durations = defaultdict(list)
+
+        def on_chain_start(self, serialized, inputs, *, run_id, metadata=None, **kwargs):
+            node = (metadata or {}).get("langgraph_node")
+            if node and kwargs.get("name") == node:
+                self.started[run_id] = (node, time.perf_counter())
+
+        def on_chain_end(self, outputs, *, run_id, **kwargs):
+            if run_id in self.started:
+                node, start = self.started.pop(run_id)
+                self.durations[node].append((time.perf_counter() - start) * 1000)
+
+        def on_chain_error(self, error, *, run_id, **kwargs):
+            self.started.pop(run_id, None)
+
+    return NodeTimer()
+
+
+async def drive(app, runs: int, concurrency: int, timer) -> dict:
+    from src.integration.graph_checkpoints import run_config
+    semaphore = asyncio.Semaphore(concurrency)
+    totals, errors = [], []
+
+    async def one_run():
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await app.ainvoke({}, config=run_config(callbacks=[timer]))
+                totals.append((time.perf_counter() - start) * 1000)
+            except Exception as e:
+                errors.append(str(e))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_run() for _ in range(runs)))
+    return {"wall_s": time.perf_counter() - start, "totals": totals, "errors": errors}
+
+
+def _stats(samples: list) -> dict:
+    return {
+        "n": len(samples),
+        "mean_ms": float(np.mean(samples)),
+        "p50_ms": float(np.percentile(samples, 50)),
+        "p95_ms": float(np.percentile(samples, 95)),
+        "p99_ms": float(np.percentile(samples, 99)),
+    }
+
+
+def run_load(runs: int, concurrency: int, llm_url: str = None, latency: str = "lognormal:900,0.4",
+             groq_latency: str = "lognormal:300,0.4", cache: bool = False, verbose: bool = False) -> dict:
+    """
+    Runs `runs` graph invocations, `concurrency` at a time, fully offline.
+    Returns:
+        {runs, concurrency, errors, throughput_rps, graph: stats, nodes: {node: stats}}
+    """
+    os.environ["OFFLINE_MODE"] = "1"  # Read by the clients at import
+    server = None
+    if not llm_url:
+        from src.integration.offline import start_llm_server
+        server = start_llm_server(0, latency, groq_latency)
+        llm_url = f"http://127.0.0.1:{server.server_port}/v1"
+    configure_offline(llm_url, cache)
+
+    # Agents print a lot; keep the report readable unless asked
+    quiet = open(os.devnull, "w") if not verbose else None
+    if quiet:
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+    with contextlib.redirect_stdout(quiet) if quiet else contextlib.nullcontext():
+        from main_graph import app
+        from src.observability.tracing import export_run
+        from src.integration.llm_client import run_async
+        timer = make_node_timer()
+        result = run_async(drive(app, runs, concurrency, timer))
+        trace_path = export_run(time.strftime("load-%Y%m%d-%H%M%S"))
+    if quiet:
+        quiet.close()
+    if server:
+        server.shutdown()
+
+    report = {
+        "runs": runs,
+        "concurrency": concurrency,
+        "errors": len(result["errors"]),
+        "throughput_rps": len(result["totals"]) / result["wall_s"],
+        "graph": _stats(result["totals"]) if result["totals"] else {},
+        "nodes": {node: _stats(samples) for node, samples in timer.durations.items()},
+    }
+    if trace_path:
+        report["trace"] = trace_path
+    if result["errors"]:
+        report["first_error"] = result["errors"][0]
+    return report
+
+
+def print_report(report: dict):
+    print(f"runs={report['runs']} concurrency={report['concurrency']} errors={report['errors']} "
+          f"throughput={report['throughput_rps']:.2f} runs/s")
+    if report.get("first_error"):
+        print(f"first error: {report['first_error']}")
+    if report.get("trace"):
+        print(f"trace: {report['trace']}")
+    print(f"{'node':<18} {'n':>5} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    rows = sorted(report["nodes"].items(), key=lambda item: -item[1]["p50_ms"])
+    if report["graph"]:
+        rows.append(("graph (total)", report["graph"]))
+    for node, stats in rows:
+        print(f"{node:<18} {stats['n']:>5} {stats['mean_ms']:>9.1f} {stats['p50_ms']:>9.1f} "
+              f"{stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline load test of the agent graph")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--llm-url", help="Use a running stand-in (python -m src.integration.offline) instead of an in-process one")
+    parser.add_argument("--latency", default="lognormal:900,0.4", help="OpenAI-model latency spec (ms)")
+    parser.add_argument("--groq-latency", default="lognormal:300,0.4", help="Llama/Groq-model latency spec (ms)")
+    parser.add_argument("--cache", action="store_true", help="Keep the LLM response cache enabled")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    parser.add_argument("--verbose", action="store_true", help="Show agent output")
+    args = parser.parse_args()
+
+    report = run_load(args.runs, args.concurrency, args.llm_url, args.latency, args.groq_latency,
+                      args.cache, args.verbose)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
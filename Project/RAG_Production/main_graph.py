@@ -1,47 +1,55 @@
-from typing import TypedDict, Dict, Any
-from langgraph.graph import StateGraph, END
+from typing import Annotated, TypedDict, Dict, Any
+from langgraph.graph import StateGraph, START, END
+from langchain_core.runnables import RunnableLambda
 from dotenv import load_dotenv
 
 load_dotenv()
 
-from src.quant_engine.market_data import get_current_market_data
-from src.agents.strategist import analyze_strategy
+from src.quant_engine.market_data import get_current_market_data, market_changes
+from src.agents.strategist import analyze_strategy, aanalyze_strategy
 from src.agents.executor import execute_order
-from src.agents.risk_manager import validate_order
-from src.agents.market_researcher import perform_market_research
-from src.agents.position_monitor import monitor_positions
-from src.integration.yfinance_client import fetch_nifty_spot, fetch_india_vix
+from src.agents.risk_manager import validate_order, avalidate_order
+from src.agents.market_researcher import perform_market_research, aperform_market_research, fetch_raw_research
+from src.agents.position_monitor import monitor_positions, amonitor_positions
 from src.quant_engine.option_chain_builder import get_expiry_date
+from src.knowledge.vector_store import warm_up as warm_up_vector_store
+from src.integration.llm_client import get_llm_cache_stats, get_hedge_stats, add_stream_listener, run_async
+from src.observability.tracing import traced, export_run, summary as trace_summary
+from src.observability.profiling import profiled, profile_run, run_in_thread
+from src.integration.graph_checkpoints import (
+    open_checkpointer, open_node_cache, node_cache_policy, merge_by_node, reports_degraded, skip_unchanged,
+    run_config, aresume, arerun_with_override
+)
+import sys
+import time
 from datetime import datetime
 
 # Define the State
 class AgentState(TypedDict):
+    symbol: str # Underlying index, defaults to NIFTY
+    user_selected_expiry: str # DD-MMM-YYYY, defaults to the nearest expiry
     market_data: Dict[str, Any]
+    raw_research: str # Headlines the researcher summarizes
     research_data: str # New field for web search
+    shared_research: str # Research computed once for a batch of scans
     strategy_decision: Dict[str, Any]
     final_order: Dict[str, Any]
     risk_status: str # New field for risk approval
     adjustment_needed: bool # New field for monitor
     user_selected_strategy: str # New field for manual override
     error: str
+    degraded: Annotated[Dict[str, str], merge_by_node] # Nodes that fell back after an LLM failure
+    scan_cycle: int # Set by the scheduler so every cycle rescans
+    input_keys: Annotated[Dict[str, str], merge_by_node] # Hash of each node's inputs at its last run (skip_unchanged)
 
 # Define Nodes
 # 1. Start Node: Market Scanner
 # 1. Start Node: Market Scanner
+@traced("market_scanner", cat="node")
+@profiled("market_scanner")
 def market_scanner(state: Dict[str, Any]) -> Dict[str, Any]:
-    print("--- [Market Scanner] Checking Market Conditions ---")
-    
-    # Try fetching real spot & VIX
-    real_spot = fetch_nifty_spot()
-    real_vix = fetch_india_vix()
-    
-    spot = real_spot
-    iv = real_vix
-    
-    if not real_spot or not real_vix:
-        raise Exception("Failed to fetch NIFTY Spot or India VIX from YFinance.")
-
-    print(f"Fetched Data: Spot={spot}, IV={iv} (VIX)")
+    symbol = state.get("symbol") or "NIFTY"
+    print(f"--- [Market Scanner] Checking Market Conditions ({symbol}) ---")
     
     # Get user selected expiry if any
     selected_expiry = state.get("user_selected_expiry")
@@ -56,10 +64,16 @@ def market_scanner(state: Dict[str, Any]) -> Dict[str, Any]:
     try:
         from src.integration.option_chain_client import fetch_option_chain
         # Pass the selected expiry (DD-MMM-YYYY format as string from frontend)
-        chain_dict = fetch_option_chain(symbol="NIFTY", expiry_date_str=selected_expiry)
+        # Spot and VIX come from the same (cached) quotes the chain was derived from
+        chain_dict = fetch_option_chain(symbol=symbol, expiry_date_str=selected_expiry)
         
         if chain_dict.get("error"):
             raise Exception(chain_dict["error"])
+        spot = chain_dict.get("spot_price")
+        iv = chain_dict.get("vix")
+        if not spot or not iv:
+            raise Exception(f"Failed to fetch {symbol} Spot or India VIX from YFinance.")
+        print(f"Fetched Data: Spot={spot}, IV={iv} (VIX)")
 
         # Convert dictionary format to DataFrame for compatibility
         if chain_dict and 'chain' in chain_dict and len(chain_dict['chain']) > 0:
@@ -87,9 +101,9 @@ def market_scanner(state: Dict[str, Any]) -> Dict[str, Any]:
     
     # Use only real data (no fallbacks)
     market_data = {
-        "symbol": "NIFTY",
-        "spot_price": real_spot,
-        "iv": real_vix,
+        "symbol": symbol,
+        "spot_price": spot,
+        "iv": iv,
         "days_to_expiry": days_to_expiry,
         "expiry_date": expiry_date,
         "option_chain": chain_data,
@@ -97,17 +111,70 @@ def market_scanner(state: Dict[str, Any]) -> Dict[str, Any]:
     }
     
     print(f"Market Data fetched: Spot={spot}, IV={market_data['iv']}, DTE={market_data['days_to_expiry']}")
+    # On a thread that already holds a scan, small moves keep that snapshot so the
+    # nodes downstream see unchanged inputs
+    changes = market_changes(state.get("market_data"), market_data)
+    if not changes:
+        print("--- [Market Scanner] No material change since the last scan ---")
+        return {}
+    print(f"--- [Market Scanner] Changed: {', '.join(changes)} ---")
     return {"market_data": market_data}
 
+@traced("news_fetcher", cat="node")
+@profiled("news_fetcher")
+def news_node(state: AgentState) -> AgentState:
+    if state.get("shared_research"):
+        return {}
+    return {"raw_research": fetch_raw_research()}
+
+@traced("news_fetcher", cat="node")
+@profiled("news_fetcher")
+async def anews_node(state: AgentState) -> AgentState:
+    if state.get("shared_research"):
+        return {}
+    return {"raw_research": await run_in_thread(fetch_raw_research)}
+
+@traced("market_researcher", cat="node")
+@skip_unchanged("market_researcher")
+@reports_degraded("market_researcher")
+@profiled("market_researcher")
 def researcher_node(state: AgentState) -> AgentState:
+    if state.get("shared_research"):
+        return {"research_data": state["shared_research"]}
     result = perform_market_research(state)
     return {"research_data": result["research_data"]}
 
+@traced("market_researcher", cat="node")
+@skip_unchanged("market_researcher")
+@reports_degraded("market_researcher")
+@profiled("market_researcher")
+async def aresearcher_node(state: AgentState) -> AgentState:
+    if state.get("shared_research"):
+        return {"research_data": state["shared_research"]}
+    result = await aperform_market_research(state)
+    return {"research_data": result["research_data"]}
+
+@traced("position_monitor", cat="node")
+@skip_unchanged("position_monitor")
+@reports_degraded("position_monitor")
+@profiled("position_monitor")
 def monitor_node(state: AgentState) -> AgentState:
     # This runs in parallel or before strategy
     result = monitor_positions(state)
     return {"adjustment_needed": result["adjustment_needed"]}
 
+@traced("position_monitor", cat="node")
+@skip_unchanged("position_monitor")
+@reports_degraded("position_monitor")
+@profiled("position_monitor")
+async def amonitor_node(state: AgentState) -> AgentState:
+    result = await amonitor_positions(state)
+    return {"adjustment_needed": result["adjustment_needed"]}
+
+@traced("strategist", cat="node")
+@skip_unchanged("strategist")
+@reports_degraded("strategist")
+@profiled("strategist")
 def strategy_lookup_node(state: AgentState) -> AgentState:
     if state.get("error"): return state
     
@@ -121,11 +188,27 @@ def strategy_lookup_node(state: AgentState) -> AgentState:
     result = analyze_strategy(state)
     return {"strategy_decision": result["strategy_decision"]}
 
+@traced("strategist", cat="node")
+@skip_unchanged("strategist")
+@reports_degraded("strategist")
+@profiled("strategist")
+async def astrategy_lookup_node(state: AgentState) -> AgentState:
+    if state.get("error"): return state
+    result = await aanalyze_strategy(state)
+    return {"strategy_decision": result["strategy_decision"]}
+
+@traced("executor", cat="node")
+@skip_unchanged("executor")
+@profiled("executor")
 def execution_node(state: AgentState) -> AgentState:
     if state.get("error"): return state
     result = execute_order(state)
     return {"final_order": result["final_order"]}
 
+@traced("risk_manager", cat="node")
+@skip_unchanged("risk_manager")
+@reports_degraded("risk_manager")
+@profiled("risk_manager")
 def risk_node(state: AgentState) -> AgentState:
     if state.get("error"): return state
     result = validate_order(state)
@@ -133,22 +216,44 @@ def risk_node(state: AgentState) -> AgentState:
         return {"error": result["error"]}
     return {"risk_status": result["risk_status"]}
 
+@traced("risk_manager", cat="node")
+@skip_unchanged("risk_manager")
+@reports_degraded("risk_manager")
+@profiled("risk_manager")
+async def arisk_node(state: AgentState) -> AgentState:
+    if state.get("error"): return state
+    result = await avalidate_order(state)
+    if result.get("error"):
+        return {"error": result["error"]}
+    return {"risk_status": result["risk_status"]}
+
 # Build Graph
 workflow = StateGraph(AgentState)
 
-workflow.add_node("market_scanner", market_scanner)
-workflow.add_node("position_monitor", monitor_node)
-workflow.add_node("market_researcher", researcher_node)
-workflow.add_node("strategist", strategy_lookup_node)
-workflow.add_node("executor", execution_node)
-workflow.add_node("risk_manager", risk_node)
+# LLM nodes carry a sync and an async implementation: app.invoke() keeps working,
+# app.ainvoke() awaits the LLM calls so the parallel branches share one event loop
+# Each node's result is memoized on a hash of the state fields it reads (node_cache_policy)
+workflow.add_node("market_scanner", market_scanner, cache_policy=node_cache_policy("market_scanner"))
+workflow.add_node("news_fetcher", RunnableLambda(news_node, afunc=anews_node),
+                  cache_policy=node_cache_policy("news_fetcher"))
+workflow.add_node("position_monitor", RunnableLambda(monitor_node, afunc=amonitor_node),
+                  cache_policy=node_cache_policy("position_monitor"))
+workflow.add_node("market_researcher", RunnableLambda(researcher_node, afunc=aresearcher_node),
+                  cache_policy=node_cache_policy("market_researcher"))
+workflow.add_node("strategist", RunnableLambda(strategy_lookup_node, afunc=astrategy_lookup_node),
+                  cache_policy=node_cache_policy("strategist"))
+workflow.add_node("executor", execution_node, cache_policy=node_cache_policy("executor"))
+workflow.add_node("risk_manager", RunnableLambda(risk_node, afunc=arisk_node),
+                  cache_policy=node_cache_policy("risk_manager"))
 
 # Define Edges / Flow
-workflow.set_entry_point("market_scanner")
+# Market scan and headline search start in parallel (the graph's inputs)
+workflow.add_edge(START, "market_scanner")
+workflow.add_edge(START, "news_fetcher")
 
-# Parallelize Monitor and Research after Scanner
+# Monitor follows the scan, research synthesis follows the headlines
 workflow.add_edge("market_scanner", "position_monitor")
-workflow.add_edge("market_scanner", "market_researcher")
+workflow.add_edge("news_fetcher", "market_researcher")
 
 # Re-converge to Strategist
 workflow.add_edge("position_monitor", "strategist")
@@ -158,7 +263,13 @@ workflow.add_edge("strategist", "executor")
 workflow.add_edge("executor", "risk_manager")
 workflow.add_edge("risk_manager", END)
 
-app = workflow.compile()
+# State is checkpointed after every node (per thread_id), so a failed run can be
+# resumed and a finished one re-run from the strategist with another override
+node_cache = open_node_cache()
+app = workflow.compile(checkpointer=open_checkpointer(), cache=node_cache)
+
+# Open the vector store and load the embedding model before the first run
+warm_up_vector_store()
 
 if __name__ == "__main__":
     print("Starting Hybrid Agentic RAG System...")
@@ -173,7 +284,43 @@ if __name__ == "__main__":
         initial_state["user_selected_strategy"] = user_override
         print(f"Manual Override: {user_override}")
     
-    result = app.invoke(initial_state)
+    # Live token/field events for the API route (one JSON object per line)
+    if os.environ.get("LLM_STREAM_EVENTS") == "1":
+        import json
+        add_stream_listener(lambda event: print("__EVENT__" + json.dumps(event, default=str), flush=True))
+    
+    # --thread ID names the run (default: new id). With --resume the run continues from
+    # its last checkpoint; with --override STRATEGY it is replayed from the strategist.
+    args = sys.argv[1:]
+    thread_id = args[args.index("--thread") + 1] if "--thread" in args else None
+    override = args[args.index("--override") + 1] if "--override" in args else None
+    if ("--resume" in args or override) and not thread_id:
+        raise SystemExit("--resume and --override need --thread ID")
+    config = run_config(thread_id)
+    thread_id = config["configurable"]["thread_id"]
+    print(f"--- [Graph] Thread: {thread_id} ---")
+
+    # --profile (or PROFILE=1 / PROFILE_SAMPLE_RATE) captures per-node CPU and memory profiles
+    run_id = time.strftime("run-%Y%m%d-%H%M%S")
+    with profile_run(run_id, force=True if "--profile" in args else None) as profile:
+        if override:
+            result = run_async(arerun_with_override(app, thread_id, None if override == "Auto" else override))
+        elif "--resume" in args:
+            result = run_async(aresume(app, thread_id))
+        else:
+            result = run_async(app.ainvoke(initial_state, config))
+    if node_cache:
+        print(f"--- [Graph] Node cache: {node_cache.stats()} ---")
+    print(f"--- [LLM Client] Response cache: {get_llm_cache_stats()} ---")
+    print(f"--- [LLM Client] Hedging: {get_hedge_stats()} ---")
+    trace_path = export_run(run_id)
+    print(f"--- [Trace] Node latencies ---\n{trace_summary('node')}")
+    if trace_path:
+        print(f"--- [Trace] Written to {trace_path} ---")
+    if profile:
+        print(f"--- [Profile] Per-node CPU and memory ---\n{profile.summary()}")
+        for name, path in profile.export().items():
+            print(f"--- [Profile] {name} written to {path} ---")
     print("\n\n__JSON_START__")
     import json
     # Use default=str to handle datetime objects
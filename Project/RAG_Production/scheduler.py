@@ -0,0 +1,136 @@
+import os
+import sys
+import time
+import asyncio
+import argparse
+from datetime import datetime, time as dtime, timedelta
+from typing import Any, Dict, Optional
+from zoneinfo import ZoneInfo
+
+# Ensure src is in path
+sys.path.append(os.getcwd())
+
+# NSE cash/F&O session (exchange holidays are not modelled)
+IST = ZoneInfo("Asia/Kolkata")
+MARKET_OPEN = dtime(9, 15)
+MARKET_CLOSE = dtime(15, 30)
+# Seconds between cycle starts
+SCHEDULE_INTERVAL = float(os.environ.get("SCHEDULE_INTERVAL", 60))
+
+
+def market_is_open(now: datetime = None) -> bool:
+    now = now or datetime.now(IST)
+    return now.weekday() < 5 and MARKET_OPEN <= now.time() < MARKET_CLOSE
+
+
+def seconds_until_open(now: datetime = None) -> float:
+    now = now or datetime.now(IST)
+    day = now
+    for _ in range(8):
+        opening = datetime.combine(day.date(), MARKET_OPEN, tzinfo=IST)
+        if day.weekday() < 5 and opening > now:
+            return (opening - now).total_seconds()
+        day += timedelta(days=1)
+    return 0.0
+
+
+async def run_cycle(app, config: Dict[str, Any], state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    One pass of the graph on the scheduler's thread.
+    Returns:
+        {ran, unchanged, reused, wall_s, values}: nodes that computed, nodes whose
+        inputs had not changed (or scans with no material move), nodes served from
+        the node cache, and the thread's state after the pass.
+    """
+    ran, unchanged, reused = [], [], []
+    start = time.perf_counter()
+    async for chunk in app.astream(state, config, stream_mode="updates"):
+        cached = (chunk.get("__metadata__") or {}).get("cached")
+        for node, update in chunk.items():
+            if node == "__metadata__":
+                continue
+            if cached:
+                reused.append(node)
+            elif update:
+                ran.append(node)
+            else:
+                unchanged.append(node)
+    snapshot = await app.aget_state(config)
+    return {"ran": ran, "unchanged": unchanged, "reused": reused,
+            "wall_s": time.perf_counter() - start, "values": snapshot.values}
+
+
+async def run_schedule(interval: float = SCHEDULE_INTERVAL, cycles: Optional[int] = None,
+                       ignore_hours: bool = False, thread_id: str = None,
+                       symbol: str = None, expiry: str = None):
+    """
+    Re-evaluates the pipeline every `interval` seconds during market hours, on one
+    long-lived thread. Each cycle rescans the market and headlines; the scan keeps
+    its previous snapshot unless spot, VIX or the chain moved materially, and every
+    other node runs only if its inputs changed (skip_unchanged), so a quiet cycle
+    costs two fetches and no LLM calls.
+    """
+    from main_graph import app
+    from src.integration.graph_checkpoints import run_config
+    from src.observability.tracing import fold_histograms
+
+    config = run_config(thread_id)
+    print(f"--- [Scheduler] Thread: {config['configurable']['thread_id']} | every {interval:.0f}s ---")
+    cycle = 0
+    while cycles is None or cycle < cycles:
+        if not ignore_hours and not market_is_open():
+            wait = seconds_until_open()
+            print(f"--- [Scheduler] Market closed; next session in {wait / 3600:.1f} h ---")
+            await asyncio.sleep(wait)
+            continue
+
+        cycle += 1
+        started = time.monotonic()
+        # A unique scan_cycle makes the scan and headline fetch miss the node cache
+        state = {"scan_cycle": int(time.time() * 1000)}
+        if symbol:
+            state["symbol"] = symbol
+        if expiry:
+            state["user_selected_expiry"] = expiry
+        try:
+            report = await run_cycle(app, config, state)
+        except Exception as e:
+            # The thread keeps its last good state; the next cycle starts over
+            print(f"❌ [Scheduler] Cycle {cycle} failed: {e}")
+        else:
+            values = report["values"]
+            decision = (values.get("strategy_decision") or {}).get("strategy")
+            print(f"--- [Scheduler] Cycle {cycle} ({report['wall_s']:.2f}s): "
+                  f"ran [{', '.join(report['ran']) or '-'}] "
+                  f"unchanged [{', '.join(report['unchanged']) or '-'}] "
+                  f"memoized [{', '.join(report['reused']) or '-'}] | "
+                  f"strategy={decision} risk={values.get('risk_status')} ---")
+        # Bank the cycle's latencies and start the next one with an empty tracer, so a
+        # session longer than TRACE_MAX_SPANS loses no spans (the exit export covers a cycle cut short)
+        fold_histograms(reset=True)
+
+        if cycles is None or cycle < cycles:
+            await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-run the agent graph on a schedule during market hours")
+    parser.add_argument("--interval", type=float, default=SCHEDULE_INTERVAL, help="Seconds between cycles")
+    parser.add_argument("--cycles", type=int, help="Stop after this many cycles (default: run until stopped)")
+    parser.add_argument("--ignore-hours", action="store_true", help="Run outside NSE market hours too")
+    parser.add_argument("--thread", help="Continue an earlier scheduler thread (needs SQLite checkpoints)")
+    parser.add_argument("--symbol", help="Underlying (default NIFTY)")
+    parser.add_argument("--expiry", help="DD-MMM-YYYY expiry (default: nearest)")
+    args = parser.parse_args()
+
+    from src.observability.tracing import export_run
+    from src.integration.llm_client import run_async
+    try:
+        run_async(run_schedule(args.interval, args.cycles, args.ignore_hours, args.thread,
+                               args.symbol, args.expiry))
+    except KeyboardInterrupt:
+        print("--- [Scheduler] Stopped ---")
+    finally:
+        trace_path = export_run(time.strftime("schedule-%Y%m%d-%H%M%S"))
+        if trace_path:
+            print(f"--- [Trace] Written to {trace_path} ---")
@@ -1,16 +1,27 @@
 from typing import Dict, Any
-try:
-    from duckduckgo_search import DDGS
-except ImportError:
-    pass
+from src.integration.offline import OFFLINE_MODE
 
-from src.integration.llm_client import query_llm
+if OFFLINE_MODE:
+    from src.integration.offline import FakeDDGS as DDGS
+else:
+    try:
+        from duckduckgo_search import DDGS
+    except ImportError:
+        pass
 
-def perform_market_research(state: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    The Market Researcher Node.
-    Uses DuckDuckGo Search to find current market sentiment/events.
-    """
+from src.integration.llm_client import query_llm, aquery_llm
+from src.observability.tracing import span
+from src.observability.profiling import run_in_thread
+
+SYSTEM_PROMPT = (
+    "You are a senior financial market analyst for the Indian Stock Market (Nifty 50). "
+    "Your job is to summarize the provided raw news headlines and search results into a concise market sentiment report. "
+    "Focus on: Volatility (VIX), FII/DII activity, Global Cues, and Major Domestic Events. "
+    "Conclude with a Sentiment Tag: 'Bullish', 'Bearish', 'Neutral', or 'Volatile'."
+)
+
+def fetch_raw_research() -> str:
+    """Blocking web search; returns the raw headline text for the LLM."""
     print("--- [Market Researcher] Searching Web for Live Intel (DuckDuckGo v2) ---")
     
     raw_data = ""
@@ -22,11 +33,14 @@ def perform_market_research(state: Dict[str, Any]) -> Dict[str, Any]:
         
         search_results = []
         try:
-            with DDGS() as ddgs:
+            with span("ddgs.news", cat="external", query=query) as current, DDGS() as ddgs:
                 # Retrieve news results. Note: ddgs.text() or ddgs.news()
                 # Using news() as verified in debug script.
                 results = list(ddgs.news(query, max_results=5))
-                search_results = results
+                # Newest first in a fixed order, so the same headlines give the same
+                # text and the synthesis is skipped when nothing new arrived
+                search_results = sorted(results, key=lambda r: (r.get('date', ''), r.get('title', '')), reverse=True)
+                current.set(results=len(results))
         except Exception as e:
             print(f"DuckDuckGo Search failed: {e}")
             # Fallback message
@@ -53,24 +67,47 @@ def perform_market_research(state: Dict[str, Any]) -> Dict[str, Any]:
         raw_data = f"Error performing market research: {str(e)}"
 
     print(f"Raw Research Data (first 200 chars): {raw_data[:200]}...")
-    
-    # 3. Summarize with LLM
+    return raw_data
+
+def synthesize_research(raw_data: str) -> str:
+    """LLM summary of the raw headlines (the researcher's only LLM call)."""
     print("--- [Market Researcher] Synthesizing with LLM (Llama 3) ---")
-    system_prompt = (
-        "You are a senior financial market analyst for the Indian Stock Market (Nifty 50). "
-        "Your job is to summarize the provided raw news headlines and search results into a concise market sentiment report. "
-        "Focus on: Volatility (VIX), FII/DII activity, Global Cues, and Major Domestic Events. "
-        "Conclude with a Sentiment Tag: 'Bullish', 'Bearish', 'Neutral', or 'Volatile'."
-    )
     user_prompt = f"Raw Market Data:\n{raw_data}"
     
     try:
         # Use Llama 3 via Groq for fast synthesis
-        research_summary = query_llm(system_prompt, user_prompt, provider="groq", model="llama-3.3-70b-versatile")
+        research_summary = query_llm(SYSTEM_PROMPT, user_prompt, provider="groq", model="llama-3.3-70b-versatile", agent="market_researcher")
     except Exception as e:
         print(f"LLM Summarization Failed: {e}")
         research_summary = f"LLM Error. Raw Data: {raw_data}"
     
     print(f"LLM Summary: {research_summary}")
+    return research_summary
+
+async def asynthesize_research(raw_data: str) -> str:
+    """Async synthesize_research (the LLM call is awaited)."""
+    print("--- [Market Researcher] Synthesizing with LLM (Llama 3) ---")
+    user_prompt = f"Raw Market Data:\n{raw_data}"
     
-    return {"research_data": research_summary}
+    try:
+        research_summary = await aquery_llm(SYSTEM_PROMPT, user_prompt, provider="groq", model="llama-3.3-70b-versatile", agent="market_researcher")
+    except Exception as e:
+        print(f"LLM Summarization Failed: {e}")
+        research_summary = f"LLM Error. Raw Data: {raw_data}"
+    
+    print(f"LLM Summary: {research_summary}")
+    return research_summary
+
+def perform_market_research(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The Market Researcher Node.
+    Uses DuckDuckGo Search to find current market sentiment/events
+    (or the headlines already in state["raw_research"]) and summarizes them.
+    """
+    raw_data = state.get("raw_research") or fetch_raw_research()
+    return {"research_data": synthesize_research(raw_data)}
+
+async def aperform_market_research(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Async Market Researcher Node: search runs in a worker thread, the LLM call is awaited."""
+    raw_data = state.get("raw_research") or await run_in_thread(fetch_raw_research)
+    return {"research_data": await asynthesize_research(raw_data)}
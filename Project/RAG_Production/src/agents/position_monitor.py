@@ -1,18 +1,12 @@
 import csv
 import os
-from typing import Dict, Any
-from src.integration.llm_client import query_llm
+from typing import Dict, Any, Tuple
+from src.integration.llm_client import query_llm, aquery_llm
 import json
 
 LOG_FILE = os.path.join(os.getcwd(), 'data', 'market_history', 'option_chain_log.csv')
 
-def monitor_positions(state: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    The Position Monitor Node.
-    Checks if existing positions need adjustment using LLM analysis.
-    """
-    print("--- [Position Monitor] Checking Active Positions with LLM ---")
-    
+def _build_prompts(state: Dict[str, Any]) -> Tuple[str, str]:
     # In a real system, we'd read the actual open order book from Kite.
     # Here we mock reading the last "logged" trade from CSV if available.
     
@@ -57,21 +51,40 @@ def monitor_positions(state: Dict[str, Any]) -> Dict[str, Any]:
     
     Decision?
     """
+    return system_prompt, user_prompt
+
+def _parse_response(llm_response: str) -> Dict[str, Any]:
+    print(f"Position Monitor Thoughts: {llm_response}")
     
-    try:
-        llm_response = query_llm(system_prompt, user_prompt)
-        print(f"Position Monitor Thoughts: {llm_response}")
-        
-        # Simple parsing
-        adjustment_needed = False
-        if "adjust" in llm_response.lower() or "exit" in llm_response.lower():
-            adjustment_needed = True
-            
-        return {
-            "adjustment_needed": adjustment_needed,
-            "monitor_analysis": llm_response
-        }
+    # Simple parsing
+    adjustment_needed = False
+    if "adjust" in llm_response.lower() or "exit" in llm_response.lower():
+        adjustment_needed = True
         
+    return {
+        "adjustment_needed": adjustment_needed,
+        "monitor_analysis": llm_response
+    }
+
+def monitor_positions(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The Position Monitor Node.
+    Checks if existing positions need adjustment using LLM analysis.
+    """
+    print("--- [Position Monitor] Checking Active Positions with LLM ---")
+    system_prompt, user_prompt = _build_prompts(state)
+    try:
+        return _parse_response(query_llm(system_prompt, user_prompt, agent="position_monitor"))
+    except Exception as e:
+        print(f"Position Monitor LLM Failed: {e}")
+        return {"adjustment_needed": False}
+
+async def amonitor_positions(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Async Position Monitor Node (non-blocking LLM call)."""
+    print("--- [Position Monitor] Checking Active Positions with LLM ---")
+    system_prompt, user_prompt = _build_prompts(state)
+    try:
+        return _parse_response(await aquery_llm(system_prompt, user_prompt, agent="position_monitor", fields=("decision",)))
     except Exception as e:
         print(f"Position Monitor LLM Failed: {e}")
         return {"adjustment_needed": False}
@@ -1,20 +1,37 @@
-from typing import Dict, Any
-from src.integration.llm_client import query_llm
+from typing import Dict, Any, Optional, Tuple
+from src.integration.llm_client import query_llm, aquery_llm
+from src.quant_engine.risk_rules import build_facts, evaluate_rules
+from src.integration.prompt_context import PromptContext
+import os
 import json
+import re
 
-def validate_order(state: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    The Risk Manager Node.
-    Validates the proposed order against safety checks using LLM reasoning.
-    """
-    print("--- [Risk Manager] Validating Order with LLM ---")
+# Set to 1 to send every order to the LLM (rule findings are still included in the prompt)
+RISK_ALWAYS_LLM = os.environ.get("RISK_ALWAYS_LLM", "0") == "1"
+
+def check_rules(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Deterministic fast path: the compiled risk rules over the order and market data."""
+    facts = build_facts(state.get("final_order", {}), state.get("market_data", {}), state.get("research_data"))
+    verdict = evaluate_rules(facts)
+    print(f"--- [Risk Manager] Rule engine: {verdict['decision']} in {verdict['elapsed_us']:.0f} us "
+          f"({', '.join(verdict['fired']) or 'no rules fired'}) ---")
+    return verdict
+
+def _rules_result(verdict: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Final result when the rules are conclusive, else None (escalate to the LLM)."""
+    if verdict["decision"] == "inconclusive" or RISK_ALWAYS_LLM:
+        return None
+    print(f"✅ Rule Risk Decision: {verdict['decision']}")
+    return {
+        "risk_status": verdict["decision"],
+        "risk_analysis": "Rule engine: " + "; ".join(verdict["reasons"])
+    }
+
+def _build_prompts(state: Dict[str, Any], verdict: Dict[str, Any]) -> Tuple[str, str]:
     order = state.get("final_order", {})
     market_data = state.get("market_data", {})
     market_sentiment = state.get("research_data", "No sentiment data")
     
-    if not order:
-        return {"error": "No order to validate."}
-    
     # Construct Prompt
     system_prompt = (
         "You are a strict Risk Manager for an options trading desk. "
@@ -26,58 +43,100 @@ def validate_order(state: Dict[str, Any]) -> Dict[str, Any]:
         "Output JSON: {'decision': 'approved' or 'rejected', 'reason': '...'}"
     )
     
-    user_prompt = f"""
-    Market Data:
-    - Spot Price: {market_data.get('spot_price')}
-    - IV: {market_data.get('iv')}%
-    - Sentiment: {market_sentiment}
+    # Only the fields the review needs, as compact JSON (no indentation, no strike analysis)
+    order_summary = {
+        "strategy": order.get("strategy"),
+        "legs": [{k: leg.get(k) for k in ("action", "type", "strike", "quantity")} for leg in order.get("legs", [])]
+    }
+    user_prompt = (
+        PromptContext("risk_manager", system_prompt)
+        .add("market", f"Market Data:\n- Spot Price: {market_data.get('spot_price')}\n"
+                       f"- IV: {market_data.get('iv')}%\n- DTE: {market_data.get('days_to_expiry')}", required=True)
+        .add("sentiment", market_sentiment, title="Sentiment", priority=1)
+        .add("order", "Proposed Order: " + json.dumps(order_summary, separators=(",", ":"), default=str), required=True)
+        .add("findings", f"Rule Engine Findings ({verdict['decision']}):\n"
+                         + "\n".join("- " + reason for reason in verdict["reasons"]), required=True)
+        .add("ask", "Approve or Reject?", required=True)
+        .build()
+    )
+    return system_prompt, user_prompt
+
+def _parse_response(llm_response: str) -> Dict[str, Any]:
+    print(f"Risk Manager Thoughts: {llm_response}")
     
-    Proposed Order:
-    {json.dumps(order, indent=2)}
-    
-    Approve or Reject?
-    """
+    # Robust JSON parsing with fallback
+    decision = "approved"  # Default to approved (conservative)
     
     try:
-        # Use Llama 3 via Groq logic for "Second Opinion"
-        # Since Strategist used GPT-4, we audit with Llama 3
-        llm_response = query_llm(system_prompt, user_prompt, provider="groq", model="llama-3.3-70b-versatile")
+        # Try to parse JSON response
+        clean_response = re.sub(r'```json\s*|\s*```', '', llm_response)
+        llm_json = json.loads(clean_response)
         
-        print(f"Risk Manager Thoughts: {llm_response}")
+        decision = llm_json.get('decision', 'approved').lower()
+        reason = llm_json.get('reason', llm_response)
         
-        # Robust JSON parsing with fallback
-        decision = "approved"  # Default to approved (conservative)
+        print(f"✅ Parsed Risk Decision: {decision}")
         
-        try:
-            # Try to parse JSON response
-            import re
-            clean_response = re.sub(r'```json\s*|\s*```', '', llm_response)
-            llm_json = json.loads(clean_response)
-            
-            decision = llm_json.get('decision', 'approved').lower()
-            reason = llm_json.get('reason', llm_response)
-            
-            print(f"✅ Parsed Risk Decision: {decision}")
-            
-        except (json.JSONDecodeError, ValueError) as e:
-            # Fallback to keyword matching
-            print(f"⚠️ JSON parsing failed, using keyword fallback: {e}")
+    except (json.JSONDecodeError, ValueError) as e:
+        # Fallback to keyword matching
+        print(f"⚠️ JSON parsing failed, using keyword fallback: {e}")
+        
+        if re.search(r'\brejected?\b', llm_response, re.IGNORECASE):
+            decision = "rejected"
+        elif re.search(r'\bapproved?\b', llm_response, re.IGNORECASE):
+            decision = "approved"
+        else:
+            # If unclear, be conservative and reject
+            print("⚠️ [SAFETY] Could not determine decision clearly. Rejecting for safety.")
+            decision = "rejected"
             
-            if re.search(r'\brejected?\b', llm_response, re.IGNORECASE):
-                decision = "rejected"
-            elif re.search(r'\bapproved?\b', llm_response, re.IGNORECASE):
-                decision = "approved"
-            else:
-                # If unclear, be conservative and reject
-                print("⚠️ [SAFETY] Could not determine decision clearly. Rejecting for safety.")
-                decision = "rejected"
-                
-        return {
-            "risk_status": decision,
-            "risk_analysis": llm_response
-        }
+    return {
+        "risk_status": decision,
+        "risk_analysis": llm_response
+    }
+
+def validate_order(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The Risk Manager Node.
+    Validates the proposed order with the rule engine; the LLM only
+    reviews orders the rules cannot decide.
+    """
+    if not state.get("final_order", {}):
+        return {"error": "No order to validate."}
+    verdict = check_rules(state)
+    result = _rules_result(verdict)
+    if result:
+        return result
+    print("--- [Risk Manager] Validating Order with LLM ---")
+    system_prompt, user_prompt = _build_prompts(state, verdict)
+    
+    try:
+        # Use Llama 3 via Groq logic for "Second Opinion"
+        # Since Strategist used GPT-4, we audit with Llama 3
+        llm_response = query_llm(system_prompt, user_prompt, provider="groq", model="llama-3.3-70b-versatile", agent="risk_manager")
+        return _parse_response(llm_response)
         
     except Exception as e:
         print(f"Risk Manager LLM Failed: {e}")
         # Fail safe: Reject if unsure
         return {"risk_status": "rejected", "risk_analysis": "LLM Failure"}
+
+async def avalidate_order(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Async Risk Manager Node (rule engine, then a non-blocking LLM call if inconclusive)."""
+    if not state.get("final_order", {}):
+        return {"error": "No order to validate."}
+    verdict = check_rules(state)
+    result = _rules_result(verdict)
+    if result:
+        return result
+    print("--- [Risk Manager] Validating Order with LLM ---")
+    system_prompt, user_prompt = _build_prompts(state, verdict)
+    
+    try:
+        llm_response = await aquery_llm(system_prompt, user_prompt, provider="groq", model="llama-3.3-70b-versatile", agent="risk_manager",
+                                        fields=("decision",))
+        return _parse_response(llm_response)
+        
+    except Exception as e:
+        print(f"Risk Manager LLM Failed: {e}")
+        return {"risk_status": "rejected", "risk_analysis": "LLM Failure"}
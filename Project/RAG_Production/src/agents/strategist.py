@@ -1,23 +1,65 @@
-from typing import Dict, Any
-from src.knowledge.retrieval_tool import lookup_strategy_rules
-from src.integration.llm_client import query_llm
+from typing import Dict, Any, Optional
+from src.knowledge.vector_store import query_strategy_rules_batch, STRANGLE_TOPIC, STRADDLE_TOPIC, IRON_FLY_TOPIC, PRECOMPUTED_TOPICS
+from src.integration.llm_client import query_llm, aquery_llm
+from src.integration.prompt_context import PromptContext
+from src.observability.profiling import run_in_thread
 
-def analyze_strategy(state: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    The Strategist Node.
-    Analyzes the market state and queries the knowledge base for rules.
-    """
+SYSTEM_PROMPT = (
+    "You are an expert options strategist. "
+    "Decide between 'Short Strangle' (Range Bound), 'Short Straddle' (Low Volatility), or 'Iron Fly' (Defined Risk). "
+    "Also recommend the sigma multiplier for strike selection (1.0 for standard, 1.5 for conservative). "
+    "Output JSON only: {'strategy': 'Short Strangle'/'Short Straddle'/'Iron Fly', 'recommended_sigma': float, 'rationale': '...', 'constraints': '...'}"
+)
+
+def _prepare(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Rule lookup and prompt building (everything before the LLM call)."""
     market_data = state.get("market_data", {})
     iv = market_data.get("iv", 0)
     # Use the research data passed from the Market Researcher node
     news = state.get("research_data", "No recent market news found.")
     
     print("--- [Strategist] Querying RAG for Short Strangle & Straddle Rules ---")
-    strangle_rules = lookup_strategy_rules.invoke("Short Strangle management")
-    straddle_rules = lookup_strategy_rules.invoke("Short Straddle management")
-    iron_fly_rules = lookup_strategy_rules.invoke("Iron Fly strategy rules") # Attempt to fetch if exists
+    # One batched lookup instead of three sequential ones (ranked chunks per topic)
+    chunks = query_strategy_rules_batch(PRECOMPUTED_TOPICS)
+    rules = {
+        topic: "\n\n".join(found) if found else "No specific rules found for this topic."
+        for topic, found in chunks.items()
+    }
+    strangle_rules = rules[STRANGLE_TOPIC]
+    straddle_rules = rules[STRADDLE_TOPIC]
+    iron_fly_rules = rules[IRON_FLY_TOPIC] # Attempt to fetch if exists
     
     user_override = state.get("user_selected_strategy")
+    user_prompt = None
+    if not user_override:
+        # Overlapping rule chunks are sent once and the prompt is trimmed to the strategist's budget
+        user_prompt = (
+            PromptContext("strategist", SYSTEM_PROMPT)
+            .add("market", f"Market IV: {iv}%", required=True)
+            .add("news", news, title="News Sentiment", priority=2)
+            .add("strangle_rules", chunks[STRANGLE_TOPIC] or [strangle_rules], title="Strangle Rules", priority=1)
+            .add("straddle_rules", chunks[STRADDLE_TOPIC] or [straddle_rules], title="Straddle Rules", priority=1)
+            .add("ask", "Recommend the best strategy.", required=True)
+            .build()
+        )
+    return {
+        "iv": iv,
+        "news": news,
+        "strangle_rules": strangle_rules,
+        "straddle_rules": straddle_rules,
+        "iron_fly_rules": iron_fly_rules,
+        "user_override": user_override,
+        "user_prompt": user_prompt,
+    }
+
+def _decide(context: Dict[str, Any], llm_response: Optional[str]) -> Dict[str, Any]:
+    """Turns the LLM answer (or the manual override) into the strategy decision."""
+    iv = context["iv"]
+    news = context["news"]
+    strangle_rules = context["strangle_rules"]
+    straddle_rules = context["straddle_rules"]
+    iron_fly_rules = context["iron_fly_rules"]
+    user_override = context["user_override"]
     recommended_sigma = 1.0  # Default sigma value
     
     if user_override:
@@ -35,17 +77,6 @@ def analyze_strategy(state: Dict[str, Any]) -> Dict[str, Any]:
              
          llm_response = f"Manual Override: {user_override}. Analysis skipped."
     else: 
-        # Use LLM to decide Strategy (Existing Logic)
-        system_prompt = (
-            "You are an expert options strategist. "
-            "Decide between 'Short Strangle' (Range Bound), 'Short Straddle' (Low Volatility), or 'Iron Fly' (Defined Risk). "
-            "Also recommend the sigma multiplier for strike selection (1.0 for standard, 1.5 for conservative). "
-            "Output JSON only: {'strategy': 'Short Strangle'/'Short Straddle'/'Iron Fly', 'recommended_sigma': float, 'rationale': '...', 'constraints': '...'}"
-        )
-        user_prompt = f"Market IV: {iv}%\nNews Sentiment: {news}\n\nStrangle Rules: {strangle_rules}\nStraddle Rules: {straddle_rules}\n\nRecommend the best strategy."
-        
-        llm_response = query_llm(system_prompt, user_prompt)
-        
         # Enhanced parsing with robust JSON extraction
         if "Error" in llm_response:
             print("⚠️ [FALLBACK] LLM Error - Using default Strangle strategy")
@@ -113,3 +144,24 @@ def analyze_strategy(state: Dict[str, Any]) -> Dict[str, Any]:
     }
     
     return {"strategy_decision": strategy_decision}
+
+def analyze_strategy(state: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The Strategist Node.
+    Analyzes the market state and queries the knowledge base for rules.
+    """
+    context = _prepare(state)
+    llm_response = None
+    if context["user_prompt"]:
+        # Use LLM to decide Strategy
+        llm_response = query_llm(SYSTEM_PROMPT, context["user_prompt"], agent="strategist")
+    return _decide(context, llm_response)
+
+async def aanalyze_strategy(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Async Strategist Node: rule lookup runs in a worker thread, the LLM call is awaited."""
+    context = await run_in_thread(_prepare, state)
+    llm_response = None
+    if context["user_prompt"]:
+        llm_response = await aquery_llm(SYSTEM_PROMPT, context["user_prompt"], agent="strategist",
+                                        fields=("strategy", "recommended_sigma"))
+    return _decide(context, llm_response)
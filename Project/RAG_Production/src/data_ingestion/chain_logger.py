@@ -2,6 +2,8 @@ import csv
 import os
 import datetime
 import random
+from zoneinfo import ZoneInfo
+from src.data_ingestion.snapshot_store import get_snapshot_store, MARKET_TZ
 
 # For this mock, we will generate synthetic option chain data
 # similar to what we might get from an API (e.g., NSE Python)
@@ -20,7 +22,8 @@ def get_mock_option_chain():
     
     chain_data = []
     
-    timestamp = datetime.datetime.now().isoformat()
+    # Offset-aware, so the log means the same instant on any host time zone
+    timestamp = datetime.datetime.now(ZoneInfo(MARKET_TZ)).isoformat()
     
     for strike in strikes:
         # Mocking Call (CE) and Put (PE) data
@@ -61,5 +64,8 @@ def log_chain_snapshot():
         
     print(f"Logged {len(data)} rows to {CSV_FILE}")
 
+    # Also index the snapshot for time-range queries
+    get_snapshot_store().record_snapshot("NIFTY", data)
+
 if __name__ == "__main__":
     log_chain_snapshot()
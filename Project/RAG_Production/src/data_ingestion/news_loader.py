@@ -4,7 +4,7 @@ import os
 # Ensure src is in path
 sys.path.append(os.getcwd())
 
-from src.knowledge.vector_store import add_texts
+from src.knowledge.vector_store import add_news
 
 def fetch_mock_news():
     """Simulates fetching relevant financial news."""
@@ -27,7 +27,7 @@ def fetch_mock_news():
     ]
 
 def ingest_news():
-    """Fetches news and stores it in the vector database."""
+    """Fetches news and stores it in today's news partition (deduped, TTL-evicted)."""
     print("Fetching news feeds...")
     news_items = fetch_mock_news()
     
@@ -40,7 +40,7 @@ def ingest_news():
         texts.append(content)
         metadatas.append({"source": item['source'], "type": "news"})
         
-    add_texts(texts, metadatas)
+    add_news(texts, metadatas)
     print("News ingestion complete.")
 
 if __name__ == "__main__":
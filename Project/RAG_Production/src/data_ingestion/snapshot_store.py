@@ -0,0 +1,585 @@
+import os
+import sqlite3
+import threading
+import datetime
+from typing import Dict, Any, List, Optional, Iterable
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+
+# Historical option chain snapshots, indexed by timestamp.
+# Lives next to the CSV written by chain_logger.
+
+STORE_DIR = os.path.join(os.getcwd(), 'data', 'market_history')
+DB_FILE = os.path.join(STORE_DIR, 'chain_snapshots.db')
+
+# Exchange time zone: naive timestamps passed in are read as market time, and
+# query results come back as naive market time (stored as UTC epoch ms)
+MARKET_TZ = os.environ.get("SNAPSHOT_TZ", "Asia/Kolkata")
+
+# Per-strike values we keep for every snapshot
+FIELDS = ["ce_ltp", "pe_ltp", "ce_iv", "pe_iv", "ce_oi", "pe_oi"]
+
+# Storage encoding: 'rows' (one row per strike per snapshot) or
+# 'delta' (periodic keyframe + sparse per-strike deltas as scaled integers)
+ENCODING = os.environ.get("SNAPSHOT_ENCODING", "rows")
+
+# In delta mode, a full keyframe is written every N frames (~5 min at 1s ticks)
+KEYFRAME_INTERVAL = int(os.environ.get("SNAPSHOT_KEYFRAME_INTERVAL", 300))
+
+# Integer scaling for delta frames: prices in paise, IV in basis points, OI as-is
+FIELD_SCALES = {
+    "ce_ltp": 100, "pe_ltp": 100,
+    "ce_iv": 100, "pe_iv": 100,
+    "ce_oi": 1, "pe_oi": 1,
+}
+PRICE_SCALE = 100  # spot and strike
+
+# chain_logger rows use *_last_price, the derived chain uses *_ltp
+FIELD_ALIASES = {
+    "ce_last_price": "ce_ltp",
+    "pe_last_price": "pe_ltp",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chain_rows (
+    underlying TEXT NOT NULL,
+    expiry TEXT NOT NULL DEFAULT '',
+    ts INTEGER NOT NULL,
+    spot REAL,
+    strike REAL NOT NULL,
+    ce_ltp REAL,
+    pe_ltp REAL,
+    ce_iv REAL,
+    pe_iv REAL,
+    ce_oi INTEGER,
+    pe_oi INTEGER,
+    PRIMARY KEY (underlying, strike, ts, expiry)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_chain_rows_ts ON chain_rows(underlying, ts);
+CREATE TABLE IF NOT EXISTS chain_frames (
+    underlying TEXT NOT NULL,
+    expiry TEXT NOT NULL DEFAULT '',
+    ts INTEGER NOT NULL,
+    keyframe INTEGER NOT NULL,
+    payload BLOB NOT NULL,
+    PRIMARY KEY (underlying, expiry, ts)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_chain_frames_key ON chain_frames(underlying, expiry, keyframe, ts);
+"""
+
+
+def to_epoch_ms(value) -> Optional[int]:
+    """
+    Converts a timestamp (datetime, ISO string, pandas Timestamp or epoch seconds)
+    to integer epoch milliseconds. Naive values are taken as MARKET_TZ time,
+    whatever the process time zone. Returns None for None.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value * 1000)
+    if isinstance(value, str):
+        value = datetime.datetime.fromisoformat(value)
+    if isinstance(value, pd.Timestamp):
+        value = value.to_pydatetime()
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=ZoneInfo(MARKET_TZ))
+    return int(value.timestamp() * 1000)
+
+
+def from_epoch_ms(values):
+    """Epoch ms (scalar or Series) to naive MARKET_TZ timestamps, the inverse of to_epoch_ms."""
+    converted = pd.to_datetime(values, unit="ms", utc=True)
+    if isinstance(converted, pd.Series):
+        return converted.dt.tz_convert(MARKET_TZ).dt.tz_localize(None)
+    return converted.tz_convert(MARKET_TZ).tz_localize(None)
+
+
+def normalize_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """Maps a chain row from any of our sources onto the store columns."""
+    clean = {FIELD_ALIASES.get(key, key): value for key, value in row.items()}
+    return {field: clean.get(field) for field in ["spot", "strike"] + FIELDS}
+
+
+def _encode_varints(values: List[int]) -> bytes:
+    """Zigzag + LEB128 encoding; small deltas take a single byte."""
+    out = bytearray()
+    for value in values:
+        value = (value << 1) ^ (value >> 63)
+        while value > 0x7F:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        out.append(value)
+    return bytes(out)
+
+
+def _decode_varints(payload: bytes) -> List[int]:
+    values = []
+    value = shift = 0
+    for byte in payload:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        values.append((value >> 1) ^ -(value & 1))
+        value = shift = 0
+    return values
+
+
+def _scale_row(values: Dict[str, Any]) -> tuple:
+    """Per-strike field tuple as scaled ints; a missing field (None or NaN) stays None."""
+    scaled = []
+    for field in FIELDS:
+        value = values.get(field)
+        if value is None or value != value:  # None or NaN
+            scaled.append(None)
+        else:
+            scaled.append(int(round(value * FIELD_SCALES[field])))
+    return tuple(scaled)
+
+
+def _presence_mask(row: tuple) -> int:
+    return sum(1 << i for i, value in enumerate(row) if value is not None)
+
+
+def encode_keyframe(spot: int, state: Dict[int, tuple]) -> bytes:
+    """Payload: spot, n, then (strike, presence mask, *present fields) for every strike."""
+    values = [spot, len(state)]
+    for strike in sorted(state):
+        row = state[strike]
+        values.extend((strike, _presence_mask(row)))
+        values.extend(value for value in row if value is not None)
+    return _encode_varints(values)
+
+
+def encode_delta(spot: int, previous: Dict[int, tuple], state: Dict[int, tuple]) -> bytes:
+    """
+    Payload: spot, n, then (strike, changed-field mask, presence mask, *field deltas)
+    for changed strikes only. A field that appears is sent as a delta from 0; one
+    that disappears is only cleared in the presence mask.
+    """
+    entries = []
+    for strike in sorted(state):
+        old, new = previous[strike], state[strike]
+        mask = 0
+        diffs = []
+        for i, (a, b) in enumerate(zip(old, new)):
+            if a != b:
+                mask |= 1 << i
+                if b is not None:
+                    diffs.append(b - (a or 0))
+        if mask:
+            entries.append((strike, mask, _presence_mask(new), diffs))
+
+    values = [spot, len(entries)]
+    for strike, mask, present, diffs in entries:
+        values.extend((strike, mask, present))
+        values.extend(diffs)
+    return _encode_varints(values)
+
+
+def apply_frame(state: Dict[int, tuple], payload: bytes, keyframe: bool) -> tuple:
+    """Decodes a frame on top of `state`. Returns (spot, new_state)."""
+    values = _decode_varints(payload)
+    spot, count = values[0], values[1]
+    pos = 2
+    if keyframe:
+        state = {}
+        for _ in range(count):
+            strike, present = values[pos], values[pos + 1]
+            pos += 2
+            row = []
+            for i in range(len(FIELDS)):
+                if present & (1 << i):
+                    row.append(values[pos])
+                    pos += 1
+                else:
+                    row.append(None)
+            state[strike] = tuple(row)
+        return spot, state
+
+    state = dict(state)
+    for _ in range(count):
+        strike, mask, present = values[pos], values[pos + 1], values[pos + 2]
+        pos += 3
+        row = list(state[strike])
+        for i in range(len(FIELDS)):
+            if not mask & (1 << i):
+                continue
+            if present & (1 << i):
+                row[i] = (row[i] or 0) + values[pos]
+                pos += 1
+            else:
+                row[i] = None
+        state[strike] = tuple(row)
+    return spot, state
+
+
+def _unscale_state(ts: int, spot: int, state: Dict[int, tuple],
+                   strike_min: float = None, strike_max: float = None) -> List[Dict[str, Any]]:
+    rows = []
+    for strike in sorted(state):
+        value = strike / PRICE_SCALE
+        if strike_min is not None and value < strike_min:
+            continue
+        if strike_max is not None and value > strike_max:
+            continue
+        row = {"ts": ts, "strike": value, "spot": spot / PRICE_SCALE if spot >= 0 else None}
+        for field, scaled in zip(FIELDS, state[strike]):
+            scale = FIELD_SCALES[field]
+            row[field] = scaled if scale == 1 or scaled is None else scaled / scale
+        rows.append(row)
+    return rows
+
+
+class SnapshotStore:
+    """
+    SQLite-backed store for option chain snapshots.
+    Rows are clustered on (underlying, strike, ts) with a secondary (underlying, ts)
+    index, so time-range queries for a strike band read contiguous pages.
+
+    With encoding='delta', each snapshot is stored as one frame instead: a full
+    keyframe every `keyframe_interval` frames, otherwise only the strikes and
+    fields that changed, as varint-packed integer deltas.
+    """
+
+    def __init__(self, db_file: str = DB_FILE, encoding: str = ENCODING,
+                 keyframe_interval: int = KEYFRAME_INTERVAL):
+        if encoding not in ("rows", "delta"):
+            raise ValueError(f"Unknown snapshot encoding: {encoding}")
+        self.db_file = db_file
+        self.encoding = encoding
+        self.keyframe_interval = keyframe_interval
+        self._lock = threading.Lock()
+        self._conn = None
+        # Last written state per (underlying, expiry): (frames since keyframe, state)
+        self._writer_state: Dict[tuple, tuple] = {}
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_file), exist_ok=True)
+            self._conn = sqlite3.connect(self.db_file, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def record_snapshot(self, underlying: str, rows: List[Dict[str, Any]], timestamp=None,
+                        expiry: str = None, spot: float = None) -> int:
+        """
+        Stores one chain snapshot.
+        Args:
+            underlying: e.g. 'NIFTY'.
+            rows: Per-strike dicts (chain_logger or option_chain_client format).
+            timestamp: Snapshot time. Defaults to the row 'timestamp' or now.
+            expiry: Optional expiry label (DD-MMM-YYYY).
+            spot: Spot price, used when rows don't carry one.
+        Returns:
+            Number of rows written.
+        """
+        if not rows:
+            return 0
+
+        if timestamp is None:
+            timestamp = rows[0].get("timestamp") or datetime.datetime.now(datetime.timezone.utc)
+        ts = to_epoch_ms(timestamp)
+
+        if self.encoding == "delta":
+            return self._record_frame(underlying, rows, ts, expiry or "", spot)
+
+        records = []
+        for row in rows:
+            values = normalize_row(row)
+            if values["spot"] is None:
+                values["spot"] = spot
+            records.append((underlying, expiry or "", ts, values["spot"], values["strike"],
+                            *[values[field] for field in FIELDS]))
+
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT OR REPLACE INTO chain_rows (underlying, expiry, ts, spot, strike, "
+                + ", ".join(FIELDS) + ") VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                records
+            )
+            conn.commit()
+        return len(records)
+
+    def _record_frame(self, underlying: str, rows: List[Dict[str, Any]], ts: int,
+                      expiry: str, spot: float = None) -> int:
+        state = {}
+        for row in rows:
+            values = normalize_row(row)
+            if spot is None:
+                spot = values["spot"]
+            state[int(round(values["strike"] * PRICE_SCALE))] = _scale_row(values)
+        spot_scaled = int(round(spot * PRICE_SCALE)) if spot is not None else -1
+
+        key = (underlying, expiry)
+        with self._lock:
+            conn = self._connect()
+            since_key, previous = self._writer_state.get(key, (None, None))
+            if previous is None:
+                # Resume from whatever is on disk (e.g. after a restart)
+                previous, since_key = self._latest_state(conn, underlying, expiry)
+
+            keyframe = (
+                previous is None
+                or since_key + 1 >= self.keyframe_interval
+                or previous.keys() != state.keys()
+            )
+            if keyframe:
+                payload = encode_keyframe(spot_scaled, state)
+                since_key = 0
+            else:
+                payload = encode_delta(spot_scaled, previous, state)
+                since_key += 1
+
+            conn.execute(
+                "INSERT OR REPLACE INTO chain_frames (underlying, expiry, ts, keyframe, payload) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (underlying, expiry, ts, int(keyframe), payload)
+            )
+            conn.commit()
+            self._writer_state[key] = (since_key, state)
+        return len(state)
+
+    def _latest_state(self, conn: sqlite3.Connection, underlying: str, expiry: str,
+                      at_ms: int = None) -> tuple:
+        """Decodes the newest state at or before `at_ms`. Returns (state, frames since keyframe)."""
+        at_ms = at_ms if at_ms is not None else 2 ** 62
+        key_row = conn.execute(
+            "SELECT ts FROM chain_frames WHERE underlying = ? AND expiry = ? AND keyframe = 1 "
+            "AND ts <= ? ORDER BY ts DESC LIMIT 1",
+            (underlying, expiry, at_ms)
+        ).fetchone()
+        if key_row is None:
+            return None, 0
+
+        state: Dict[int, tuple] = {}
+        frames = conn.execute(
+            "SELECT keyframe, payload FROM chain_frames WHERE underlying = ? AND expiry = ? "
+            "AND ts >= ? AND ts <= ? ORDER BY ts",
+            (underlying, expiry, key_row[0], at_ms)
+        ).fetchall()
+        for is_key, payload in frames:
+            _, state = apply_frame(state, payload, bool(is_key))
+        return state, len(frames) - 1
+
+    def decode_at(self, underlying: str, timestamp, expiry: str = None) -> List[Dict[str, Any]]:
+        """
+        Random-access decode (delta encoding): the chain as of `timestamp`.
+        Only reads from the nearest preceding keyframe, so cost is bounded by
+        keyframe_interval rather than history length.
+        """
+        at_ms = to_epoch_ms(timestamp)
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT ts FROM chain_frames WHERE underlying = ? AND expiry = ? AND ts <= ? "
+                "ORDER BY ts DESC LIMIT 1",
+                (underlying, expiry or "", at_ms)
+            ).fetchone()
+            if row is None:
+                return []
+            frames = self._frames_between(conn, underlying, expiry or "", row[0], row[0])
+        rows = frames[-1] if frames else []
+        for r in rows:
+            r["timestamp"] = from_epoch_ms(r.pop("ts"))
+        return rows
+
+    def _frames_between(self, conn: sqlite3.Connection, underlying: str, expiry: str,
+                        start_ms: int, end_ms: int, strike_min: float = None,
+                        strike_max: float = None) -> List[List[Dict[str, Any]]]:
+        """Decodes every frame in [start_ms, end_ms], starting from the keyframe before start_ms."""
+        key_row = conn.execute(
+            "SELECT ts FROM chain_frames WHERE underlying = ? AND expiry = ? AND keyframe = 1 "
+            "AND ts <= ? ORDER BY ts DESC LIMIT 1",
+            (underlying, expiry, start_ms)
+        ).fetchone()
+        from_ms = key_row[0] if key_row else start_ms
+
+        frames = conn.execute(
+            "SELECT ts, keyframe, payload FROM chain_frames WHERE underlying = ? AND expiry = ? "
+            "AND ts >= ? AND ts <= ? ORDER BY ts",
+            (underlying, expiry, from_ms, end_ms)
+        )
+        decoded = []
+        state = None
+        for ts, is_key, payload in frames:
+            if state is None and not is_key:
+                continue  # No keyframe yet to apply deltas on
+            spot, state = apply_frame(state or {}, payload, bool(is_key))
+            if ts >= start_ms:
+                decoded.append(_unscale_state(ts, spot, state, strike_min, strike_max))
+        return decoded
+
+    def query_history(self, underlying: str, start=None, end=None,
+                      strike_min: float = None, strike_max: float = None,
+                      fields: Iterable[str] = None, expiry: str = None) -> pd.DataFrame:
+        """
+        Returns the per-strike series for a time window.
+        Args:
+            underlying: e.g. 'NIFTY'.
+            start / end: Inclusive time bounds (datetime, ISO string or epoch seconds).
+            strike_min / strike_max: Inclusive strike band.
+            fields: Subset of FIELDS to return (default: all).
+            expiry: Optional expiry filter.
+        Returns:
+            DataFrame with 'timestamp' (naive MARKET_TZ), 'strike', 'spot' and the
+            requested fields, sorted by strike then time.
+        """
+        fields = list(fields) if fields else FIELDS
+        unknown = [f for f in fields if f not in FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown snapshot fields: {unknown}")
+
+        if self.encoding == "delta":
+            start_ms = to_epoch_ms(start) if start is not None else 0
+            end_ms = to_epoch_ms(end) if end is not None else 2 ** 62
+            with self._lock:
+                frames = self._frames_between(self._connect(), underlying, expiry or "",
+                                              start_ms, end_ms, strike_min, strike_max)
+            rows = [row for frame in frames for row in frame]
+            df = pd.DataFrame(rows, columns=["ts", "strike", "spot"] + FIELDS)[["ts", "strike", "spot"] + fields]
+            df = df.sort_values(["strike", "ts"], kind="stable").reset_index(drop=True)
+            df.insert(0, "timestamp", from_epoch_ms(df.pop("ts")))
+            return df
+
+        clauses = ["underlying = ?"]
+        params: List[Any] = [underlying]
+        for column, op, value in (
+            ("strike", ">=", strike_min),
+            ("strike", "<=", strike_max),
+            ("ts", ">=", to_epoch_ms(start)),
+            ("ts", "<=", to_epoch_ms(end)),
+            ("expiry", "=", expiry),
+        ):
+            if value is not None:
+                clauses.append(f"{column} {op} ?")
+                params.append(value)
+
+        sql = (
+            f"SELECT ts, strike, spot, {', '.join(fields)} FROM chain_rows "
+            f"WHERE {' AND '.join(clauses)} ORDER BY strike, ts"
+        )
+        with self._lock:
+            rows = self._connect().execute(sql, params).fetchall()
+
+        df = pd.DataFrame(rows, columns=["ts", "strike", "spot"] + fields)
+        df.insert(0, "timestamp", from_epoch_ms(df.pop("ts")))
+        return df
+
+    def query_ohlc(self, underlying: str, start=None, end=None,
+                   strike_min: float = None, strike_max: float = None,
+                   fields: Iterable[str] = ("ce_ltp", "pe_ltp"),
+                   interval: str = "1min", expiry: str = None) -> pd.DataFrame:
+        """
+        Downsamples the history into OHLC bars per strike.
+        Args:
+            interval: pandas offset alias ('1min', '5min', '1h', ...).
+            fields: Fields to aggregate; each yields <field>_open/high/low/close.
+        Returns:
+            DataFrame indexed by (strike, timestamp).
+        """
+        fields = list(fields)
+        history = self.query_history(underlying, start, end, strike_min, strike_max,
+                                     fields=fields, expiry=expiry)
+        return resample_ohlc(history, fields, interval)
+
+    def import_csv(self, csv_file: str, underlying: str = "NIFTY") -> int:
+        """Backfills the store from a chain_logger CSV. Returns rows written."""
+        df = pd.read_csv(csv_file)
+        if df.empty:
+            return 0
+        written = 0
+        for timestamp, group in df.groupby("timestamp", sort=True):
+            written += self.record_snapshot(underlying, group.to_dict("records"), timestamp=timestamp)
+        return written
+
+
+def resample_ohlc(history: pd.DataFrame, fields: List[str], interval: str = "1min") -> pd.DataFrame:
+    """Aggregates a query_history frame into <field>_open/high/low/close bars per strike."""
+    columns = [f"{field}_{agg}" for field in fields for agg in ("open", "high", "low", "close")]
+    if history.empty:
+        return pd.DataFrame(columns=columns)
+
+    grouped = history.groupby(["strike", pd.Grouper(key="timestamp", freq=interval)])[fields]
+    bars = grouped.agg(["first", "max", "min", "last"]).dropna(how="all")
+    bars.columns = columns
+    return bars
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_snapshot_store() -> SnapshotStore:
+    """Returns the shared SnapshotStore instance."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SnapshotStore()
+        return _store
+
+
+def query_chain_history(underlying: str, start=None, end=None, strike_min: float = None,
+                        strike_max: float = None, fields: Iterable[str] = None,
+                        expiry: str = None) -> pd.DataFrame:
+    """Convenience wrapper around SnapshotStore.query_history on the shared store."""
+    return get_snapshot_store().query_history(underlying, start, end, strike_min, strike_max, fields,
+                                              expiry=expiry)
+
+
+def query_chain_ohlc(underlying: str, start=None, end=None, strike_min: float = None,
+                     strike_max: float = None, fields: Iterable[str] = ("ce_ltp", "pe_ltp"),
+                     interval: str = "1min", expiry: str = None) -> pd.DataFrame:
+    """Convenience wrapper around SnapshotStore.query_ohlc on the shared store."""
+    return get_snapshot_store().query_ohlc(underlying, start, end, strike_min, strike_max,
+                                           fields, interval, expiry=expiry)
+
+
+def check_round_trip(snapshots: int = 5) -> None:
+    """
+    Writes chain_logger snapshots (its real row shape: *_last_price, no OI) with
+    both encodings and checks query_history returns every value. Raises
+    AssertionError on a mismatch.
+    """
+    import tempfile
+    from src.data_ingestion.chain_logger import get_mock_option_chain
+
+    start = datetime.datetime(2026, 1, 5, 9, 15)
+    written = [(start + datetime.timedelta(seconds=i), get_mock_option_chain()) for i in range(snapshots)]
+    for encoding in ("rows", "delta"):
+        with tempfile.TemporaryDirectory() as tmp:
+            store = SnapshotStore(os.path.join(tmp, "check.db"), encoding=encoding, keyframe_interval=3)
+            for timestamp, rows in written:
+                assert store.record_snapshot("NIFTY", rows, timestamp=timestamp) == len(rows), encoding
+            history = store.query_history("NIFTY")
+            assert len(history) == sum(len(rows) for _, rows in written), encoding
+            for timestamp, rows in written:
+                for row in rows:
+                    got = history[(history["timestamp"] == timestamp) & (history["strike"] == row["strike"])]
+                    assert len(got) == 1, (encoding, timestamp, row["strike"])
+                    got = got.iloc[0]
+                    assert got["spot"] == row["spot"], encoding
+                    for source, field in (("ce_last_price", "ce_ltp"), ("pe_last_price", "pe_ltp"),
+                                          ("ce_iv", "ce_iv"), ("pe_iv", "pe_iv")):
+                        assert abs(got[field] - row[source]) < 1e-9, (encoding, field, got[field], row[source])
+                    assert pd.isna(got["ce_oi"]) and pd.isna(got["pe_oi"]), encoding
+            store._conn.close()
+    print(f"Round trip OK: {snapshots} chain_logger snapshots, rows and delta encodings")
+
+
+if __name__ == "__main__":
+    import sys
+    if "--check" in sys.argv:
+        check_round_trip()
+        sys.exit(0)
+    # Backfill from the CSV log written by chain_logger
+    from src.data_ingestion.chain_logger import CSV_FILE
+    if os.path.exists(CSV_FILE):
+        count = get_snapshot_store().import_csv(CSV_FILE)
+        print(f"Imported {count} rows into {DB_FILE}")
+    else:
+        print(f"No CSV log found at {CSV_FILE}")
@@ -0,0 +1,362 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import hashlib
+import asyncio
+import threading
+import functools
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import pandas as pd
+from langgraph.cache.base import BaseCache, FullKey, Namespace
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.types import CachePolicy
+
+try:
+    from langgraph.checkpoint.sqlite import SqliteSaver
+except ImportError:
+    SqliteSaver = None
+
+from src.integration.llm_client import collect_llm_failures
+
+# Checkpoints and memoized node results live here (GRAPH_STATE_DIR= keeps both in memory)
+GRAPH_STATE_DIR = os.environ.get("GRAPH_STATE_DIR", os.path.join(os.getcwd(), 'graph_state'))
+GRAPH_CHECKPOINTS = os.environ.get("GRAPH_CHECKPOINTS", "1") == "1"
+NODE_CACHE = os.environ.get("NODE_CACHE", "1") == "1"
+
+# How long a node's result can be reused for the same inputs (seconds); override with
+# NODE_CACHE_TTL_<NODE>=seconds (0 disables). The scan reads live prices.
+DEFAULT_NODE_TTL = float(os.environ.get("NODE_CACHE_TTL", 300))
+NODE_CACHE_TTLS = {
+    "market_scanner": 60,
+    "news_fetcher": 60,
+    "market_researcher": 900,
+    "position_monitor": 120,
+    "strategist": 300,
+    "executor": 300,
+    "risk_manager": 300,
+}
+# State fields each node reads; its memo key is a hash of just these, so a new
+# strategy override only misses the cache from the strategist onwards
+NODE_INPUTS = {
+    "market_scanner": ("symbol", "user_selected_expiry", "scan_cycle"),
+    "news_fetcher": ("shared_research", "scan_cycle"),
+    "market_researcher": ("raw_research", "shared_research"),
+    "position_monitor": ("market_data", "research_data"),
+    "strategist": ("market_data", "research_data", "user_selected_strategy", "error"),
+    "executor": ("market_data", "strategy_decision", "error"),
+    "risk_manager": ("market_data", "research_data", "final_order", "error"),
+}
+# First node to recompute after a strategy override (everything upstream is reused)
+OVERRIDE_NODE = "strategist"
+
+# State holds the option chain as a DataFrame, which msgpack cannot encode.
+# Both stores are local files this process writes, so pickle is acceptable.
+serde = JsonPlusSerializer(pickle_fallback=True)
+
+NODE_CACHE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS node_cache (
+    ns TEXT NOT NULL,
+    key TEXT NOT NULL,
+    encoding TEXT NOT NULL,
+    value BLOB NOT NULL,
+    expires_at REAL,
+    PRIMARY KEY (ns, key)
+);
+CREATE INDEX IF NOT EXISTS node_cache_expiry ON node_cache (expires_at);
+"""
+
+
+def get_node_ttl(node: str) -> float:
+    override = os.environ.get(f"NODE_CACHE_TTL_{node.upper()}")
+    if override is not None:
+        return float(override)
+    return NODE_CACHE_TTLS.get(node, DEFAULT_NODE_TTL)
+
+
+def _canonical(value: Any) -> Any:
+    if isinstance(value, pd.DataFrame):
+        return hashlib.sha256(pd.util.hash_pandas_object(value, index=True).values.tobytes()).hexdigest()
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return repr(value)
+
+
+def node_key(node: str, state: Mapping[str, Any]) -> str:
+    """Hash of the state fields the node reads (NODE_INPUTS)."""
+    inputs = {field: state.get(field) for field in NODE_INPUTS.get(node, ())}
+    payload = json.dumps(inputs, sort_keys=True, default=_canonical)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def node_cache_policy(node: str) -> Optional[CachePolicy]:
+    ttl = get_node_ttl(node)
+    if not NODE_CACHE or ttl <= 0:
+        return None
+    return CachePolicy(key_func=functools.partial(node_key, node), ttl=int(ttl))
+
+
+def merge_by_node(current: Optional[Dict[str, str]], update: Optional[Dict[str, str]]) -> Dict[str, str]:
+    """State reducer for per-node entries (degraded, input_keys); a None value removes the node's entry."""
+    merged = {**(current or {}), **(update or {})}
+    return {node: value for node, value in merged.items() if value}
+
+
+def _is_degraded(writes: Iterable[Tuple[str, Any]]) -> bool:
+    return any(channel == "degraded" and value and any(value.values()) for channel, value in writes)
+
+
+def _writes_state(writes: Iterable[Tuple[str, Any]]) -> bool:
+    """False when the node only triggered its successors (e.g. skip_unchanged kept the old result)."""
+    return any(not channel.startswith(("branch:", "__")) for channel, _ in writes)
+
+
+def reports_degraded(node: str) -> Callable:
+    """
+    Adds {"degraded": {node: reason | None}} to the node's update. A node whose
+    LLM call failed still returns its fallback answer, but is flagged so the
+    result is not memoized and a retry recomputes it.
+    """
+    def decorator(func: Callable) -> Callable:
+        def finish(update: Dict[str, Any], failures: List[str]) -> Dict[str, Any]:
+            return {**update, "degraded": {node: "; ".join(failures) or None}}
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with collect_llm_failures() as failures:
+                    update = await func(*args, **kwargs)
+                return finish(update, failures)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with collect_llm_failures() as failures:
+                update = func(*args, **kwargs)
+            return finish(update, failures)
+        return wrapper
+    return decorator
+
+
+def skip_unchanged(node: str) -> Callable:
+    """
+    Runs the node only when the state fields it reads (NODE_INPUTS) differ from
+    the last time it ran on this thread; otherwise it writes nothing and the
+    thread keeps its previous result. This is what lets a long-lived thread
+    (scheduler.py) recompute only what its new inputs affect, whatever the
+    cache TTLs. Goes outside reports_degraded: degraded runs are not recorded,
+    so they are retried on the next pass.
+    """
+    def decorator(func: Callable) -> Callable:
+        def unchanged(state: Dict[str, Any], key: str) -> bool:
+            if (state.get("input_keys") or {}).get(node) != key:
+                return False
+            print(f"--- [Graph] {node} inputs unchanged; keeping its last result ---")
+            return True
+
+        def finish(update: Dict[str, Any], key: str) -> Dict[str, Any]:
+            clean = not (update.get("degraded") or {}).get(node)
+            return {**update, "input_keys": {node: key if clean else None}}
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(state, *args, **kwargs):
+                key = node_key(node, state)
+                if unchanged(state, key):
+                    return {}
+                return finish(await func(state, *args, **kwargs), key)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(state, *args, **kwargs):
+            key = node_key(node, state)
+            if unchanged(state, key):
+                return {}
+            return finish(func(state, *args, **kwargs), key)
+        return wrapper
+    return decorator
+
+
+class NodeResultCache(BaseCache):
+    """
+    LangGraph node cache (compile(cache=...)) in a local SQLite file, shared by
+    every process and thread. Results flagged as degraded, and skipped runs that
+    wrote no state, are never stored. Expired entries are deleted on every write,
+    so keys that never repeat (the scheduler's scan_cycle) do not accumulate.
+    """
+
+    def __init__(self, db_file: Optional[str]):
+        super().__init__(serde=serde)
+        self.db_file = db_file
+        self._memory: Dict[Tuple[str, str], Tuple[str, bytes, Optional[float]]] = {}
+        self._lock = threading.Lock()
+        self._conn = None
+        if db_file:
+            try:
+                os.makedirs(os.path.dirname(db_file), exist_ok=True)
+                self._conn = sqlite3.connect(db_file, check_same_thread=False, timeout=5)
+                self._conn.executescript(NODE_CACHE_SCHEMA)
+            except sqlite3.Error as e:
+                print(f"Warning: node cache on disk unavailable, keeping it in memory: {e}")
+                self._conn = None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _ns(ns: Namespace) -> str:
+        return "/".join(ns)
+
+    def get(self, keys: Sequence[FullKey]) -> Dict[FullKey, Any]:
+        now = time.time()
+        found = {}
+        with self._lock:
+            for ns, key in keys:
+                if self._conn is not None:
+                    row = self._conn.execute(
+                        "SELECT encoding, value, expires_at FROM node_cache WHERE ns = ? AND key = ?",
+                        (self._ns(ns), key)
+                    ).fetchone()
+                else:
+                    row = self._memory.get((self._ns(ns), key))
+                if row is None or (row[2] is not None and row[2] <= now):
+                    continue
+                found[(ns, key)] = self.serde.loads_typed((row[0], row[1]))
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        for ns, _ in found:
+            print(f"--- [Graph] Reusing memoized {ns[-1]} ---")
+        return found
+
+    async def aget(self, keys: Sequence[FullKey]) -> Dict[FullKey, Any]:
+        return self.get(keys)
+
+    def set(self, pairs: Mapping[FullKey, Tuple[Any, Optional[int]]]) -> None:
+        rows = []
+        for (ns, key), (writes, ttl) in pairs.items():
+            if _is_degraded(writes) or not _writes_state(writes):
+                continue
+            encoding, value = self.serde.dumps_typed(writes)
+            rows.append((self._ns(ns), key, encoding, value, time.time() + ttl if ttl is not None else None))
+        if not rows:
+            return
+        now = time.time()
+        with self._lock:
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM node_cache WHERE expires_at <= ?", (now,))
+                self._conn.executemany("INSERT OR REPLACE INTO node_cache VALUES (?, ?, ?, ?, ?)", rows)
+                self._conn.commit()
+            else:
+                self._memory = {k: v for k, v in self._memory.items() if v[2] is None or v[2] > now}
+                for ns, key, encoding, value, expires_at in rows:
+                    self._memory[(ns, key)] = (encoding, value, expires_at)
+
+    async def aset(self, pairs: Mapping[FullKey, Tuple[Any, Optional[int]]]) -> None:
+        self.set(pairs)
+
+    def clear(self, namespaces: Sequence[Namespace] = None) -> None:
+        with self._lock:
+            if self._conn is not None:
+                if namespaces is None:
+                    self._conn.execute("DELETE FROM node_cache")
+                else:
+                    self._conn.executemany("DELETE FROM node_cache WHERE ns = ?",
+                                           [(self._ns(ns),) for ns in namespaces])
+                self._conn.commit()
+            elif namespaces is None:
+                self._memory.clear()
+            else:
+                prefixes = {self._ns(ns) for ns in namespaces}
+                self._memory = {k: v for k, v in self._memory.items() if k[0] not in prefixes}
+
+    async def aclear(self, namespaces: Sequence[Namespace] = None) -> None:
+        self.clear(namespaces)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+if SqliteSaver is not None:
+    class LocalSqliteSaver(SqliteSaver):
+        """
+        SqliteSaver that also serves ainvoke(). AsyncSqliteSaver is bound to one
+        event loop, while the dashboard and CLI start a new loop per run; local
+        SQLite writes are fast enough to run inline (as InMemorySaver does).
+        """
+
+        async def aget_tuple(self, config):
+            return self.get_tuple(config)
+
+        async def alist(self, config, *, filter=None, before=None, limit=None):
+            for item in self.list(config, filter=filter, before=before, limit=limit):
+                yield item
+
+        async def aput(self, config, checkpoint, metadata, new_versions):
+            return self.put(config, checkpoint, metadata, new_versions)
+
+        async def aput_writes(self, config, writes, task_id, task_path=""):
+            return self.put_writes(config, writes, task_id, task_path)
+
+        async def adelete_thread(self, thread_id):
+            return self.delete_thread(thread_id)
+
+
+def open_checkpointer():
+    """SQLite checkpoints under GRAPH_STATE_DIR, or in-memory ones (this process only)."""
+    if not GRAPH_CHECKPOINTS:
+        return None
+    if GRAPH_STATE_DIR and SqliteSaver is not None:
+        os.makedirs(GRAPH_STATE_DIR, exist_ok=True)
+        conn = sqlite3.connect(os.path.join(GRAPH_STATE_DIR, 'checkpoints.db'), check_same_thread=False)
+        return LocalSqliteSaver(conn, serde=serde)
+    if GRAPH_STATE_DIR:
+        print("Warning: langgraph-checkpoint-sqlite not installed; checkpoints only last for this process.")
+    return InMemorySaver(serde=serde)
+
+
+def open_node_cache() -> Optional[NodeResultCache]:
+    if not NODE_CACHE:
+        return None
+    return NodeResultCache(os.path.join(GRAPH_STATE_DIR, 'node_cache.db') if GRAPH_STATE_DIR else None)
+
+
+def run_config(thread_id: str = None, **config) -> Dict[str, Any]:
+    """Invoke config for one graph run; every run gets its own thread unless one is given."""
+    configurable = dict(config.pop("configurable", {}))
+    configurable["thread_id"] = thread_id or uuid.uuid4().hex
+    return {**config, "configurable": configurable}
+
+
+async def aresume(app, thread_id: str, **config) -> Dict[str, Any]:
+    """
+    Continues a run from its last checkpoint: nodes that completed are not
+    rerun, the failed node and everything after it are.
+    """
+    run = run_config(thread_id, **config)
+    snapshot = await app.aget_state(run)
+    if not snapshot.next:
+        print(f"--- [Graph] Run {thread_id} already finished; nothing to resume ---")
+        return snapshot.values
+    print(f"--- [Graph] Resuming {thread_id} at {', '.join(snapshot.next)} ---")
+    return await app.ainvoke(None, run)
+
+
+async def arerun_with_override(app, thread_id: str, strategy: Optional[str], **config) -> Dict[str, Any]:
+    """
+    Replays a finished run from the checkpoint just before the strategist with a
+    new user_selected_strategy: the scan, research and monitor results are reused.
+    The fork is recorded on the same thread.
+    """
+    run = run_config(thread_id, **config)
+    async for snapshot in app.aget_state_history(run):
+        if OVERRIDE_NODE in snapshot.next:
+            break
+    else:
+        raise ValueError(f"Run {thread_id} never reached {OVERRIDE_NODE}; resume it instead")
+    print(f"--- [Graph] Re-running {thread_id} from {OVERRIDE_NODE} with strategy={strategy} ---")
+    # Written as the upstream node so the graph continues at the strategist
+    forked = await app.aupdate_state(snapshot.config, {"user_selected_strategy": strategy},
+                                     as_node="market_researcher")
+    return await app.ainvoke(None, {**run, "configurable": {**run["configurable"], **forked["configurable"]}})
@@ -0,0 +1,61 @@
+import re
+import json
+from typing import Any, Dict, Iterable
+
+
+class JSONFieldStream:
+    """
+    Pulls selected top-level fields out of a JSON answer while it is still
+    being streamed, e.g. 'decision' or 'strategy', as soon as their value is
+    complete. Tolerates the code fences, single quotes and raw newlines LLMs
+    often emit; a value that still cannot be decoded is skipped, never raised.
+    """
+
+    def __init__(self, fields: Iterable[str]):
+        self.buffer = ""
+        self.found: Dict[str, Any] = {}
+        self._malformed = set()
+        self._patterns = {
+            field: re.compile(
+                r"""["']%s["']\s*:\s*(?:"((?:[^"\\]|\\.)*)"|'((?:[^'\\]|\\.)*)'|(-?\d+(?:\.\d+)?|true|false|null)(?=\s*[,}\n]))"""
+                % re.escape(field)
+            )
+            for field in fields
+        }
+
+    def feed(self, chunk: str) -> Dict[str, Any]:
+        """Adds streamed text. Returns the fields completed by this chunk."""
+        self.buffer += chunk
+        new = {}
+        for field, pattern in self._patterns.items():
+            if field in self.found or field in self._malformed:
+                continue
+            match = pattern.search(self.buffer)
+            if not match:
+                continue
+            double, single, literal = match.groups()
+            try:
+                if double is not None:
+                    value = _decode_string(double)
+                elif single is not None:
+                    # Same escapes as JSON, plus \' and bare double quotes
+                    value = _decode_string(re.sub(r'\\.|"', _requote, single))
+                else:
+                    value = json.loads(literal)
+            except ValueError:
+                self._malformed.add(field)
+                continue
+            self.found[field] = new[field] = value
+        return new
+
+
+def _decode_string(body: str) -> str:
+    """JSON string escapes; strict=False accepts raw control characters (newlines, tabs)."""
+    return json.loads(f'"{body}"', strict=False)
+
+
+def _requote(match: "re.Match") -> str:
+    token = match.group(0)
+    if token == "\\'":
+        return "'"
+    return '\\"' if token == '"' else token
@@ -1,6 +1,12 @@
 import os
 import logging
-from kiteconnect import KiteConnect
+from src.integration.offline import OFFLINE_MODE
+from src.observability.tracing import span
+
+if OFFLINE_MODE:
+    from src.integration.offline import FakeKiteConnect as KiteConnect
+else:
+    from kiteconnect import KiteConnect
 
 # Setup Logging
 logging.basicConfig(level=logging.INFO)
@@ -8,9 +14,9 @@ logger = logging.getLogger(__name__)
 
 class KiteApp:
     def __init__(self):
-        self.api_key = os.environ.get("KITE_API_KEY")
+        self.api_key = os.environ.get("KITE_API_KEY") or ("offline" if OFFLINE_MODE else None)
         self.api_secret = os.environ.get("KITE_API_SECRET")
-        self.access_token = os.environ.get("KITE_ACCESS_TOKEN")
+        self.access_token = os.environ.get("KITE_ACCESS_TOKEN") or ("offline" if OFFLINE_MODE else None)
         
         if not self.api_key:
             logger.warning("KITE_API_KEY not found in env.")
@@ -42,7 +48,8 @@ class KiteApp:
         if not self.kite:
             # Mock response
             return {inst: {"last_price": 100.0, "oi": 50000} for inst in instruments}
-        return self.kite.quote(instruments)
+        with span("kite.quote", cat="external", instruments=len(instruments)):
+            return self.kite.quote(instruments)
 
     def place_order(self, symbol, transaction_type, quantity, price=None, order_type="MARKET"):
         """Places an order."""
@@ -51,17 +58,18 @@ class KiteApp:
             return "mock_order_id_123"
             
         try:
-            order_id = self.kite.place_order(
-                tradingsymbol=symbol,
-                exchange=self.kite.EXCHANGE_NFO,
-                transaction_type=transaction_type,
-                quantity=quantity,
-                variety=self.kite.VARIETY_REGULAR,
-                order_type=self.kite.ORDER_TYPE_MARKET if order_type == "MARKET" else self.kite.ORDER_TYPE_LIMIT,
-                price=price,
-                product=self.kite.PRODUCT_NRML,
-                validity=self.kite.VALIDITY_DAY
-            )
+            with span("kite.place_order", cat="external", symbol=symbol, quantity=quantity):
+                order_id = self.kite.place_order(
+                    tradingsymbol=symbol,
+                    exchange=self.kite.EXCHANGE_NFO,
+                    transaction_type=transaction_type,
+                    quantity=quantity,
+                    variety=self.kite.VARIETY_REGULAR,
+                    order_type=self.kite.ORDER_TYPE_MARKET if order_type == "MARKET" else self.kite.ORDER_TYPE_LIMIT,
+                    price=price,
+                    product=self.kite.PRODUCT_NRML,
+                    validity=self.kite.VALIDITY_DAY
+                )
             return order_id
         except Exception as e:
             logger.error(f"Order Placement Failed: {e}")
@@ -71,7 +79,10 @@ class KiteApp:
         """Downloads master instrument dump."""
         if not self.kite:
             return []
-        return self.kite.instruments("NFO")
+        with span("kite.instruments", cat="external") as current:
+            instruments = self.kite.instruments("NFO")
+            current.set(rows=len(instruments))
+            return instruments
 
 # Singleton instance
 kite_client = KiteApp()
@@ -0,0 +1,116 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+# In-memory entries kept per process
+LLM_CACHE_SIZE = int(os.environ.get("LLM_CACHE_SIZE", 256))
+# Disk tier shared by all runs (every graph run is a fresh process). Empty disables it.
+LLM_CACHE_DIR = os.environ.get("LLM_CACHE_DIR", os.path.join(os.getcwd(), 'llm_cache'))
+
+DISK_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    latency_s REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_expires ON responses(expires_at);
+"""
+
+
+def make_key(provider: str, model: str, temperature: float, system_prompt: str, user_prompt: str) -> str:
+    """Exact-match key: (provider, model, temperature, system prompt, user prompt hash)."""
+    user_hash = hashlib.sha256(user_prompt.encode("utf-8")).hexdigest()
+    raw = json.dumps([provider, model, temperature, system_prompt, user_hash])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Two-tier TTL cache for LLM responses: a size-bounded LRU in memory in
+    front of an optional SQLite file. Each entry carries its own expiry, so
+    callers pick the TTL per agent.
+    """
+
+    def __init__(self, capacity: int = LLM_CACHE_SIZE, cache_dir: str = LLM_CACHE_DIR):
+        self.capacity = capacity
+        self.db_file = os.path.join(cache_dir, 'responses.db') if cache_dir else None
+        self._memory: "OrderedDict[str, Tuple[str, float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if self.db_file and self._conn is None:
+            try:
+                os.makedirs(os.path.dirname(self.db_file), exist_ok=True)
+                self._conn = sqlite3.connect(self.db_file, check_same_thread=False, timeout=5)
+                self._conn.executescript(DISK_SCHEMA)
+            except sqlite3.Error as e:
+                print(f"Warning: LLM disk cache unavailable: {e}")
+                self.db_file = None
+                self._conn = None
+        return self._conn
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and entry[1] > now:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                self.saved_seconds += entry[2]
+                return entry[0]
+            self._memory.pop(key, None)
+
+            conn = self._connect()
+            if conn is not None:
+                row = conn.execute(
+                    "SELECT response, expires_at, latency_s FROM responses WHERE key = ? AND expires_at > ?",
+                    (key, now)
+                ).fetchone()
+                if row:
+                    self._remember(key, row)
+                    self.disk_hits += 1
+                    self.saved_seconds += row[2]
+                    return row[0]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, response: str, ttl: float, latency_s: float = 0.0):
+        if ttl <= 0:
+            return
+        entry = (response, time.time() + ttl, latency_s)
+        with self._lock:
+            self._remember(key, entry)
+            conn = self._connect()
+            if conn is not None:
+                with conn:
+                    conn.execute("INSERT OR REPLACE INTO responses (key, response, expires_at, latency_s) "
+                                 "VALUES (?, ?, ?, ?)", (key, *entry))
+                    conn.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+
+    def _remember(self, key: str, entry: Tuple[str, float, float]):
+        self._memory[key] = tuple(entry)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.capacity:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "saved_seconds": self.saved_seconds,
+            "entries": len(self._memory),
+        }
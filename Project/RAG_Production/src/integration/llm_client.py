@@ -1,10 +1,22 @@
 import os
-from openai import OpenAI
-from typing import Optional
+import time
+import asyncio
+import weakref
+import contextvars
+import httpx
+from openai import OpenAI, AsyncOpenAI
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Iterator, Optional, Dict, List, Tuple
 from dotenv import load_dotenv
+from src.integration.llm_cache import LLMCache, make_key
+from src.integration.json_stream import JSONFieldStream
+from src.integration.llm_latency import LatencyTracker
+from src.observability.tracing import span, start_span, finish_span
 
 load_dotenv()
 
+GROQ_BASE_URL = os.environ.get("GROQ_BASE_URL", "https://api.groq.com/openai/v1")
+
 # Initialize clients
 client_openai = None
 client_groq = None
@@ -22,7 +34,7 @@ except Exception as e:
 try:
     if os.environ.get("GROQ_API_KEY"):
         client_groq = OpenAI(
-            base_url="https://api.groq.com/openai/v1",
+            base_url=GROQ_BASE_URL,
             api_key=os.environ.get("GROQ_API_KEY")
         )
         print("--- [LLM Client] Groq Client Initialized (Llama 3 Ready) ---")
@@ -31,53 +43,570 @@ try:
 except Exception as e:
     print(f"Warning: Groq Client Init Failed: {e}")
 
-def query_llm(system_prompt: str, user_prompt: str, model: str = None, provider: str = "openai") -> str:
+# Response cache TTLs (seconds) per agent; override with LLM_CACHE_TTL_<AGENT>=seconds (0 disables).
+# Research follows the news cycle; decisions depend on fast-moving prices.
+DEFAULT_CACHE_TTL = float(os.environ.get("LLM_CACHE_TTL", 300))
+AGENT_CACHE_TTLS = {
+    "market_researcher": 900,
+    "strategist": 300,
+    "risk_manager": 300,
+    "position_monitor": 120,
+}
+
+# Per-agent deadline (seconds) for one LLM answer, retries included; override with
+# LLM_DEADLINE_<AGENT>. Researcher/monitor run in parallel, so a worst-case graph
+# run (12 + 20 + 12s) stays inside the API route's 60s kill.
+DEFAULT_DEADLINE = float(os.environ.get("LLM_DEADLINE", 20))
+AGENT_DEADLINES = {
+    "market_researcher": 12,
+    "position_monitor": 12,
+    "strategist": 20,
+    "risk_manager": 12,
+}
+# Extra attempts after a failed call, while the deadline allows; override with LLM_RETRIES_<AGENT>
+DEFAULT_RETRIES = int(os.environ.get("LLM_RETRIES", 1))
+
+# Hedged requests (async path): if the primary provider has not answered within the
+# LLM_HEDGE_PERCENTILE of its recent latencies (LLM_HEDGE_DELAY until there is history),
+# the same request is sent to the other provider; the first answer wins.
+LLM_HEDGE = os.environ.get("LLM_HEDGE", "1") == "1"
+LLM_HEDGE_PERCENTILE = float(os.environ.get("LLM_HEDGE_PERCENTILE", 90))
+LLM_HEDGE_DELAY = float(os.environ.get("LLM_HEDGE_DELAY", 6))
+LLM_HEDGE_MIN_DELAY = float(os.environ.get("LLM_HEDGE_MIN_DELAY", 1))
+LLM_RETRY_BACKOFF = 0.5
+
+llm_cache = LLMCache()
+latency_tracker = LatencyTracker()
+hedge_stats = {"calls": 0, "hedged": 0, "backup_wins": 0, "retries": 0, "deadline_exceeded": 0}
+
+def _agent_setting(agent: Optional[str], name: str, table: Dict[str, float], default: float) -> float:
+    if not agent:
+        return default
+    override = os.environ.get(f"{name}_{agent.upper()}")
+    if override is not None:
+        return float(override)
+    return table.get(agent, default)
+
+def get_cache_ttl(agent: Optional[str]) -> float:
+    return _agent_setting(agent, "LLM_CACHE_TTL", AGENT_CACHE_TTLS, DEFAULT_CACHE_TTL)
+
+def get_deadline(agent: Optional[str]) -> float:
+    return _agent_setting(agent, "LLM_DEADLINE", AGENT_DEADLINES, DEFAULT_DEADLINE)
+
+def get_retry_budget(agent: Optional[str]) -> int:
+    return int(_agent_setting(agent, "LLM_RETRIES", {}, DEFAULT_RETRIES))
+
+def get_hedge_delay(provider: str, model: str) -> float:
+    observed = latency_tracker.percentile(provider, model, LLM_HEDGE_PERCENTILE)
+    return max(LLM_HEDGE_MIN_DELAY, observed if observed is not None else LLM_HEDGE_DELAY)
+
+def get_hedge_stats() -> Dict[str, int]:
+    """Hedge/retry/deadline counters for async calls in this process."""
+    return dict(hedge_stats)
+
+# Failed calls are also reported to the enclosing collect_llm_failures() block, so a
+# graph node can tell its fallback answer from a real one (and keep it out of caches)
+_llm_failures: contextvars.ContextVar[Optional[List[str]]] = contextvars.ContextVar("llm_failures", default=None)
+
+@contextmanager
+def collect_llm_failures() -> Iterator[List[str]]:
+    """Yields a list that receives one message per LLM call that failed inside the block."""
+    failures: List[str] = []
+    token = _llm_failures.set(failures)
+    try:
+        yield failures
+    finally:
+        _llm_failures.reset(token)
+
+def _record_failure(message: str) -> str:
+    failures = _llm_failures.get()
+    if failures is not None:
+        failures.append(message)
+    return message
+
+def get_llm_cache_stats() -> Dict[str, float]:
+    """Hit/miss counters and LLM time saved by the response cache in this process."""
+    return llm_cache.stats()
+
+def _select_model(provider: str, model: Optional[str], has_groq: bool) -> Tuple[str, str]:
+    """Provider Selection Logic: returns (provider, model) actually used."""
+    if provider == "groq":
+        if has_groq:
+            # Default strong Llama 3.3 model on Groq
+            return "groq", model or "llama-3.3-70b-versatile"
+        print(f"Warning: Groq requested but not available. Falling back to OpenAI.")
+        # Do NOT use the llama model name for OpenAI, fallback to GPT default
+        return "openai", "gpt-4-turbo"
+    return "openai", model or "gpt-4-turbo"
+
+def _messages(system_prompt: str, user_prompt: str) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
+
+def query_llm(system_prompt: str, user_prompt: str, model: str = None, provider: str = "openai",
+              agent: str = None, temperature: float = 0.7, use_cache: bool = True) -> str:
     """
     Wrapper to call LLM APIs (OpenAI or Groq).
+    Identical requests within the agent's TTL are served from the response cache;
+    error responses are never cached.
     
     Args:
         system_prompt: The system instruction.
         user_prompt: The user query.
         model: Optional model name override.
         provider: 'openai' or 'groq'.
+        agent: Calling agent name, selects the cache TTL.
+        temperature: Sampling temperature (part of the cache key).
+        use_cache: Set False to always call the provider.
     """
-    active_client = client_openai
-    active_model = model
-    
-    # Provider Selection Logic
-    if provider == "groq":
-        if client_groq:
-            active_client = client_groq
-            if not active_model:
-                active_model = "llama-3.3-70b-versatile" # Default strong Llama 3.3 model on Groq
-        else:
-            print(f"Warning: Groq requested but not available. Falling back to OpenAI.")
-            active_client = client_openai
-            # Do NOT use the llama model name for OpenAI, fallback to GPT default
-            active_model = "gpt-4-turbo" 
-            
+    active_provider, active_model = _select_model(provider, model, client_groq is not None)
+    active_client = client_groq if active_provider == "groq" else client_openai
     if not active_client:
-        return "Error: No LLM Client initialized (Check API Keys)."
+        return _record_failure("Error: No LLM Client initialized (Check API Keys).")
+
+    with span("llm", cat="llm", agent=agent or "default", provider=active_provider, model=active_model,
+              prompt_chars=len(system_prompt) + len(user_prompt)) as current:
+        ttl = get_cache_ttl(agent) if use_cache else 0
+        cache_key = make_key(active_provider, active_model, temperature, system_prompt, user_prompt)
+        if ttl > 0:
+            cached = llm_cache.get(cache_key)
+            if cached is not None:
+                print(f"--- [LLM Client] Cache hit ({agent or 'default'}) : {active_model} ---")
+                current.set(cache="hit", response_chars=len(cached))
+                return cached
+        current.set(cache="miss" if ttl > 0 else "off")
 
-    if not active_model:
-         active_model = "gpt-4-turbo"
+        try:
+            print(f"--- [LLM Client] Querying {active_provider.upper()} : {active_model} ---")
+            start = time.perf_counter()
+            deadline_at = start + get_deadline(agent)
+            attempts_left = get_retry_budget(agent)
+            while True:
+                attempt_start = time.perf_counter()
+                try:
+                    response = active_client.with_options(
+                        timeout=deadline_at - attempt_start, max_retries=0
+                    ).chat.completions.create(
+                        model=active_model,
+                        messages=_messages(system_prompt, user_prompt),
+                        temperature=temperature
+                    )
+                    break
+                except Exception as e:
+                    if attempts_left <= 0 or time.perf_counter() + LLM_RETRY_BACKOFF >= deadline_at:
+                        raise
+                    attempts_left -= 1
+                    print(f"Warning: LLM attempt failed ({e}); retrying {active_model}")
+                    time.sleep(LLM_RETRY_BACKOFF)
+            latency_tracker.record(active_provider, active_model, time.perf_counter() - attempt_start)
+            content = response.choices[0].message.content
+            current.set(response_chars=len(content or ""))
+            if content:
+                llm_cache.put(cache_key, content, ttl, latency_s=time.perf_counter() - start)
+            return content
+        except Exception as e:
+            current.set(error=str(e))
+            print(f"Error calling LLM ({active_model}): {str(e)}")
+            # If Groq fails, maybe try OpenAI fallback automatically? 
+            # For now, just return error to avoid infinite loops or cost surprises.
+            return _record_failure(f"Error calling LLM: {str(e)}")
+
+# --- Async client ---
+# AsyncOpenAI clients share one pooled keep-alive httpx client per event loop
+# (httpx connections cannot outlive their loop, e.g. across dashboard reruns),
+# and a semaphore caps concurrent in-flight requests. Run entry points through
+# run_async so the pool is closed before its loop is.
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", 4))
+LLM_MAX_CONNECTIONS = int(os.environ.get("LLM_MAX_CONNECTIONS", 10))
+LLM_KEEPALIVE_EXPIRY = float(os.environ.get("LLM_KEEPALIVE_EXPIRY", 30))
+LLM_TIMEOUT = float(os.environ.get("LLM_TIMEOUT", 45))
+
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, Any]]" = weakref.WeakKeyDictionary()
+
+def _get_async_clients() -> Dict[str, Any]:
+    loop = asyncio.get_running_loop()
+    clients = _async_clients.get(loop)
+    if clients is None:
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_MAX_CONNECTIONS,
+                keepalive_expiry=LLM_KEEPALIVE_EXPIRY
+            ),
+            timeout=LLM_TIMEOUT
+        )
+        # inflight: cache key -> future of the request already being made for it
+        clients = {"http": http_client, "semaphore": asyncio.Semaphore(LLM_MAX_CONCURRENCY), "inflight": {},
+                   "openai": None, "groq": None}
+        if os.environ.get("OPENAI_API_KEY"):
+            clients["openai"] = AsyncOpenAI(api_key=os.environ.get("OPENAI_API_KEY"), http_client=http_client)
+        if os.environ.get("GROQ_API_KEY"):
+            clients["groq"] = AsyncOpenAI(
+                base_url=GROQ_BASE_URL,
+                api_key=os.environ.get("GROQ_API_KEY"),
+                http_client=http_client
+            )
+        _async_clients[loop] = clients
+    return clients
+
+async def aclose_async_clients():
+    """Closes the running loop's pooled connections; a later call on the loop opens a new pool."""
+    clients = _async_clients.pop(asyncio.get_running_loop(), None)
+    if clients is not None:
+        await clients["http"].aclose()
+
+def run_async(main: Awaitable[Any]) -> Any:
+    """asyncio.run(main) that also closes the loop's LLM connections before the loop ends."""
+    async def runner():
+        try:
+            return await main
+        finally:
+            await aclose_async_clients()
+    return asyncio.run(runner())
+
+async def aquery_llm(system_prompt: str, user_prompt: str, model: str = None, provider: str = "openai",
+                     agent: str = None, temperature: float = 0.7, use_cache: bool = True,
+                     fields: Iterable[str] = (), stream: bool = None) -> str:
+    """
+    Async variant of query_llm (same arguments, cache and error contract).
+    Concurrent calls share pooled connections and are limited to LLM_MAX_CONCURRENCY in flight.
+
+    With streaming on (stream=True, LLM_STREAM=1 or a stream listener in this context)
+    tokens and the JSON `fields` are published to listeners as they arrive;
+    the full text is still returned.
+    """
+    if stream is None:
+        stream = LLM_STREAM or bool(_stream_listeners.get())
+    if stream:
+        chunks = []
+        try:
+            async for token in astream_llm(system_prompt, user_prompt, model, provider, agent,
+                                           temperature, use_cache, fields):
+                chunks.append(token)
+        except Exception as e:
+            print(f"Error calling LLM ({model or provider}): {str(e)}")
+            return _record_failure(f"Error calling LLM: {str(e)}")
+        return "".join(chunks)
+
+    clients = _get_async_clients()
+    active_provider, active_model = _select_model(provider, model, clients["groq"] is not None)
+    active_client = clients[active_provider]
+    if not active_client:
+        return _record_failure("Error: No LLM Client initialized (Check API Keys).")
+
+    with span("llm", cat="llm", agent=agent or "default", provider=active_provider, model=active_model,
+              prompt_chars=len(system_prompt) + len(user_prompt)) as current:
+        ttl = get_cache_ttl(agent) if use_cache else 0
+        cache_key = make_key(active_provider, active_model, temperature, system_prompt, user_prompt)
+        if ttl > 0:
+            cached = llm_cache.get(cache_key)
+            if cached is not None:
+                print(f"--- [LLM Client] Cache hit ({agent or 'default'}) : {active_model} ---")
+                current.set(cache="hit", response_chars=len(cached))
+                return cached
+            # A cacheable request identical to one in flight (e.g. the same prompt from
+            # several concurrent scans) waits for that answer instead of calling again
+            pending = clients["inflight"].get(cache_key)
+            if pending is not None:
+                print(f"--- [LLM Client] Joining in-flight request ({agent or 'default'}) : {active_model} ---")
+                ok, content = await asyncio.shield(pending)
+                current.set(cache="coalesced", response_chars=len(content or ""))
+                return content if ok else _record_failure(content)
+        current.set(cache="miss" if ttl > 0 else "off")
+
+        pending = None
+        if ttl > 0:
+            pending = clients["inflight"][cache_key] = asyncio.get_running_loop().create_future()
+        outcome = (False, "Error calling LLM: request cancelled")
+        try:
+            print(f"--- [LLM Client] Querying {active_provider.upper()} (async) : {active_model} ---")
+            start = time.perf_counter()
+            answered_by, answered_model, content = await _hedged_completion(
+                clients, active_provider, active_model, _messages(system_prompt, user_prompt), temperature, agent)
+            current.set(response_chars=len(content or ""))
+            if (answered_by, answered_model) != (active_provider, active_model):
+                # The backup's answer is cached (and traced) as that provider's, never the primary's
+                current.set(provider=answered_by, model=answered_model, hedged_from=active_model)
+            if content:
+                llm_cache.put(make_key(answered_by, answered_model, temperature, system_prompt, user_prompt),
+                              content, ttl, latency_s=time.perf_counter() - start)
+            outcome = (True, content)
+            return content
+        except Exception as e:
+            current.set(error=str(e))
+            print(f"Error calling LLM ({active_model}): {str(e)}")
+            outcome = (False, f"Error calling LLM: {str(e)}")
+            return _record_failure(outcome[1])
+        finally:
+            if pending is not None:
+                clients["inflight"].pop(cache_key, None)
+                pending.set_result(outcome)
+
+async def _acomplete(clients: Dict[str, Any], provider: str, model: str, messages: List[Dict[str, str]],
+                     temperature: float, timeout: float, delay: float = 0.0) -> str:
+    """One attempt against one provider; records its latency on success."""
+    if delay:
+        await asyncio.sleep(delay)
+    with span("llm.attempt", cat="llm", provider=provider, model=model) as current:
+        queued = time.perf_counter()
+        async with clients["semaphore"]:
+            start = time.perf_counter()
+            # Time spent waiting for an LLM_MAX_CONCURRENCY slot
+            current.set(queued_ms=round((start - queued) * 1000, 1))
+            response = await clients[provider].with_options(timeout=timeout, max_retries=0).chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=temperature
+            )
+    latency_tracker.record(provider, model, time.perf_counter() - start)
+    return response.choices[0].message.content
+
+async def _hedged_completion(clients: Dict[str, Any], provider: str, model: str,
+                             messages: List[Dict[str, str]], temperature: float,
+                             agent: Optional[str]) -> Tuple[str, str, str]:
+    """
+    Answers one request within the agent's deadline. The primary is hedged to the
+    other provider once it exceeds its percentile latency (or fails); the first
+    answer wins and the loser is cancelled. Failed attempts are retried while the
+    retry budget and deadline allow.
+    Returns (provider, model, content) of the attempt that answered; each attempt
+    records its own latency under its provider and model (_acomplete).
+    """
+    loop = asyncio.get_running_loop()
+    deadline = get_deadline(agent)
+    deadline_at = loop.time() + deadline
+    retries_left = get_retry_budget(agent)
+    backup_provider = "openai" if provider == "groq" else "groq"
+    backup = None
+    if LLM_HEDGE and clients[backup_provider] is not None:
+        backup = _select_model(backup_provider, None, True)
+    hedge_at = loop.time() + get_hedge_delay(provider, model)
+    hedge_stats["calls"] += 1
+
+    pending: Dict[asyncio.Task, Tuple[str, str]] = {}
+
+    def launch(target: Tuple[str, str], delay: float = 0.0):
+        task = asyncio.create_task(_acomplete(clients, *target, messages, temperature,
+                                              deadline_at - loop.time(), delay))
+        pending[task] = target
+
+    launch((provider, model))
+    last_error: Optional[BaseException] = None
+    try:
+        while pending:
+            remaining = deadline_at - loop.time()
+            if remaining <= 0:
+                break
+            timeout = remaining if backup is None else min(remaining, max(0.0, hedge_at - loop.time()))
+            done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+            for task in done:
+                target = pending.pop(task)
+                if task.exception() is None:
+                    if target != (provider, model):
+                        hedge_stats["backup_wins"] += 1
+                        print(f"--- [LLM Client] Hedge won by {target[0].upper()} : {target[1]} ---")
+                    return (*target, task.result())
+                last_error = task.exception()
+                print(f"Warning: LLM attempt failed ({target[0]}:{target[1]}): {last_error}")
+                if backup is None and retries_left > 0 and deadline_at - loop.time() > LLM_RETRY_BACKOFF:
+                    retries_left -= 1
+                    hedge_stats["retries"] += 1
+                    launch(target, delay=LLM_RETRY_BACKOFF)
+
+            # Hedge on a slow or failed primary
+            if backup is not None and (loop.time() >= hedge_at or not pending):
+                hedge_stats["hedged"] += 1
+                print(f"--- [LLM Client] Hedging {provider.upper()} with {backup[0].upper()} : {backup[1]} ---")
+                launch(backup)
+                backup = None
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    if last_error is not None and deadline_at - loop.time() > 0:
+        raise last_error
+    hedge_stats["deadline_exceeded"] += 1
+    raise TimeoutError(f"no answer within the {deadline:.0f}s deadline ({agent or 'default'})")
+
+# --- Streaming ---
+# Listeners receive one dict per event while an answer streams in:
+#   {"type": "token", "agent", "text"}           every delta
+#   {"type": "field", "agent", "field", "value"} a requested JSON field is complete
+#   {"type": "done", "agent", "elapsed_ms", "cached"}
+LLM_STREAM = os.environ.get("LLM_STREAM", "0") == "1"
+
+# Listeners belong to the context that registered them (a dashboard session's script
+# thread, a CLI run) and reach the LLM calls of the tasks and worker threads it starts,
+# so concurrent sessions never receive each other's tokens.
+_stream_listeners: contextvars.ContextVar[Tuple[Callable[[Dict[str, Any]], None], ...]] = \
+    contextvars.ContextVar("stream_listeners", default=())
+
+def add_stream_listener(listener: Callable[[Dict[str, Any]], None]):
+    """Registers the listener for LLM calls made from the current context from now on."""
+    _stream_listeners.set(_stream_listeners.get() + (listener,))
+
+def remove_stream_listener(listener: Callable[[Dict[str, Any]], None]):
+    _stream_listeners.set(tuple(l for l in _stream_listeners.get() if l is not listener))
+
+@contextmanager
+def stream_listener(listener: Callable[[Dict[str, Any]], None]) -> Iterator[None]:
+    """Scopes a listener to the enclosed block (and the runs it starts)."""
+    token = _stream_listeners.set(_stream_listeners.get() + (listener,))
+    try:
+        yield
+    finally:
+        _stream_listeners.reset(token)
+
+def _emit(event: Dict[str, Any]):
+    for listener in _stream_listeners.get():
+        try:
+            listener(event)
+        except Exception as e:
+            print(f"Warning: stream listener failed: {e}")
+
+class _StreamPublisher:
+    """Turns deltas into token/field events for one answer."""
+
+    def __init__(self, agent: Optional[str], fields: Iterable[str]):
+        self.agent = agent or "default"
+        self.parser = JSONFieldStream(fields)
+        self.start = time.perf_counter()
+        self.chunks: List[str] = []
+
+    def feed(self, text: str):
+        self.chunks.append(text)
+        _emit({"type": "token", "agent": self.agent, "text": text})
+        for field, value in self.parser.feed(text).items():
+            print(f"--- [LLM Client] {self.agent}.{field} = {value!r} after "
+                  f"{(time.perf_counter() - self.start) * 1000:.0f} ms ---")
+            _emit({"type": "field", "agent": self.agent, "field": field, "value": value})
+
+    def done(self, cached: bool = False) -> float:
+        elapsed = time.perf_counter() - self.start
+        _emit({"type": "done", "agent": self.agent, "elapsed_ms": elapsed * 1000, "cached": cached})
+        return elapsed
+
+def _stream_setup(provider: str, model: Optional[str], has_groq: bool, agent: Optional[str],
+                  temperature: float, use_cache: bool, system_prompt: str, user_prompt: str):
+    active_provider, active_model = _select_model(provider, model, has_groq)
+    ttl = get_cache_ttl(agent) if use_cache else 0
+    cache_key = make_key(active_provider, active_model, temperature, system_prompt, user_prompt)
+    cached = llm_cache.get(cache_key) if ttl > 0 else None
+    return active_provider, active_model, ttl, cache_key, cached
+
+async def astream_llm(system_prompt: str, user_prompt: str, model: str = None, provider: str = "openai",
+                      agent: str = None, temperature: float = 0.7, use_cache: bool = True,
+                      fields: Iterable[str] = ()) -> AsyncIterator[str]:
+    """
+    Yields the answer as it is generated (a cache hit is yielded in one piece).
+    Same arguments as aquery_llm; the completed text is cached, and provider
+    errors are raised to the caller instead of being returned as text.
+    """
+    clients = _get_async_clients()
+    active_provider, active_model, ttl, cache_key, cached = _stream_setup(
+        provider, model, clients["groq"] is not None, agent, temperature, use_cache, system_prompt, user_prompt)
+    publisher = _StreamPublisher(agent, fields)
+    if cached is not None:
+        print(f"--- [LLM Client] Cache hit ({agent or 'default'}) : {active_model} ---")
+        with span("llm", cat="llm", agent=agent or "default", provider=active_provider, model=active_model,
+                  cache="hit", response_chars=len(cached), stream=True):
+            pass
+        publisher.feed(cached)
+        publisher.done(cached=True)
+        yield cached
+        return
+    active_client = clients[active_provider]
+    if not active_client:
+        raise RuntimeError("No LLM Client initialized (Check API Keys).")
+
+    # Streams are bounded by the agent's deadline but not hedged (tokens are already shown)
+    deadline = get_deadline(agent)
+    current = start_span("llm", cat="llm", agent=agent or "default", provider=active_provider, model=active_model,
+                         prompt_chars=len(system_prompt) + len(user_prompt), cache="miss" if ttl > 0 else "off",
+                         stream=True)
+    try:
+        async with clients["semaphore"]:
+            print(f"--- [LLM Client] Streaming {active_provider.upper()} (async) : {active_model} ---")
+            response = await active_client.with_options(timeout=deadline, max_retries=0).chat.completions.create(
+                model=active_model,
+                messages=_messages(system_prompt, user_prompt),
+                temperature=temperature,
+                stream=True
+            )
+            async for chunk in response:
+                if time.perf_counter() - publisher.start > deadline:
+                    await response.close()
+                    raise TimeoutError(f"no answer within the {deadline:.0f}s deadline ({agent or 'default'})")
+                text = chunk.choices[0].delta.content if chunk.choices else None
+                if text:
+                    publisher.feed(text)
+                    yield text
+    except BaseException as e:
+        finish_span(current, e)
+        raise
+    latency = publisher.done()
+    latency_tracker.record(active_provider, active_model, latency)
+    content = "".join(publisher.chunks)
+    current.set(response_chars=len(content))
+    finish_span(current)
+    if content:
+        llm_cache.put(cache_key, content, ttl, latency_s=latency)
+
+def stream_llm(system_prompt: str, user_prompt: str, model: str = None, provider: str = "openai",
+               agent: str = None, temperature: float = 0.7, use_cache: bool = True,
+               fields: Iterable[str] = ()) -> Iterator[str]:
+    """Blocking counterpart of astream_llm."""
+    active_provider, active_model, ttl, cache_key, cached = _stream_setup(
+        provider, model, client_groq is not None, agent, temperature, use_cache, system_prompt, user_prompt)
+    publisher = _StreamPublisher(agent, fields)
+    if cached is not None:
+        print(f"--- [LLM Client] Cache hit ({agent or 'default'}) : {active_model} ---")
+        with span("llm", cat="llm", agent=agent or "default", provider=active_provider, model=active_model,
+                  cache="hit", response_chars=len(cached), stream=True):
+            pass
+        publisher.feed(cached)
+        publisher.done(cached=True)
+        yield cached
+        return
+    active_client = client_groq if active_provider == "groq" else client_openai
+    if not active_client:
+        raise RuntimeError("No LLM Client initialized (Check API Keys).")
 
+    deadline = get_deadline(agent)
+    current = start_span("llm", cat="llm", agent=agent or "default", provider=active_provider, model=active_model,
+                         prompt_chars=len(system_prompt) + len(user_prompt), cache="miss" if ttl > 0 else "off",
+                         stream=True)
     try:
-        print(f"--- [LLM Client] Querying {provider.upper() if active_client == client_groq else 'OPENAI'} : {active_model} ---")
-        response = active_client.chat.completions.create(
+        print(f"--- [LLM Client] Streaming {active_provider.upper()} : {active_model} ---")
+        response = active_client.with_options(timeout=deadline, max_retries=0).chat.completions.create(
             model=active_model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt}
-            ],
-            temperature=0.7
+            messages=_messages(system_prompt, user_prompt),
+            temperature=temperature,
+            stream=True
         )
-        return response.choices[0].message.content
-    except Exception as e:
-        print(f"Error calling LLM ({active_model}): {str(e)}")
-        # If Groq fails, maybe try OpenAI fallback automatically? 
-        # For now, just return error to avoid infinite loops or cost surprises.
-        return f"Error calling LLM: {str(e)}"
+        for chunk in response:
+            if time.perf_counter() - publisher.start > deadline:
+                response.close()
+                raise TimeoutError(f"no answer within the {deadline:.0f}s deadline ({agent or 'default'})")
+            text = chunk.choices[0].delta.content if chunk.choices else None
+            if text:
+                publisher.feed(text)
+                yield text
+    except BaseException as e:
+        finish_span(current, e)
+        raise
+    latency = publisher.done()
+    latency_tracker.record(active_provider, active_model, latency)
+    content = "".join(publisher.chunks)
+    current.set(response_chars=len(content))
+    finish_span(current)
+    if content:
+        llm_cache.put(cache_key, content, ttl, latency_s=latency)
 
 def mock_query_llm(system_prompt: str, user_prompt: str) -> str:
     """Fallback for testing without API keys."""
@@ -0,0 +1,89 @@
+import os
+import time
+import sqlite3
+import threading
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from src.integration.llm_cache import LLM_CACHE_DIR
+
+# Successful-call latencies kept per (provider, model)
+LLM_LATENCY_WINDOW = int(os.environ.get("LLM_LATENCY_WINDOW", 200))
+# Below this many samples there is no percentile estimate
+LLM_LATENCY_MIN_SAMPLES = int(os.environ.get("LLM_LATENCY_MIN_SAMPLES", 5))
+
+DISK_SCHEMA = """
+CREATE TABLE IF NOT EXISTS latencies (
+    target TEXT NOT NULL,
+    latency_s REAL NOT NULL,
+    recorded_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_latencies_target ON latencies(target, recorded_at);
+"""
+
+
+class LatencyTracker:
+    """
+    Rolling window of LLM call latencies per (provider, model). Samples are
+    also written next to the response cache, so the hedge delay of a fresh
+    graph process is based on previous runs rather than a guess.
+    """
+
+    def __init__(self, window: int = LLM_LATENCY_WINDOW, cache_dir: str = LLM_CACHE_DIR):
+        self.window = window
+        self.db_file = os.path.join(cache_dir, 'latencies.db') if cache_dir else None
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if self.db_file and self._conn is None:
+            try:
+                os.makedirs(os.path.dirname(self.db_file), exist_ok=True)
+                self._conn = sqlite3.connect(self.db_file, check_same_thread=False, timeout=5)
+                self._conn.executescript(DISK_SCHEMA)
+            except sqlite3.Error as e:
+                print(f"Warning: LLM latency history unavailable: {e}")
+                self.db_file = None
+                self._conn = None
+        return self._conn
+
+    def _window(self, target: str) -> Deque[float]:
+        samples = self._samples.get(target)
+        if samples is None:
+            samples = deque(maxlen=self.window)
+            conn = self._connect()
+            if conn is not None:
+                rows = conn.execute(
+                    "SELECT latency_s FROM latencies WHERE target = ? ORDER BY recorded_at DESC LIMIT ?",
+                    (target, self.window)
+                ).fetchall()
+                samples.extend(row[0] for row in reversed(rows))
+            self._samples[target] = samples
+        return samples
+
+    def record(self, provider: str, model: str, seconds: float):
+        target = f"{provider}:{model}"
+        now = time.time()
+        with self._lock:
+            self._window(target).append(seconds)
+            conn = self._connect()
+            if conn is not None:
+                with conn:
+                    conn.execute("INSERT INTO latencies (target, latency_s, recorded_at) VALUES (?, ?, ?)",
+                                 (target, seconds, now))
+                    conn.execute(
+                        "DELETE FROM latencies WHERE target = ? AND recorded_at < "
+                        "(SELECT recorded_at FROM latencies WHERE target = ? ORDER BY recorded_at DESC LIMIT 1 OFFSET ?)",
+                        (target, target, self.window - 1)
+                    )
+
+    def percentile(self, provider: str, model: str, pct: float) -> Optional[float]:
+        """Latency (seconds) below which pct% of recent calls finished, or None without enough history."""
+        with self._lock:
+            samples = sorted(self._window(f"{provider}:{model}"))
+        if len(samples) < LLM_LATENCY_MIN_SAMPLES:
+            return None
+        index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+        return samples[index]
+
@@ -0,0 +1,295 @@
+# Offline stand-ins for every external dependency of the graph, for load testing.
+# OFFLINE_MODE=1 swaps DuckDuckGo, yfinance and Kite for the fakes below, and
+# `python -m src.integration.offline --port 8765` serves an OpenAI-compatible chat
+# endpoint with canned answers (point OPENAI_BASE_URL and GROQ_BASE_URL at it).
+import os
+import json
+import math
+import time
+import random
+import argparse
+import datetime
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+OFFLINE_MODE = os.environ.get("OFFLINE_MODE", "0") == "1"
+
+# Latency spec per fake provider, override with OFFLINE_LATENCY_<NAME>
+DEFAULT_LATENCIES = {
+    "search": "lognormal:400,0.5",
+    "market_data": "lognormal:150,0.3",
+    "kite": "fixed:50",
+}
+# Relative move of fake prices between calls
+OFFLINE_PRICE_JITTER = float(os.environ.get("OFFLINE_PRICE_JITTER", 0.002))
+
+_rng = random.Random(os.environ.get("OFFLINE_SEED"))
+_rng_lock = threading.Lock()
+
+
+def sample_latency(spec: str) -> float:
+    """
+    Seconds to wait for a spec in milliseconds:
+    'fixed:MS', 'uniform:LOW,HIGH' or 'lognormal:MEDIAN,SIGMA' (long right tail).
+    """
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",") if v]
+    with _rng_lock:
+        if kind == "fixed":
+            ms = values[0]
+        elif kind == "uniform":
+            ms = _rng.uniform(values[0], values[1])
+        elif kind == "lognormal":
+            ms = values[0] * math.exp(_rng.gauss(0, values[1]))
+        else:
+            raise ValueError(f"Unknown latency spec: {spec}")
+    return max(ms, 0.0) / 1000
+
+
+def _wait(provider: str):
+    time.sleep(sample_latency(os.environ.get(f"OFFLINE_LATENCY_{provider.upper()}", DEFAULT_LATENCIES[provider])))
+
+
+# --- DuckDuckGo ---
+HEADLINES = [
+    ("Moneycontrol", "Nifty ends flat as IT gains offset bank losses", "Benchmarks closed little changed; India VIX eased 2%."),
+    ("Economic Times", "FIIs turn net buyers for third straight session", "Foreign investors bought Rs 1,200 crore of Indian equities."),
+    ("Reuters", "Asian markets mixed ahead of US inflation data", "Investors stayed cautious before the CPI print."),
+    ("Business Standard", "RBI keeps repo rate unchanged", "The central bank held rates and kept its stance neutral."),
+    ("Mint", "India VIX jumps as election uncertainty builds", "Option writers cut exposure as implied volatility rose."),
+    ("CNBC-TV18", "Bank Nifty hits record high on credit growth", "Private lenders led gains after strong quarterly numbers."),
+    ("Reuters", "Crude oil slips on demand worries", "Brent fell below $80 a barrel, easing pressure on the rupee."),
+    ("Economic Times", "DIIs absorb FII selling in largecaps", "Domestic funds bought Rs 900 crore as foreign funds sold."),
+]
+
+
+class FakeDDGS:
+    """Stand-in for duckduckgo_search.DDGS (context manager with .news())."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def news(self, query: str, max_results: int = 5, **kwargs) -> List[Dict[str, str]]:
+        _wait("search")
+        with _rng_lock:
+            picked = _rng.sample(HEADLINES, min(max_results, len(HEADLINES)))
+        today = datetime.date.today().isoformat()
+        return [{"source": source, "title": title, "body": body, "date": today, "url": ""}
+                for source, title, body in picked]
+
+
+# --- yfinance ---
+class FakeTicker:
+    """Stand-in for yfinance.Ticker: jittered daily closes and no listed options (NSE behaviour)."""
+
+    BASE_PRICES = {
+        "^NSEI": 22000.0,
+        "^NSEBANK": 48000.0,
+        "^INDIAVIX": 14.0,
+        "NIFTY_FIN_SERVICE.NS": 21500.0,
+        "NIFTY_MID_SELECT.NS": 11000.0,
+    }
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+
+    def history(self, period: str = "1d", **kwargs) -> pd.DataFrame:
+        _wait("market_data")
+        base = self.BASE_PRICES.get(self.symbol, 100.0)
+        with _rng_lock:
+            close = base * (1 + _rng.gauss(0, OFFLINE_PRICE_JITTER))
+        return pd.DataFrame({"Close": [close]}, index=[pd.Timestamp.now()])
+
+    @property
+    def options(self) -> tuple:
+        return ()
+
+    def option_chain(self, expiry: str = None):
+        raise ValueError("No option chain offline")
+
+
+class FakeYFinance:
+    """Stands in for the yfinance module (only what the clients use)."""
+    Ticker = FakeTicker
+
+
+fake_yf = FakeYFinance()
+
+
+# --- Kite ---
+class FakeKiteConnect:
+    """Stand-in for kiteconnect.KiteConnect: instruments, quotes and accepted orders."""
+
+    EXCHANGE_NFO = "NFO"
+    VARIETY_REGULAR = "regular"
+    ORDER_TYPE_MARKET = "MARKET"
+    ORDER_TYPE_LIMIT = "LIMIT"
+    PRODUCT_NRML = "NRML"
+    VALIDITY_DAY = "DAY"
+
+    LOT_SIZES = {"NIFTY": 50, "BANKNIFTY": 15, "FINNIFTY": 40, "MIDCPNIFTY": 75}
+
+    def __init__(self, api_key: str = None, **kwargs):
+        self.api_key = api_key
+        self.access_token = None
+        self._order_seq = 0
+        self._lock = threading.Lock()
+
+    def login_url(self) -> str:
+        return "http://127.0.0.1/offline-login"
+
+    def set_access_token(self, access_token: str):
+        self.access_token = access_token
+
+    def generate_session(self, request_token: str, api_secret: str = None) -> Dict[str, str]:
+        return {"access_token": "offline-token"}
+
+    def quote(self, instruments) -> Dict[str, Dict[str, float]]:
+        _wait("kite")
+        return {inst: {"last_price": 100.0, "oi": 50000} for inst in instruments}
+
+    def instruments(self, exchange: str = None) -> List[Dict[str, Any]]:
+        _wait("kite")
+        return [{"name": name, "lot_size": lot, "segment": "NFO-OPT", "exchange": "NFO"}
+                for name, lot in self.LOT_SIZES.items()]
+
+    def place_order(self, **kwargs) -> str:
+        _wait("kite")
+        with self._lock:
+            self._order_seq += 1
+            return f"offline-{self._order_seq}"
+
+
+# --- OpenAI-compatible LLM endpoint ---
+# Canned answers by the agent's system prompt; one is picked at random per request
+CANNED_RESPONSES = {
+    "Risk Manager": [
+        '{"decision": "approved", "reason": "IV and sentiment support premium selling."}',
+        '{"decision": "approved", "reason": "Strikes are well outside the expected move."}',
+        '{"decision": "rejected", "reason": "Event risk ahead; delta exposure too high."}',
+    ],
+    "strategist": [
+        '{"strategy": "Short Strangle", "recommended_sigma": 1.0, "rationale": "Range-bound market with moderate IV.", "constraints": "Exit at 2x premium."}',
+        '{"strategy": "Iron Fly", "recommended_sigma": 1.0, "rationale": "Defined risk while volatility is elevated.", "constraints": "Wings 300 points."}',
+        '{"strategy": "Short Straddle", "recommended_sigma": 1.0, "rationale": "Low volatility, pinned market.", "constraints": "Hedge on a 1% move."}',
+    ],
+    "Portfolio Manager": [
+        '{"decision": "HOLD", "reason": "Spot within range; collect theta."}',
+        '{"decision": "ADJUST", "reason": "Spot moved 2% toward the short call."}',
+    ],
+    "market analyst": [
+        "Markets consolidated with steady FII flows and a softer VIX. Sentiment Tag: Neutral",
+        "Global cues are weak and VIX is rising into the event. Sentiment Tag: Volatile",
+        "Banks led a broad rally on strong credit growth. Sentiment Tag: Bullish",
+    ],
+}
+DEFAULT_RESPONSE = '{"decision": "HOLD", "reason": "Offline stand-in."}'
+
+
+def _pick_response(system_prompt: str, responses: Dict[str, List[str]]) -> str:
+    for marker, answers in responses.items():
+        if marker.lower() in system_prompt.lower():
+            with _rng_lock:
+                return _rng.choice(answers)
+    return DEFAULT_RESPONSE
+
+
+def make_llm_handler(latency: str, groq_latency: str, responses: Dict[str, List[str]]):
+    """Request handler class for /v1/chat/completions (plain and stream=True)."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            self._send_json({"object": "list", "data": [{"id": "offline", "object": "model"}]})
+
+        def do_POST(self):
+            try:
+                self._complete()
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # Client gave up, e.g. the losing side of a hedged request
+
+        def _complete(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            messages = body.get("messages", [])
+            system_prompt = next((m["content"] for m in messages if m.get("role") == "system"), "")
+            model = body.get("model", "offline")
+            content = _pick_response(system_prompt, responses)
+            delay = sample_latency(groq_latency if model.startswith("llama") else latency)
+
+            if body.get("stream"):
+                # A third of the latency before the first token, the rest spread over the chunks
+                time.sleep(delay / 3)
+                pieces = [content[i:i + 8] for i in range(0, len(content), 8)] or [""]
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for piece in pieces:
+                    chunk = {"id": "offline", "object": "chat.completion.chunk", "created": int(time.time()),
+                             "model": model, "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]}
+                    self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode())
+                    time.sleep(delay * 2 / 3 / len(pieces))
+                self._write_chunk(b"data: [DONE]\n\n")
+                self._write_chunk(b"")
+                return
+
+            time.sleep(delay)
+            self._send_json({
+                "id": "offline", "object": "chat.completion", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            })
+
+        def _write_chunk(self, data: bytes):
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        def _send_json(self, payload: Dict[str, Any]):
+            out = json.dumps(payload).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(out)))
+            self.end_headers()
+            self.wfile.write(out)
+
+    return Handler
+
+
+def start_llm_server(port: int = 0, latency: str = "lognormal:900,0.4", groq_latency: str = "lognormal:300,0.4",
+                     responses: Optional[Dict[str, List[str]]] = None) -> ThreadingHTTPServer:
+    """Starts the stand-in endpoint on a daemon thread; port 0 picks a free port (server.server_port)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_llm_handler(latency, groq_latency, responses or CANNED_RESPONSES))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline OpenAI-compatible LLM stand-in")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default="lognormal:900,0.4", help="OpenAI-model latency spec (ms)")
+    parser.add_argument("--groq-latency", default="lognormal:300,0.4", help="Llama/Groq-model latency spec (ms)")
+    parser.add_argument("--responses", help="JSON file {system prompt marker: [answers]} replacing the canned answers")
+    args = parser.parse_args()
+
+    responses = None
+    if args.responses:
+        with open(args.responses) as f:
+            responses = json.load(f)
+    server = start_llm_server(args.port, args.latency, args.groq_latency, responses)
+    print(f"Offline LLM endpoint on http://127.0.0.1:{server.server_port}/v1 (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -1,8 +1,51 @@
+import os
+import time
 import datetime
+import threading
 import pandas as pd
-import yfinance as yf
 import math
 from scipy.stats import norm
+from src.integration.offline import OFFLINE_MODE
+from src.observability.tracing import span
+
+if OFFLINE_MODE:
+    from src.integration.offline import fake_yf as yf
+else:
+    import yfinance as yf
+
+# Index underlyings with listed weekly options, and their Yahoo tickers
+INDEX_TICKERS = {
+    "NIFTY": "^NSEI",
+    "BANKNIFTY": "^NSEBANK",
+    "FINNIFTY": "NIFTY_FIN_SERVICE.NS",
+    "MIDCPNIFTY": "NIFTY_MID_SELECT.NS",
+}
+# NSE strike interval per underlying
+STRIKE_STEPS = {"NIFTY": 50, "BANKNIFTY": 100, "FINNIFTY": 50, "MIDCPNIFTY": 25}
+VIX_TICKER = "^INDIAVIX"
+
+# Spot/VIX closes are reused for QUOTE_CACHE_TTL seconds. Concurrent scans (one per
+# expiry in a batch) wait on a per-ticker lock instead of each calling yfinance.
+QUOTE_CACHE_TTL = float(os.environ.get("QUOTE_CACHE_TTL", 30))
+_quotes = {}
+_quote_locks = {}
+_quote_locks_guard = threading.Lock()
+
+def fetch_last_close(ticker_symbol):
+    """Latest daily close for a Yahoo ticker, or None when there is no data."""
+    with _quote_locks_guard:
+        lock = _quote_locks.setdefault(ticker_symbol, threading.Lock())
+    with lock:
+        cached = _quotes.get(ticker_symbol)
+        if cached and time.monotonic() - cached[1] < QUOTE_CACHE_TTL:
+            return cached[0]
+        with span("yfinance.history", cat="external", symbol=ticker_symbol):
+            hist = yf.Ticker(ticker_symbol).history(period="1d")
+        if hist.empty:
+            return None
+        price = float(hist['Close'].iloc[-1])
+        _quotes[ticker_symbol] = (price, time.monotonic())
+        return price
 
 # Standard NSE expiry is Thursday
 def get_next_thursday(date):
@@ -18,11 +61,7 @@ def get_available_expiry_dates(symbol="NIFTY"):
     (assumes NSE weekly contracts) to ensure UI has data.
     """
     try:
-        ticker_map = {
-            "NIFTY": "^NSEI",
-            "BANKNIFTY": "^NSEBANK"
-        }
-        ticker_symbol = ticker_map.get(symbol, "^NSEI")
+        ticker_symbol = INDEX_TICKERS.get(symbol, "^NSEI")
         ticker = yf.Ticker(ticker_symbol)
         
         # Get raw expirations (YYYY-MM-DD)
@@ -95,12 +134,13 @@ def generate_derived_chain(symbol, spot_price, vix, expiry_date):
     sigma = vix / 100.0 # Volatility from VIX
     
     strikes_data = []
-    # Round spot to nearest 50 for ATM strike
-    atm_strike = round(spot_price / 50) * 50
+    # Round spot to the underlying's strike interval for ATM strike
+    step = STRIKE_STEPS.get(symbol, 50)
+    atm_strike = round(spot_price / step) * step
     
-    # Generate wider range: ATM +/- 1000 points
+    # Generate wider range: ATM +/- 20 strikes
     for i in range(-20, 21):
-        strike = atm_strike + (i * 50)
+        strike = atm_strike + (i * step)
         
         # Calculate theoretical premiums
         ce_premium = black_scholes_price(spot_price, strike, T, r, sigma, "CE")
@@ -132,6 +172,7 @@ def generate_derived_chain(symbol, spot_price, vix, expiry_date):
         "symbol": symbol,
         "expiry": expiry_date,
         "spot_price": spot_price,
+        "vix": vix,
         "chain": strikes_data,
         "data_source": "DERIVED" # Explicit flag
     }
@@ -144,24 +185,19 @@ def fetch_option_chain(symbol="NIFTY", expiry_date_str=None):
     """
     print(f"--- [Option Chain] Fetching data for {symbol} via yfinance ---")
     
-    ticker_map = {
-        "NIFTY": "^NSEI",
-        "BANKNIFTY": "^NSEBANK"
-    }
-    ticker_symbol = ticker_map.get(symbol, "^NSEI")
+    ticker_symbol = INDEX_TICKERS.get(symbol, "^NSEI")
     start_time = datetime.datetime.now()
     
     # 1. Get Real Spot & VIX (Essential)
     try:
         ticker = yf.Ticker(ticker_symbol)
-        hist = ticker.history(period="1d")
-        if hist.empty:
+        spot_price = fetch_last_close(ticker_symbol)
+        if spot_price is None:
              raise Exception("No Spot Data")
-        spot_price = hist['Close'].iloc[-1]
         
-        vix_ticker = yf.Ticker("^INDIAVIX")
-        vix_hist = vix_ticker.history(period="1d")
-        vix = vix_hist['Close'].iloc[-1] if not vix_hist.empty else 15.0
+        vix = fetch_last_close(VIX_TICKER)
+        if vix is None:
+            vix = 15.0
         
         print(f"✅ Live Spot: {spot_price:.2f} | Live VIX: {vix:.2f}")
     except Exception as e:
@@ -0,0 +1,169 @@
+import os
+import re
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Prompt budget (system + user tokens) per agent; override with PROMPT_BUDGET_<AGENT>
+DEFAULT_PROMPT_BUDGET = int(os.environ.get("PROMPT_BUDGET", 1500))
+AGENT_PROMPT_BUDGETS = {
+    "strategist": 1200,
+    "risk_manager": 700,
+}
+# A trimmed chunk shorter than this is dropped rather than kept as a stub
+MIN_CHUNK_TOKENS = 40
+# Chunks sharing this fraction of their word 5-grams with an earlier chunk are duplicates
+DUPLICATE_OVERLAP = 0.8
+
+_encoding = None
+
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None and tiktoken is not None:
+        try:
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            print(f"Warning: tiktoken encoding unavailable, estimating tokens: {e}")
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Exact cl100k token count when tiktoken is installed, else ~4 chars per token."""
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return (len(text) + 3) // 4
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cuts text to max_tokens, preferring a sentence boundary."""
+    if count_tokens(text) <= max_tokens:
+        return text
+    encoding = _get_encoding()
+    max_tokens -= 2  # Room for the ellipsis
+    cut = encoding.decode(encoding.encode(text)[:max_tokens]) if encoding is not None else text[:max_tokens * 4]
+    sentence_end = max(cut.rfind(". "), cut.rfind(".\n"))
+    if sentence_end > len(cut) // 2:
+        cut = cut[:sentence_end + 1]
+    return cut.rstrip() + " ..."
+
+
+def get_prompt_budget(agent: Optional[str]) -> int:
+    if not agent:
+        return DEFAULT_PROMPT_BUDGET
+    override = os.environ.get(f"PROMPT_BUDGET_{agent.upper()}")
+    if override is not None:
+        return int(override)
+    return AGENT_PROMPT_BUDGETS.get(agent, DEFAULT_PROMPT_BUDGET)
+
+
+def _shingles(text: str) -> set:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < 5:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + 5]) for i in range(len(words) - 4)}
+
+
+class PromptContext:
+    """
+    Builds an agent's user prompt from named sections under a token budget.
+    Required sections are always kept. Other sections are filled by priority
+    (higher first; equal priorities take turns chunk by chunk), after dropping
+    chunks that overlap an earlier one. Every build is reported with its size.
+    """
+
+    def __init__(self, agent: str, system_prompt: str, budget: int = None):
+        self.agent = agent
+        self.system_prompt = system_prompt
+        self.budget = budget or get_prompt_budget(agent)
+        self.sections: List[Dict[str, Any]] = []
+        self.report: Dict[str, Any] = {}
+
+    def add(self, name: str, content: Union[str, Sequence[str]], title: str = None,
+            priority: int = 0, required: bool = False) -> "PromptContext":
+        """content is text or a ranked list of chunks (e.g. retrieved rules)."""
+        chunks = [content] if isinstance(content, str) else [c for c in content if c and c.strip()]
+        self.sections.append({"name": name, "title": title, "chunks": chunks,
+                              "priority": priority, "required": required})
+        return self
+
+    def _dedupe(self) -> int:
+        seen: List[set] = []
+        removed = 0
+        for section in self.sections:
+            if section["required"]:
+                continue
+            kept = []
+            for chunk in section["chunks"]:
+                shingles = _shingles(chunk)
+                if any(len(shingles & other) >= DUPLICATE_OVERLAP * len(shingles) for other in seen):
+                    removed += 1
+                    continue
+                seen.append(shingles)
+                kept.append(chunk)
+            section["chunks"] = kept
+        return removed
+
+    def _render(self, section: Dict[str, Any], chunks: List[str]) -> str:
+        body = "\n\n".join(chunks)
+        return f"{section['title']}:\n{body}" if section["title"] else body
+
+    def build(self) -> str:
+        """Returns the user prompt and records/prints the size report."""
+        original = sum(count_tokens(c) for s in self.sections for c in s["chunks"])
+        duplicates = self._dedupe()
+
+        system_tokens = count_tokens(self.system_prompt)
+        selected = {id(s): [] for s in self.sections}
+        used = system_tokens
+        for section in self.sections:
+            if section["required"]:
+                selected[id(section)] = list(section["chunks"])
+                used += count_tokens(self._render(section, section["chunks"])) + 1  # + separator
+
+        trimmed = 0
+        optional = [s for s in self.sections if not s["required"]]
+        for priority in sorted({s["priority"] for s in optional}, reverse=True):
+            group = [s for s in optional if s["priority"] == priority]
+            for rank in range(max((len(s["chunks"]) for s in group), default=0)):
+                for section in group:
+                    if rank >= len(section["chunks"]):
+                        continue
+                    chunk = section["chunks"][rank]
+                    # Title and separator are paid once, with the first chunk
+                    overhead = count_tokens(f"{section['title']}:\n") if section["title"] and rank == 0 else 1
+                    available = self.budget - used - overhead
+                    cost = count_tokens(chunk)
+                    if cost > available:
+                        trimmed += 1
+                        if available < MIN_CHUNK_TOKENS:
+                            continue
+                        chunk = truncate_to_tokens(chunk, available)
+                        cost = count_tokens(chunk)
+                    selected[id(section)].append(chunk)
+                    used += cost + overhead
+
+        parts = [self._render(s, selected[id(s)]) for s in self.sections if selected[id(s)]]
+        user_prompt = "\n\n".join(parts)
+
+        user_tokens = count_tokens(user_prompt)
+        self.report = {
+            "agent": self.agent,
+            "system_tokens": system_tokens,
+            "user_tokens": user_tokens,
+            "total_tokens": system_tokens + user_tokens,
+            "budget": self.budget,
+            "input_tokens": system_tokens + original,
+            "duplicates_removed": duplicates,
+            "chunks_trimmed": trimmed,
+            "sections": {s["name"]: sum(count_tokens(c) for c in selected[id(s)]) for s in self.sections},
+            "estimated": _get_encoding() is None,
+        }
+        print(f"--- [Prompt] {self.agent}: {self.report['total_tokens']} tokens "
+              f"(from {self.report['input_tokens']}, budget {self.budget}, "
+              f"{duplicates} duplicate / {trimmed} trimmed chunks) {self.report['sections']} ---")
+        return user_prompt
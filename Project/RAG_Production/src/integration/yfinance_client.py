@@ -1,4 +1,10 @@
-import yfinance as yf
+from src.integration.offline import OFFLINE_MODE
+from src.observability.tracing import span
+
+if OFFLINE_MODE:
+    from src.integration.offline import fake_yf as yf
+else:
+    import yfinance as yf
 
 def fetch_nifty_spot():
     """
@@ -10,7 +16,8 @@ def fetch_nifty_spot():
     try:
         nifty = yf.Ticker("^NSEI")
         # Get fast 1d history
-        hist = nifty.history(period="1d")
+        with span("yfinance.history", cat="external", symbol="^NSEI"):
+            hist = nifty.history(period="1d")
         if not hist.empty:
             price = hist['Close'].iloc[-1]
             return round(price, 2)
@@ -28,7 +35,8 @@ def fetch_india_vix():
     """
     try:
         vix = yf.Ticker("^INDIAVIX")
-        hist = vix.history(period="1d")
+        with span("yfinance.history", cat="external", symbol="^INDIAVIX"):
+            hist = vix.history(period="1d")
         if not hist.empty:
             price = hist['Close'].iloc[-1]
             return round(price, 2)
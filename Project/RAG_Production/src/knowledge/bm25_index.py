@@ -0,0 +1,165 @@
+import os
+import re
+import math
+import json
+import threading
+from collections import Counter
+from typing import Dict, List, Tuple, Iterable
+
+# Numbers (incl. decimals and %), words, and comparison operators are all terms,
+# so rules like "VIX > 20", "< 2 DTE" or "20 Delta" stay matchable.
+TOKEN_PATTERN = re.compile(r"\d+(?:\.\d+)?%?|[a-z]+|[<>]=?")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "if", "in", "is",
+    "it", "of", "on", "or", "that", "the", "this", "to", "was", "what", "when",
+    "which", "with", "you", "your", "how", "do", "does", "should", "i", "we",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def is_keyword_query(query: str) -> bool:
+    """
+    True for short, literal queries (numbers, operators or quoted phrases)
+    that BM25 answers well on its own, e.g. 'VIX > 20' or '"20 Delta"'.
+    """
+    stripped = query.strip()
+    if len(stripped) > 1 and stripped[0] == stripped[-1] == '"':
+        return True
+    tokens = tokenize(stripped)
+    if not tokens or len(tokens) > 6:
+        return False
+    return any(t[0].isdigit() or t[0] in "<>" for t in tokens)
+
+
+class BM25Index:
+    """
+    Compact in-memory inverted index (term -> {doc id: term frequency}) with
+    Okapi BM25 scoring, persisted as a single JSON file next to the vector store.
+    """
+
+    def __init__(self, index_file: str, k1: float = 1.5, b: float = 0.75):
+        self.index_file = index_file
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._loaded = False
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.doc_lengths: Dict[str, int] = {}
+        self.texts: Dict[str, str] = {}
+        self._total_length = 0
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        if not os.path.exists(self.index_file):
+            return
+        with open(self.index_file, 'r') as f:
+            data = json.load(f)
+        self.texts = data["texts"]
+        for doc_id, text in self.texts.items():
+            self._index(doc_id, text)
+
+    def _index(self, doc_id: str, text: str):
+        counts = Counter(tokenize(text))
+        for term, tf in counts.items():
+            self.postings.setdefault(term, {})[doc_id] = tf
+        length = sum(counts.values())
+        self.doc_lengths[doc_id] = length
+        self._total_length += length
+
+    def _unindex(self, doc_id: str):
+        text = self.texts.pop(doc_id, None)
+        if text is None:
+            return
+        for term in set(tokenize(text)):
+            docs = self.postings.get(term)
+            if docs is not None:
+                docs.pop(doc_id, None)
+                if not docs:
+                    del self.postings[term]
+        self._total_length -= self.doc_lengths.pop(doc_id, 0)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._load()
+            return len(self.texts)
+
+    def add(self, ids: List[str], texts: List[str], save: bool = True):
+        """Indexes (or re-indexes) documents."""
+        with self._lock:
+            self._load()
+            for doc_id, text in zip(ids, texts):
+                self._unindex(doc_id)
+                self.texts[doc_id] = text
+                self._index(doc_id, text)
+            if save:
+                self.save()
+
+    def remove(self, ids: Iterable[str], save: bool = True):
+        with self._lock:
+            self._load()
+            for doc_id in ids:
+                self._unindex(doc_id)
+            if save:
+                self.save()
+
+    def search(self, query: str, k: int = 3) -> List[Tuple[str, float]]:
+        """Top k (doc id, BM25 score) pairs for the query."""
+        with self._lock:
+            self._load()
+            n_docs = len(self.texts)
+            if not n_docs:
+                return []
+            avg_length = self._total_length / n_docs
+            scores: Dict[str, float] = {}
+            for term in set(tokenize(query)):
+                docs = self.postings.get(term)
+                if not docs:
+                    continue
+                idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+                for doc_id, tf in docs.items():
+                    norm = tf + self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def get_text(self, doc_id: str) -> str:
+        with self._lock:
+            self._load()
+            return self.texts.get(doc_id, "")
+
+    def save(self):
+        with self._lock:
+            os.makedirs(os.path.dirname(self.index_file), exist_ok=True)
+            tmp_file = self.index_file + ".tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump({"texts": self.texts}, f)
+            os.replace(tmp_file, self.index_file)
+
+
+def fuse_scores(keyword: List[Tuple[str, float]], vector: List[Tuple[str, float]],
+                k: int, alpha: float = 0.5) -> List[str]:
+    """
+    Blends min-max normalized BM25 and vector similarity scores.
+    alpha is the vector weight (0 = pure BM25, 1 = pure vector).
+    """
+    def normalize(results: List[Tuple[str, float]]) -> Dict[str, float]:
+        if not results:
+            return {}
+        values = [score for _, score in results]
+        low, high = min(values), max(values)
+        if high == low:
+            return {doc_id: 1.0 for doc_id, _ in results}
+        return {doc_id: (score - low) / (high - low) for doc_id, score in results}
+
+    keyword_scores = normalize(keyword)
+    vector_scores = normalize(vector)
+    combined = {
+        doc_id: (1 - alpha) * keyword_scores.get(doc_id, 0.0) + alpha * vector_scores.get(doc_id, 0.0)
+        for doc_id in set(keyword_scores) | set(vector_scores)
+    }
+    return sorted(combined, key=combined.get, reverse=True)[:k]
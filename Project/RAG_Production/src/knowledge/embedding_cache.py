@@ -0,0 +1,189 @@
+import os
+import re
+import hashlib
+import sqlite3
+import threading
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# Max number of cached vectors per model (~75 MB for 384-dim float32)
+EMBEDDING_CACHE_SIZE = int(os.environ.get("EMBEDDING_CACHE_SIZE", 50000))
+
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    slot INTEGER NOT NULL UNIQUE,
+    last_used INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_last_used ON entries(last_used);
+"""
+
+
+def normalize_text(text: str) -> str:
+    """Whitespace-insensitive form used for cache keys."""
+    return " ".join(text.split())
+
+
+class EmbeddingCache:
+    """
+    On-disk embedding cache for one model.
+
+    Vectors live in a memory-mapped float32 array of `capacity` rows; a small
+    SQLite index maps sha256(model id, normalized text) to a row and tracks
+    recency. When the array is full the least recently used row is reused.
+    """
+
+    def __init__(self, cache_dir: str, model_id: str, capacity: int = EMBEDDING_CACHE_SIZE):
+        self.cache_dir = cache_dir
+        self.model_id = model_id
+        self.capacity = capacity
+        slug = re.sub(r'[^A-Za-z0-9_.-]+', '_', model_id)
+        self.vectors_file = os.path.join(cache_dir, f"{slug}.f32")
+        self.index_file = os.path.join(cache_dir, f"{slug}.index.db")
+        self._lock = threading.Lock()
+        self._conn = None
+        self._vectors = None
+        self._dim = None
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, text: str, kind: str) -> str:
+        # Queries and documents are namespaced: some models embed them differently
+        raw = f"{self.model_id}\0{kind}\0{normalize_text(text)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._conn = sqlite3.connect(self.index_file, check_same_thread=False, isolation_level=None)
+            self._conn.executescript(INDEX_SCHEMA)
+            row = self._conn.execute("SELECT value FROM meta WHERE name = 'dim'").fetchone()
+            if row:
+                self._open_vectors(int(row[0]))
+        return self._conn
+
+    def _open_vectors(self, dim: int):
+        """Maps the vector file, (re)creating it when the shape changed."""
+        shape = (self.capacity, dim)
+        expected_size = self.capacity * dim * 4
+        if os.path.exists(self.vectors_file) and os.path.getsize(self.vectors_file) == expected_size:
+            self._vectors = np.memmap(self.vectors_file, dtype=np.float32, mode='r+', shape=shape)
+        else:
+            self._conn.execute("DELETE FROM entries")
+            self._vectors = np.memmap(self.vectors_file, dtype=np.float32, mode='w+', shape=shape)
+        self._conn.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('dim', ?)", (str(dim),))
+        self._dim = dim
+
+    def _tick(self, conn: sqlite3.Connection) -> int:
+        row = conn.execute("SELECT COALESCE(MAX(last_used), 0) FROM entries").fetchone()
+        return row[0] + 1
+
+    def get_many(self, texts: List[str], kind: str = "document") -> List[Optional[List[float]]]:
+        """Cached vectors for each text (None where missing)."""
+        keys = [self._key(text, kind) for text in texts]
+        results: List[Optional[List[float]]] = [None] * len(texts)
+        with self._lock:
+            conn = self._connect()
+            if self._vectors is None:
+                self.misses += len(texts)
+                return results
+            slots = {}
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                slots.update(conn.execute(
+                    f"SELECT key, slot FROM entries WHERE key IN ({placeholders})", batch
+                ).fetchall())
+            if slots:
+                conn.execute("BEGIN")
+                tick = self._tick(conn)
+                conn.executemany("UPDATE entries SET last_used = ? WHERE key = ?",
+                                 [(tick, key) for key in slots])
+                conn.execute("COMMIT")
+            for i, key in enumerate(keys):
+                slot = slots.get(key)
+                if slot is not None:
+                    results[i] = self._vectors[slot].tolist()
+        found = sum(1 for r in results if r is not None)
+        self.hits += found
+        self.misses += len(texts) - found
+        return results
+
+    def put_many(self, texts: List[str], vectors: List[List[float]], kind: str = "document"):
+        """
+        Stores vectors, evicting least recently used rows when full. Rows written by
+        this call are never evicted by it: past `capacity` new texts the rest of the
+        batch is left uncached.
+        """
+        if not texts:
+            return
+        with self._lock:
+            conn = self._connect()
+            if self._vectors is None:
+                self._open_vectors(len(vectors[0]))
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                tick = self._tick(conn)
+                used = conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+                for text, vector in zip(texts, vectors):
+                    key = self._key(text, kind)
+                    row = conn.execute("SELECT slot FROM entries WHERE key = ?", (key,)).fetchone()
+                    if row:
+                        slot = row[0]
+                    elif used < self.capacity:
+                        slot = conn.execute("SELECT COALESCE(MAX(slot), -1) + 1 FROM entries").fetchone()[0]
+                        used += 1
+                    else:
+                        row = conn.execute(
+                            "SELECT slot, key FROM entries WHERE last_used < ? ORDER BY last_used LIMIT 1", (tick,)
+                        ).fetchone()
+                        if row is None:
+                            break
+                        slot, evicted = row
+                        conn.execute("DELETE FROM entries WHERE key = ?", (evicted,))
+                    self._vectors[slot] = np.asarray(vector, dtype=np.float32)
+                    conn.execute("INSERT OR REPLACE INTO entries (key, slot, last_used) VALUES (?, ?, ?)",
+                                 (key, slot, tick))
+                self._vectors.flush()
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._connect().execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "capacity": self.capacity}
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that serves repeated document and query texts from an EmbeddingCache."""
+
+    def __init__(self, base: Embeddings, cache: EmbeddingCache):
+        self.base = base
+        self.cache = cache
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = self.cache.get_many(texts)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            # Embed each distinct (normalized) missing text once
+            unique = {}
+            for i in missing:
+                unique.setdefault(normalize_text(texts[i]), texts[i])
+            fresh_vectors = self.base.embed_documents(list(unique.values()))
+            self.cache.put_many(list(unique.values()), fresh_vectors)
+            fresh = dict(zip(unique.keys(), fresh_vectors))
+            for i in missing:
+                vectors[i] = fresh[normalize_text(texts[i])]
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = self.cache.get_many([text], kind="query")[0]
+        if vector is None:
+            vector = self.base.embed_query(text)
+            self.cache.put_many([text], [vector], kind="query")
+        return vector
@@ -0,0 +1,156 @@
+import os
+import sys
+import hashlib
+from typing import List, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# Embedding backend selection
+#   'minilm'    : sentence-transformers all-MiniLM-L6-v2 on PyTorch (default)
+#   'onnx-int8' : the same model exported to ONNX with int8 dynamic quantization,
+#                 run through onnxruntime on CPU
+EMBEDDING_BACKEND = os.environ.get("EMBEDDING_BACKEND", "minilm")
+HF_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+# Local model directory. For 'onnx-int8' it must contain model_quantized.onnx
+# (or model.onnx) and tokenizer.json; for 'minilm' it replaces the hub name.
+EMBEDDING_MODEL_PATH = os.environ.get(
+    "EMBEDDING_MODEL_PATH", os.path.join(os.getcwd(), 'models', 'all-MiniLM-L6-v2-onnx')
+)
+EMBEDDING_BATCH_SIZE = int(os.environ.get("EMBEDDING_BATCH_SIZE", 32))
+EMBEDDING_THREADS = int(os.environ.get("EMBEDDING_THREADS", os.cpu_count() or 1))
+MAX_SEQ_LENGTH = 256  # all-MiniLM-L6-v2 truncates at 256 word pieces
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    Sentence embeddings from an (optionally int8-quantized) ONNX export of a
+    sentence-transformers model: tokenizer.json + onnxruntime, mean pooling and
+    L2 normalization, matching the all-MiniLM-L6-v2 pipeline. No PyTorch needed.
+    """
+
+    def __init__(self, model_dir: str = EMBEDDING_MODEL_PATH, batch_size: int = EMBEDDING_BATCH_SIZE,
+                 threads: int = EMBEDDING_THREADS):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_file = os.path.join(model_dir, "model_quantized.onnx")
+        if not os.path.exists(model_file):
+            model_file = os.path.join(model_dir, "model.onnx")
+        if not os.path.exists(model_file):
+            raise FileNotFoundError(
+                f"No ONNX model in {model_dir}. Export one with: python -m src.knowledge.embeddings export {model_dir}"
+            )
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(model_file, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding()
+        self.batch_size = batch_size
+        self.model_file = model_file
+        # Names the file actually loaded (int8 or the fp32 fallback) and its content,
+        # since each export is its own vector space
+        digest = hashlib.sha256()
+        with open(model_file, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        self.model_id = f"onnx:{os.path.basename(model_file)}:{digest.hexdigest()[:16]}"
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            encodings = self.tokenizer.encode_batch(texts[start:start + self.batch_size])
+            input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+            attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+            feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+            if "token_type_ids" in self.input_names:
+                feeds["token_type_ids"] = np.zeros_like(input_ids)
+            token_embeddings = self.session.run(None, feeds)[0]
+
+            # Mean pooling over real tokens, then L2 normalize
+            mask = attention_mask[..., None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            vectors.extend(pooled.tolist())
+        return vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(list(texts))
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed([text])[0]
+
+
+def get_embedding_backend(name: str = None) -> Tuple[Embeddings, str]:
+    """
+    Builds the configured embedding backend.
+    Returns:
+        (embeddings, model_id). model_id identifies the vector space and is
+        used for embedding cache keys and the ingestion manifest.
+    """
+    name = name or EMBEDDING_BACKEND
+    if name == "onnx-int8":
+        embeddings = OnnxEmbeddings()
+        return embeddings, embeddings.model_id
+
+    if name == "minilm":
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+        try:
+            import torch
+            torch.set_num_threads(EMBEDDING_THREADS)
+        except ImportError:
+            pass
+        model_name = HF_MODEL_NAME
+        if os.environ.get("EMBEDDING_MODEL_PATH") and os.path.isdir(EMBEDDING_MODEL_PATH):
+            model_name = EMBEDDING_MODEL_PATH  # Fully offline
+        embeddings = HuggingFaceEmbeddings(
+            model_name=model_name,
+            encode_kwargs={"batch_size": EMBEDDING_BATCH_SIZE}
+        )
+        return embeddings, HF_MODEL_NAME
+
+    raise ValueError(f"Unknown embedding backend: {name}")
+
+
+def export_quantized_model(output_dir: str, model_name: str = HF_MODEL_NAME):
+    """
+    One-off export (needs torch + sentence-transformers + onnxruntime):
+    writes model.onnx, model_quantized.onnx (int8 dynamic quantization) and
+    tokenizer.json to output_dir, for use with EMBEDDING_BACKEND=onnx-int8.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+
+    os.makedirs(output_dir, exist_ok=True)
+    model = SentenceTransformer(model_name, device="cpu")
+    transformer = model[0].auto_model.eval()
+    tokenizer = model.tokenizer
+    tokenizer.save_pretrained(output_dir)
+
+    sample = tokenizer(["warm up"], return_tensors="pt")
+    onnx_file = os.path.join(output_dir, "model.onnx")
+    torch.onnx.export(
+        transformer,
+        (sample["input_ids"], sample["attention_mask"], sample["token_type_ids"]),
+        onnx_file,
+        input_names=["input_ids", "attention_mask", "token_type_ids"],
+        output_names=["last_hidden_state"],
+        dynamic_axes={name: {0: "batch", 1: "sequence"}
+                      for name in ["input_ids", "attention_mask", "token_type_ids", "last_hidden_state"]},
+        opset_version=14,
+    )
+    quantize_dynamic(onnx_file, os.path.join(output_dir, "model_quantized.onnx"), weight_type=QuantType.QInt8)
+    print(f"Exported {model_name} to {output_dir}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) >= 3 and sys.argv[1] == "export":
+        export_quantized_model(sys.argv[2])
+    else:
+        print("Usage: python -m src.knowledge.embeddings export <output_dir>")
@@ -0,0 +1,165 @@
+import os
+import time
+import queue
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Dict, List, Tuple, Any
+
+from pypdf import PdfReader
+
+# This module is imported by the parser worker processes, so it must stay
+# light: no embedding model or vector store imports here.
+
+# Pipeline sizing (overridable from the environment)
+INGEST_WORKERS = int(os.environ.get("INGEST_WORKERS", os.cpu_count() or 1))
+PAGES_PER_TASK = int(os.environ.get("INGEST_PAGES_PER_TASK", 16))
+EMBED_BATCH_SIZE = int(os.environ.get("INGEST_EMBED_BATCH_SIZE", 64))
+QUEUE_SIZE = int(os.environ.get("INGEST_QUEUE_SIZE", 8))
+
+_DONE = object()
+
+
+def parse_pages(pdf_path: str, start: int, end: int) -> List[Tuple[int, str]]:
+    """Worker: extracts text of pages [start, end) of one PDF."""
+    reader = PdfReader(pdf_path)
+    pages = []
+    for number in range(start, end):
+        try:
+            text = reader.pages[number].extract_text() or ""
+        except Exception as e:
+            print(f"Failed to parse page {number} of {pdf_path}: {e}")
+            text = ""
+        pages.append((number, text))
+    return pages
+
+
+def _put(target: queue.Queue, item, stop: threading.Event):
+    """Blocking put that gives up once another stage has failed."""
+    while not stop.is_set():
+        try:
+            target.put(item, timeout=0.2)
+            return
+        except queue.Full:
+            continue
+
+
+def _get(source: queue.Queue, stop: threading.Event):
+    while not stop.is_set():
+        try:
+            return source.get(timeout=0.2)
+        except queue.Empty:
+            continue
+    return _DONE
+
+
+def run_pipeline(files: List[Tuple[str, str]], splitter,
+                 embed_fn: Callable[[List[str]], List[List[float]]],
+                 write_fn: Callable[[List[str], List[str], List[Dict[str, Any]], List[List[float]]], None],
+                 workers: int = INGEST_WORKERS, pages_per_task: int = PAGES_PER_TASK,
+                 batch_size: int = EMBED_BATCH_SIZE, queue_size: int = QUEUE_SIZE) -> Dict[str, Any]:
+    """
+    Streams PDFs through parse -> split -> embed -> write.
+
+    Page ranges are parsed across a process pool (at most 2 x workers tasks in
+    flight), pages are split as they arrive, and chunks are embedded and
+    written in fixed-size batches. Bounded queues between the stages keep
+    peak memory flat regardless of corpus size.
+
+    Args:
+        files: (pdf_path, id_prefix) pairs. Chunk ids are '<prefix>-<page>-<n>'.
+        splitter: A LangChain text splitter (split_text is used per page).
+        embed_fn: Embeds a batch of texts.
+        write_fn: Stores a batch: (ids, texts, metadatas, embeddings).
+    Returns:
+        Dict with 'ids' (pdf_path -> chunk ids), 'pages', 'chunks' and 'seconds'.
+    """
+    started = time.perf_counter()
+    chunk_queue: queue.Queue = queue.Queue(maxsize=queue_size * batch_size)
+    write_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    errors: List[BaseException] = []
+    ids_by_file: Dict[str, List[str]] = {path: [] for path, _ in files}
+    counts = {"pages": 0, "chunks": 0}
+
+    def embed_stage():
+        try:
+            batch = []
+            while True:
+                item = _get(chunk_queue, stop)
+                if item is not _DONE:
+                    batch.append(item)
+                if batch and (item is _DONE or len(batch) >= batch_size):
+                    ids, texts, metadatas = (list(column) for column in zip(*batch))
+                    _put(write_queue, (ids, texts, metadatas, embed_fn(texts)), stop)
+                    batch = []
+                if item is _DONE:
+                    break
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            _put(write_queue, _DONE, stop)
+
+    def write_stage():
+        try:
+            while True:
+                item = _get(write_queue, stop)
+                if item is _DONE:
+                    break
+                write_fn(*item)
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+
+    embedder = threading.Thread(target=embed_stage, name="ingest-embed", daemon=True)
+    writer = threading.Thread(target=write_stage, name="ingest-write", daemon=True)
+    embedder.start()
+    writer.start()
+
+    tasks = []
+    prefixes = dict(files)
+    for path, _ in files:
+        total_pages = len(PdfReader(path).pages)
+        tasks.extend((path, start, min(start + pages_per_task, total_pages))
+                     for start in range(0, total_pages, pages_per_task))
+
+    try:
+        # Spawn, not fork: the parent usually has the embedding model loaded
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=max(1, workers), mp_context=context) as pool:
+            pending = {}
+            next_task = 0
+            while (next_task < len(tasks) or pending) and not stop.is_set():
+                while next_task < len(tasks) and len(pending) < 2 * max(1, workers):
+                    path, start, end = tasks[next_task]
+                    pending[pool.submit(parse_pages, path, start, end)] = path
+                    next_task += 1
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path = pending.pop(future)
+                    for page, text in future.result():
+                        counts["pages"] += 1
+                        for n, chunk in enumerate(splitter.split_text(text)):
+                            chunk_id = f"{prefixes[path]}-{page}-{n}"
+                            ids_by_file[path].append(chunk_id)
+                            counts["chunks"] += 1
+                            _put(chunk_queue, (chunk_id, chunk, {"source": path, "page": page}), stop)
+    except BaseException as e:
+        errors.append(e)
+        stop.set()
+    finally:
+        _put(chunk_queue, _DONE, stop)
+        embedder.join()
+        writer.join()
+
+    if errors:
+        raise errors[0]
+
+    return {
+        "ids": ids_by_file,
+        "pages": counts["pages"],
+        "chunks": counts["chunks"],
+        "seconds": time.perf_counter() - started,
+    }
@@ -0,0 +1,129 @@
+import os
+import json
+import tempfile
+import threading
+from typing import Dict, List, Optional, Tuple
+
+# Entries kept per index version; the least recently used are dropped beyond this
+RETRIEVAL_CACHE_MAX_ENTRIES = int(os.environ.get("RETRIEVAL_CACHE_MAX_ENTRIES", 5000))
+
+class RetrievalCache:
+    """
+    Retrieval results keyed by (query, k, index version), persisted as JSON.
+
+    The index version lives in its own small file and is bumped whenever the
+    collection changes; entries from an older version are never served.
+    The file is loaded once per index version and every later lookup is a
+    dictionary hit; long-lived processes (dashboard, scheduler, batch scans)
+    reload it only when another process bumps the version. At most max_entries
+    are kept, least recently used first out.
+    """
+
+    def __init__(self, cache_file: str, version_file: str, max_entries: int = RETRIEVAL_CACHE_MAX_ENTRIES):
+        self.cache_file = cache_file
+        self.version_file = version_file
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, int, int], List[str]] = {}
+        self._loaded_version = None
+        self._version = 0
+        self._version_mtime = None
+        self.hits = 0
+        self.misses = 0
+
+    def get_version(self) -> int:
+        """Current index version (re-read only when the version file changes)."""
+        try:
+            mtime = os.stat(self.version_file).st_mtime_ns
+        except FileNotFoundError:
+            return 0
+        if mtime != self._version_mtime:
+            try:
+                with open(self.version_file, 'r') as f:
+                    self._version = int(f.read().strip() or 0)
+            except ValueError:
+                self._version = 0
+            self._version_mtime = mtime
+        return self._version
+
+    def bump_version(self) -> int:
+        """Marks the collection as changed. Drops every cached entry."""
+        with self._lock:
+            version = self.get_version() + 1
+            os.makedirs(os.path.dirname(self.version_file), exist_ok=True)
+            with open(self.version_file, 'w') as f:
+                f.write(str(version))
+            self._entries.clear()
+            self._save()
+            self._loaded_version = version
+        return version
+
+    def get(self, query: str, k: int) -> Optional[List[str]]:
+        """Cached chunks for (query, k) at the current index version, or None."""
+        with self._lock:
+            self._load()
+            key = (query, k, self.get_version())
+            chunks = self._entries.pop(key, None)
+            if chunks is None:
+                self.misses += 1
+            else:
+                # Re-insert as most recently used (dicts keep insertion order)
+                self._entries[key] = chunks
+                self.hits += 1
+        return chunks
+
+    def put_many(self, entries: Dict[str, List[str]], k: int):
+        """Stores results for several queries and writes the cache file once."""
+        if not entries:
+            return
+        version = self.get_version()
+        with self._lock:
+            self._load()
+            for query, chunks in entries.items():
+                self._entries.pop((query, k, version), None)
+                self._entries[(query, k, version)] = list(chunks)
+            for key in list(self._entries)[:max(0, len(self._entries) - self.max_entries)]:
+                del self._entries[key]
+            self._save()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+    def _load(self):
+        """(Re)loads the file whenever the index version moved since the last load."""
+        current = self.get_version()
+        if self._loaded_version == current:
+            return
+        self._loaded_version = current
+        self._entries.clear()
+        if not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable retrieval cache: {e}")
+            return
+        version = data.get("index_version")
+        if version != current:
+            return
+        for query, k, chunks in data.get("entries", []):
+            self._entries[(query, k, version)] = chunks
+
+    def _save(self):
+        version = self.get_version()
+        data = {
+            "index_version": version,
+            "entries": [[query, k, chunks] for (query, k, v), chunks in self._entries.items() if v == version],
+        }
+        directory = os.path.dirname(self.cache_file)
+        os.makedirs(directory, exist_ok=True)
+        # A temporary file per writer, so two processes saving at once never share one
+        fd, tmp_file = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_file, self.cache_file)
+        except BaseException:
+            os.unlink(tmp_file)
+            raise
@@ -0,0 +1,234 @@
+import os
+import uuid
+import atexit
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+
+# Vector backend selection (both run in-process, persisted on disk):
+#   'chroma' : chromadb PersistentClient (HNSW index)
+#   'qdrant' : qdrant-client local mode (QdrantClient(path=...))
+VECTOR_BACKEND = os.environ.get("VECTOR_BACKEND", "chroma")
+# Qdrant local mode locks its storage folder for one process. Several processes
+# (e.g. concurrent main_graph.py runs) need a Qdrant server: set its URL here.
+QDRANT_URL = os.environ.get("QDRANT_URL")
+
+# (id, document, distance) - smaller distance = more similar
+Hit = Tuple[str, str, float]
+
+
+class VectorBackend(ABC):
+    """
+    Minimal collection API the knowledge layer needs. Embeddings are always
+    computed by the caller; backends only store and search vectors.
+    """
+
+    @abstractmethod
+    def upsert(self, collection: str, ids: List[str], embeddings: List[List[float]],
+               documents: List[str], metadatas: List[Dict[str, Any]]):
+        ...
+
+    @abstractmethod
+    def delete(self, collection: str, ids: List[str]):
+        ...
+
+    @abstractmethod
+    def get_ids(self, collection: str, ids: List[str] = None, where: Dict[str, Any] = None) -> List[str]:
+        """Ids that exist in the collection, restricted to `ids` and/or a metadata equality filter."""
+        ...
+
+    @abstractmethod
+    def get_documents(self, collection: str) -> Tuple[List[str], List[str]]:
+        """All (ids, documents) of a collection."""
+        ...
+
+    @abstractmethod
+    def query(self, collection: str, embeddings: List[List[float]], n_results: int) -> List[List[Hit]]:
+        """Nearest neighbours for each query embedding, in one call."""
+        ...
+
+    @abstractmethod
+    def count(self, collection: str) -> int:
+        ...
+
+    @abstractmethod
+    def list_collections(self) -> List[str]:
+        ...
+
+    @abstractmethod
+    def drop_collection(self, name: str):
+        ...
+
+
+class ChromaBackend(VectorBackend):
+    def __init__(self, path: str):
+        import chromadb
+        self.client = chromadb.PersistentClient(path=path)
+        self._collections = {}
+
+    def _collection(self, name: str):
+        if name not in self._collections:
+            self._collections[name] = self.client.get_or_create_collection(name, embedding_function=None)
+        return self._collections[name]
+
+    def upsert(self, collection, ids, embeddings, documents, metadatas):
+        self._collection(collection).upsert(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+
+    def delete(self, collection, ids):
+        if ids:
+            self._collection(collection).delete(ids=list(ids))
+
+    def get_ids(self, collection, ids=None, where=None):
+        if ids is not None and not ids:
+            return []
+        return self._collection(collection).get(ids=ids, where=where, include=[])["ids"]
+
+    def get_documents(self, collection):
+        stored = self._collection(collection).get(include=["documents"])
+        return stored["ids"], stored["documents"]
+
+    def query(self, collection, embeddings, n_results):
+        count = self._collection(collection).count()
+        if not count:
+            return [[] for _ in embeddings]
+        response = self._collection(collection).query(
+            query_embeddings=embeddings,
+            n_results=min(n_results, count),
+            include=["documents", "distances"]
+        )
+        return [list(zip(ids, documents, distances)) for ids, documents, distances
+                in zip(response["ids"], response["documents"], response["distances"])]
+
+    def count(self, collection):
+        return self._collection(collection).count()
+
+    def list_collections(self):
+        # Newer chromadb returns names, older returns Collection objects
+        return [getattr(c, "name", c) for c in self.client.list_collections()]
+
+    def drop_collection(self, name):
+        self.client.delete_collection(name)
+        self._collections.pop(name, None)
+
+
+class QdrantBackend(VectorBackend):
+    """
+    Qdrant embedded local mode, or a Qdrant server when QDRANT_URL is set.
+    Point ids must be UUIDs, so string ids are mapped with uuid5 and kept in the
+    payload ('_id') with the document text.
+    Collections are created on first write, using cosine distance.
+    """
+
+    def __init__(self, path: str):
+        from qdrant_client import QdrantClient, models
+        self.models = models
+        if QDRANT_URL:
+            self.client = QdrantClient(url=QDRANT_URL)
+        else:
+            try:
+                self.client = QdrantClient(path=path)
+            except RuntimeError as e:
+                if "already accessed" not in str(e):
+                    raise
+                raise RuntimeError(
+                    f"Qdrant storage at {path} is locked by another process. Local mode allows one "
+                    f"process at a time; run a Qdrant server and set QDRANT_URL for concurrent runs."
+                ) from e
+        # Release the storage lock before interpreter teardown
+        atexit.register(self.client.close)
+
+    @staticmethod
+    def _point_id(doc_id: str) -> str:
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, doc_id))
+
+    def _exists(self, collection: str) -> bool:
+        return self.client.collection_exists(collection)
+
+    def _filter(self, where: Optional[Dict[str, Any]]):
+        if not where:
+            return None
+        return self.models.Filter(must=[
+            self.models.FieldCondition(key=key, match=self.models.MatchValue(value=value))
+            for key, value in where.items()
+        ])
+
+    def upsert(self, collection, ids, embeddings, documents, metadatas):
+        if not ids:
+            return
+        if not self._exists(collection):
+            self.client.create_collection(
+                collection,
+                vectors_config=self.models.VectorParams(size=len(embeddings[0]), distance=self.models.Distance.COSINE)
+            )
+        metadatas = metadatas or [{} for _ in ids]
+        self.client.upsert(collection, points=[
+            self.models.PointStruct(id=self._point_id(doc_id), vector=list(vector),
+                                    payload={**(metadata or {}), "_id": doc_id, "document": document})
+            for doc_id, vector, document, metadata in zip(ids, embeddings, documents, metadatas)
+        ])
+
+    def delete(self, collection, ids):
+        if ids and self._exists(collection):
+            self.client.delete(collection, points_selector=self.models.PointIdsList(
+                points=[self._point_id(doc_id) for doc_id in ids]))
+
+    def _scroll(self, collection: str, where=None, payload=("_id",)) -> List[Any]:
+        points = []
+        offset = None
+        while True:
+            batch, offset = self.client.scroll(collection, scroll_filter=self._filter(where), limit=1000,
+                                               offset=offset, with_payload=list(payload), with_vectors=False)
+            points.extend(batch)
+            if offset is None:
+                return points
+
+    def get_ids(self, collection, ids=None, where=None):
+        if not self._exists(collection) or (ids is not None and not ids):
+            return []
+        if ids is None:
+            return [p.payload["_id"] for p in self._scroll(collection, where)]
+        points = self.client.retrieve(collection, ids=[self._point_id(doc_id) for doc_id in ids],
+                                      with_payload=True)
+        return [p.payload["_id"] for p in points
+                if not where or all(p.payload.get(key) == value for key, value in where.items())]
+
+    def get_documents(self, collection):
+        if not self._exists(collection):
+            return [], []
+        points = self._scroll(collection, payload=("_id", "document"))
+        return [p.payload["_id"] for p in points], [p.payload["document"] for p in points]
+
+    def query(self, collection, embeddings, n_results):
+        if not self._exists(collection):
+            return [[] for _ in embeddings]
+        responses = self.client.query_batch_points(collection, requests=[
+            self.models.QueryRequest(query=list(vector), limit=n_results, with_payload=["_id", "document"])
+            for vector in embeddings
+        ])
+        # Cosine similarity -> cosine distance
+        return [[(p.payload["_id"], p.payload["document"], 1.0 - p.score) for p in response.points]
+                for response in responses]
+
+    def count(self, collection):
+        if not self._exists(collection):
+            return 0
+        return self.client.count(collection, exact=True).count
+
+    def list_collections(self):
+        return [c.name for c in self.client.get_collections().collections]
+
+    def drop_collection(self, name):
+        if self._exists(name):
+            self.client.delete_collection(name)
+
+
+BACKENDS = {
+    "chroma": ChromaBackend,
+    "qdrant": QdrantBackend,
+}
+
+def open_backend(path: str, name: str = None) -> VectorBackend:
+    """Opens the configured vector backend persisted under `path`."""
+    name = name or VECTOR_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown vector backend: {name} (choose from {list(BACKENDS)})")
+    return BACKENDS[name](path)
@@ -1,81 +1,488 @@
 import os
-from typing import List
-from langchain_community.document_loaders import PyPDFLoader
+import json
+import time
+import uuid
+import hashlib
+import threading
+from datetime import datetime, timedelta
+from typing import List, Dict, Any, Tuple
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_chroma import Chroma
-from langchain_community.embeddings import HuggingFaceEmbeddings
+from src.knowledge.retrieval_cache import RetrievalCache
+from src.knowledge.embedding_cache import EmbeddingCache, CachedEmbeddings
+from src.knowledge.ingestion_pipeline import run_pipeline
+from src.knowledge.bm25_index import BM25Index, is_keyword_query, fuse_scores
+from src.knowledge.embeddings import get_embedding_backend
+from src.knowledge.vector_backends import VectorBackend, VECTOR_BACKEND, open_backend
+from src.observability.tracing import span
 
 # Define paths
 DATA_DIR = os.path.join(os.getcwd(), 'data')
-DB_DIR = os.path.join(os.getcwd(), 'chroma_db')
+# One directory per vector backend, so manifest, BM25 index and caches never mix
+DB_DIR = os.path.join(os.getcwd(), 'chroma_db' if VECTOR_BACKEND == 'chroma' else f'{VECTOR_BACKEND}_db')
+MANIFEST_FILE = os.path.join(DB_DIR, 'ingest_manifest.json')
+# Kept outside DB_DIR so it survives collection resets
+EMBEDDING_CACHE_DIR = os.path.join(os.getcwd(), 'embedding_cache')
 
-# Initialize Embedding Function (Local/Offline by default)
-embedding_function = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+# Strategy PDFs (and add_texts) go here. 'langchain' is the LangChain Chroma
+# default name, so stores built by earlier versions keep working.
+RULES_COLLECTION = "langchain"
 
-def ingest_documents():
-    """Reads PDFs from data folder and stores them in ChromaDB."""
-    documents = []
-    
+# Text splitter defaults (part of the ingestion manifest key)
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+
+# Fixed topics the strategist retrieves on every run.
+# Their results are precomputed whenever the collection changes.
+STRANGLE_TOPIC = "Short Strangle management"
+STRADDLE_TOPIC = "Short Straddle management"
+IRON_FLY_TOPIC = "Iron Fly strategy rules"
+PRECOMPUTED_TOPICS = [STRANGLE_TOPIC, STRADDLE_TOPIC, IRON_FLY_TOPIC]
+
+# Retrieval mode: 'hybrid' (BM25 + vector), 'vector' or 'keyword'
+RETRIEVAL_MODE = os.environ.get("RETRIEVAL_MODE", "hybrid")
+# Weight of the vector score when fusing with BM25 (0 = keyword only, 1 = vector only)
+HYBRID_ALPHA = float(os.environ.get("HYBRID_ALPHA", 0.5))
+# Candidates taken from each retriever per requested chunk before fusion
+HYBRID_CANDIDATES = 4
+
+# News lives in per-day collections ('news_YYYYMMDD'), separate from the rules
+# collection; partitions older than the TTL are dropped on every news write
+NEWS_COLLECTION_PREFIX = "news_"
+NEWS_TTL_DAYS = int(os.environ.get("NEWS_TTL_DAYS", 3))
+_legacy_news_checked = False
+
+# Keyword index over the same chunks as the vector collection
+bm25_index = BM25Index(os.path.join(DB_DIR, 'bm25_index.json'))
+_bm25_checked = False
+
+# Retrieval results keyed by (query, k, index version)
+retrieval_cache = RetrievalCache(
+    cache_file=os.path.join(DB_DIR, 'retrieval_cache.json'),
+    version_file=os.path.join(DB_DIR, 'index_version')
+)
+
+# Initialize Embedding Function (Local/Offline by default, backend from EMBEDDING_BACKEND)
+# Wrapped in a persistent cache so re-ingested chunks and repeated queries skip inference
+_embedding_backend, EMBEDDING_MODEL = get_embedding_backend()
+embedding_function = CachedEmbeddings(
+    _embedding_backend,
+    EmbeddingCache(EMBEDDING_CACHE_DIR, model_id=EMBEDDING_MODEL)
+)
+
+# Long-lived store handle shared by all callers (opened lazily, guarded by a lock)
+_vector_store = None
+_store_lock = threading.RLock()
+
+# Latency breakdown of the most recent query_strategy_rules call (milliseconds)
+_last_query_timings: Dict[str, float] = {}
+
+def get_vector_store() -> VectorBackend:
+    """Returns the shared vector backend (VECTOR_BACKEND), opening it on first use."""
+    global _vector_store
+    if _vector_store is None:
+        with _store_lock:
+            if _vector_store is None:
+                _vector_store = open_backend(DB_DIR)
+    return _vector_store
+
+def warm_up():
+    """Opens the store and runs one embedding so the first real query pays neither cost."""
+    if not os.path.exists(DB_DIR):
+        return
+    start = time.perf_counter()
+    get_vector_store()
+    embedding_function.embed_query("warm up")
+    print(f"--- [Vector Store] Warmed up in {(time.perf_counter() - start) * 1000:.0f} ms ---")
+
+def get_last_query_timings() -> Dict[str, float]:
+    """Returns the open/embed/search/total breakdown (ms) of the last query."""
+    return dict(_last_query_timings)
+
+def get_retrieval_cache_stats() -> Dict[str, int]:
+    """Hit/miss counters of the retrieval cache for this process."""
+    return retrieval_cache.stats()
+
+def ingest_documents(chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP, force: bool = False):
+    """
+    Reads PDFs from data folder and stores them in the vector store.
+    Incremental: a manifest records each file's content hash and chunking
+    parameters, so only new or changed files are parsed and embedded.
+    Chunks of changed or deleted files are removed first.
+    New files go through the streaming pipeline in ingestion_pipeline
+    (parallel page parsing, batched embedding and writes).
+    Args:
+        chunk_size / chunk_overlap: Splitter parameters (part of the manifest key).
+        force: Re-ingest every file regardless of the manifest.
+               Implied when the embedding model differs from the one that built the collection.
+    """
     # Check if data directory exists
     if not os.path.exists(DATA_DIR):
         os.makedirs(DATA_DIR)
         print(f"Created {DATA_DIR}. Please place PDFs there.")
         return
 
-    # Load PDFs
-    for file in os.listdir(DATA_DIR):
-        if file.endswith(".pdf"):
-            pdf_path = os.path.join(DATA_DIR, file)
-            print(f"Loading {file}...")
-            loader = PyPDFLoader(pdf_path)
-            documents.extend(loader.load())
+    manifest = _load_manifest()
+    files = manifest["files"]
+    if files and manifest.get("embedding_model", EMBEDDING_MODEL) != EMBEDDING_MODEL:
+        # Vectors from different models are not comparable: rebuild everything
+        print(f"Embedding model changed ({manifest['embedding_model']} -> {EMBEDDING_MODEL}). Re-ingesting all files.")
+        force = True
+    manifest["embedding_model"] = EMBEDDING_MODEL
+    pdfs = sorted(file for file in os.listdir(DATA_DIR) if file.endswith(".pdf"))
 
-    if not documents:
+    if not pdfs and not files:
         print("No documents found to ingest.")
         return
 
-    # Split text
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-    chunks = text_splitter.split_documents(documents)
-
-    # Store in Chroma
-    print(f"Storing {len(chunks)} chunks in ChromaDB...")
-    vector_store = Chroma.from_documents(
-        documents=chunks,
-        embedding=embedding_function,
-        persist_directory=DB_DIR
-    )
+    text_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    vector_store = get_vector_store()
+    changed = False
+
+    # Remove chunks of files that are gone
+    for file in [f for f in files if f not in pdfs]:
+        print(f"Removing chunks of deleted file {file}...")
+        with _store_lock:
+            _delete_file_chunks(vector_store, file, files.pop(file))
+        _save_manifest(manifest)
+        changed = True
+
+    # Work out which files need (re)ingestion and drop their stale chunks
+    to_ingest = []
+    for file in pdfs:
+        pdf_path = os.path.join(DATA_DIR, file)
+        digest = _file_sha256(pdf_path)
+        entry = files.get(file)
+        if (not force and entry and entry["sha256"] == digest
+                and entry["chunk_size"] == chunk_size and entry["chunk_overlap"] == chunk_overlap):
+            continue
+        with _store_lock:
+            _delete_file_chunks(vector_store, file, entry)
+        files.pop(file, None)
+        to_ingest.append((file, pdf_path, digest))
+
+    if to_ingest:
+        # Forget the old entries first so an interrupted run re-ingests these files
+        _save_manifest(manifest)
+        print(f"Ingesting {len(to_ingest)} file(s): {[file for file, _, _ in to_ingest]}")
+        result = run_pipeline(
+            files=[(pdf_path, f"{digest[:16]}-{chunk_size}-{chunk_overlap}") for _, pdf_path, digest in to_ingest],
+            splitter=text_splitter,
+            embed_fn=embedding_function.embed_documents,
+            write_fn=_write_batch
+        )
+        bm25_index.save()
+        print(f"Stored {result['chunks']} chunks from {result['pages']} pages in {result['seconds']:.1f}s")
+
+        # Chunk ids are deterministic, so a crash before this point is repaired
+        # by the next run upserting over the same ids
+        for file, pdf_path, digest in to_ingest:
+            files[file] = {
+                "sha256": digest,
+                "chunk_size": chunk_size,
+                "chunk_overlap": chunk_overlap,
+                "chunk_ids": result["ids"][pdf_path],
+            }
+        _save_manifest(manifest)
+        changed = True
+
+    if not changed:
+        print("Knowledge base is up to date.")
+        return
+
+    _on_collection_changed()
     print("Ingestion Complete.")
 
+def _write_batch(ids: List[str], texts: List[str], metadatas: List[dict], embeddings: List[List[float]]):
+    """Pipeline sink: upserts one pre-embedded batch into the collection."""
+    with _store_lock:
+        get_vector_store().upsert(RULES_COLLECTION, ids, embeddings, texts, metadatas)
+        bm25_index.add(ids, texts, save=False)
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _load_manifest() -> Dict[str, Any]:
+    if os.path.exists(MANIFEST_FILE):
+        with open(MANIFEST_FILE, 'r') as f:
+            return json.load(f)
+    return {"files": {}}
+
+def _save_manifest(manifest: Dict[str, Any]):
+    os.makedirs(DB_DIR, exist_ok=True)
+    tmp_file = MANIFEST_FILE + ".tmp"
+    with open(tmp_file, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_file, MANIFEST_FILE)
+
+def _delete_file_chunks(vector_store: VectorBackend, file: str, entry: Dict[str, Any] = None):
+    """Deletes a file's chunks by manifest ids, or by source path for pre-manifest ingestions."""
+    if entry and entry.get("chunk_ids"):
+        stale = entry["chunk_ids"]
+    else:
+        stale = vector_store.get_ids(RULES_COLLECTION, where={"source": os.path.join(DATA_DIR, file)})
+    if stale:
+        vector_store.delete(RULES_COLLECTION, stale)
+        bm25_index.remove(stale)
+
 def add_texts(texts: List[str], metadatas: List[dict] = None):
-    """Adds raw text data (e.g. news) to the vector store."""
+    """Adds raw text data to the rules collection (news goes through add_news)."""
     if not texts:
         return
         
-    print(f"Adding {len(texts)} text entries to ChromaDB...")
-    vector_store = Chroma(
-        persist_directory=DB_DIR,
-        embedding_function=embedding_function
-    )
-    vector_store.add_texts(texts=texts, metadatas=metadatas)
+    print(f"Adding {len(texts)} text entries to the vector store...")
+    ids = [str(uuid.uuid4()) for _ in texts]
+    embeddings = embedding_function.embed_documents(texts)
+    with _store_lock:
+        get_vector_store().upsert(RULES_COLLECTION, ids, embeddings, texts, metadatas or [{} for _ in texts])
+        bm25_index.add(ids, texts)
+    _on_collection_changed()
     print("Texts Added.")
 
-def query_strategy_rules(topic: str, k: int = 3) -> List[str]:
+def add_news(texts: List[str], metadatas: List[dict] = None, timestamp: datetime = None) -> int:
+    """
+    Adds news texts to today's news partition (a separate 'news_YYYYMMDD'
+    collection), never to the rules collection, so rule retrieval latency
+    does not grow with news volume.
+    Ids are content hashes, so a headline already stored in any live
+    partition is skipped. Partitions older than NEWS_TTL_DAYS are dropped.
+    Returns:
+        Number of new entries stored.
+    """
+    if not texts:
+        return 0
+    timestamp = timestamp or datetime.now()
+    metadatas = metadatas or [{} for _ in texts]
+
+    _purge_legacy_news()
+
+    # Dedupe within the batch, then against every live partition
+    entries = {}
+    for text, metadata in zip(texts, metadatas):
+        entries.setdefault(_content_id(text), (text, dict(metadata, ingested_at=timestamp.isoformat())))
+    with _store_lock:
+        vector_store = get_vector_store()
+        for name in _live_news_partitions(vector_store, timestamp):
+            for doc_id in vector_store.get_ids(name, ids=list(entries)):
+                entries.pop(doc_id, None)
+
+        if entries:
+            ids = list(entries)
+            documents = [entries[doc_id][0] for doc_id in ids]
+            vector_store.upsert(
+                _news_partition_name(timestamp),
+                ids,
+                embedding_function.embed_documents(documents),
+                documents,
+                [entries[doc_id][1] for doc_id in ids]
+            )
+    print(f"Stored {len(entries)} new of {len(texts)} news entries.")
+    evict_expired_news(timestamp)
+    return len(entries)
+
+def query_news(query: str, k: int = 5, now: datetime = None) -> List[str]:
+    """Top k news entries across the live partitions, most similar first."""
+    with _store_lock:
+        vector_store = get_vector_store()
+        partitions = _live_news_partitions(vector_store, now or datetime.now())
+        if not partitions:
+            return []
+        query_embedding = embedding_function.embed_query(query)
+        hits = []
+        for name in partitions:
+            hits.extend((distance, document) for _, document, distance
+                        in vector_store.query(name, [query_embedding], k)[0])
+    return [document for _, document in sorted(hits)[:k]]
+
+def evict_expired_news(now: datetime = None) -> List[str]:
+    """Drops news partitions older than NEWS_TTL_DAYS. Returns the dropped names."""
+    cutoff = _news_cutoff(now or datetime.now())
+    with _store_lock:
+        vector_store = get_vector_store()
+        expired = [name for name in _news_partitions(vector_store) if name < cutoff]
+        for name in expired:
+            vector_store.drop_collection(name)
+    if expired:
+        print(f"Evicted expired news partitions: {expired}")
+    return expired
+
+def _content_id(text: str) -> str:
+    return hashlib.sha256(" ".join(text.split()).lower().encode("utf-8")).hexdigest()[:32]
+
+def _news_partition_name(day: datetime) -> str:
+    return f"{NEWS_COLLECTION_PREFIX}{day:%Y%m%d}"
+
+def _news_partitions(vector_store: VectorBackend) -> List[str]:
+    return sorted(name for name in vector_store.list_collections() if name.startswith(NEWS_COLLECTION_PREFIX))
+
+def _news_cutoff(now: datetime) -> str:
+    """Oldest live partition name: today plus the NEWS_TTL_DAYS - 1 days before it."""
+    return _news_partition_name(now - timedelta(days=NEWS_TTL_DAYS - 1))
+
+def _live_news_partitions(vector_store: VectorBackend, now: datetime) -> List[str]:
+    cutoff = _news_cutoff(now)
+    return [name for name in _news_partitions(vector_store) if name >= cutoff]
+
+def _purge_legacy_news():
+    """Removes news that older versions wrote into the rules collection (once per process)."""
+    global _legacy_news_checked
+    if _legacy_news_checked:
+        return
+    _legacy_news_checked = True
+    with _store_lock:
+        vector_store = get_vector_store()
+        stale = vector_store.get_ids(RULES_COLLECTION, where={"type": "news"})
+        if not stale:
+            return
+        print(f"Moving out {len(stale)} legacy news entries from the rules collection...")
+        vector_store.delete(RULES_COLLECTION, stale)
+        bm25_index.remove(stale)
+    _on_collection_changed()
+
+def _on_collection_changed():
+    """Invalidates cached retrievals and precomputes the fixed strategy topics."""
+    version = retrieval_cache.bump_version()
+    print(f"Index version is now {version}. Precomputing {len(PRECOMPUTED_TOPICS)} strategy topics...")
+    query_strategy_rules_batch(PRECOMPUTED_TOPICS)
+
+def query_strategy_rules(topic: str, k: int = 3, mode: str = None) -> List[str]:
     """Retrieves top k relevant chunks for a given topic."""
-    
-    # Connect to existing DB
-    if not os.path.exists(DB_DIR):
-        print("Database not found. Please run ingestion first.")
-        return []
+    return query_strategy_rules_batch([topic], k=k, mode=mode)[topic]
+
+def query_strategy_rules_batch(topics: List[str], k: int = 3, mode: str = None,
+                               use_cache: bool = True) -> Dict[str, List[str]]:
+    """
+    Retrieves top k chunks for several topics in one round-trip.
+    All topics are embedded in a single batch and searched with one collection query.
+    Args:
+        topics: Query strings.
+        k: Chunks per topic.
+        mode: 'hybrid', 'vector' or 'keyword' (default: RETRIEVAL_MODE).
+        use_cache: Set False to bypass the retrieval cache (benchmarks).
+    Returns:
+        Dict mapping each topic to its list of chunk texts.
+    """
+    if not topics:
+        return {}
+    mode = mode or RETRIEVAL_MODE
+
+    start = time.perf_counter()
+    with span("retrieval", cat="vector", topics=len(topics), k=k, mode=mode) as current:
+        found = {}
+        for topic in topics if use_cache else []:
+            cached = retrieval_cache.get(f"{mode}:{topic}", k)
+            if cached is not None:
+                found[topic] = cached
+        missing = [topic for topic in topics if topic not in found]
+        current.set(cache_hits=len(found), cache_misses=len(missing))
+
+        if not missing:
+            _record_cache_hit(start)
+        elif not os.path.exists(DB_DIR):
+            print("Database not found. Please run ingestion first.")
+            return {topic: [] for topic in topics}
+        else:
+            fetched = {topic: [text for _, text in hits] for topic, hits in _search(missing, k, mode, start).items()}
+            retrieval_cache.put_many({f"{mode}:{topic}": chunks for topic, chunks in fetched.items()}, k)
+            found.update(fetched)
+
+    return {topic: found[topic] for topic in topics}
+
+def search_chunks(topics: List[str], k: int = 3, mode: str = None) -> Dict[str, List[Tuple[str, str]]]:
+    """Uncached retrieval returning ranked (chunk id, text) pairs per topic (benchmarks, attribution)."""
+    if not topics or not os.path.exists(DB_DIR):
+        return {topic: [] for topic in topics}
+    return _search(list(topics), k, mode or RETRIEVAL_MODE, time.perf_counter())
+
+def chunk_sources() -> Dict[str, str]:
+    """Chunk id -> source PDF file name, from the ingest manifest."""
+    return {chunk_id: file for file, entry in _load_manifest()["files"].items()
+            for chunk_id in entry.get("chunk_ids", [])}
+
+def _search(topics: List[str], k: int, mode: str, start: float) -> Dict[str, List[Tuple[str, str]]]:
+    """
+    Uncached retrieval, as ranked (chunk id, text) pairs per topic. Topics that need the vector side are embedded in one
+    batch and searched with one collection query; keyword-only topics
+    (mode='keyword', or literal queries like 'VIX > 20' in hybrid mode)
+    are answered from the BM25 index without embedding.
+    """
+    vector_store = get_vector_store()
+    _ensure_bm25_index(vector_store)
+    opened = time.perf_counter()
+
+    if mode == "keyword":
+        vector_topics = []
+    elif mode == "vector" or not len(bm25_index):
+        vector_topics = list(topics)
+    else:
+        vector_topics = [topic for topic in topics if not is_keyword_query(topic)]
+    fuse = mode == "hybrid" and len(bm25_index) > 0
+    candidates = k * HYBRID_CANDIDATES if fuse else k
+
+    print(f"Querying ({mode}) for: {topics}")
+    vector_hits: Dict[str, List[tuple]] = {}
+    texts: Dict[str, str] = {}
+    embedded = searched = opened
+    if vector_topics:
+        with span("embed_query", cat="vector", texts=len(vector_topics)):
+            query_embeddings = embedding_function.embed_documents(vector_topics)
+        embedded = time.perf_counter()
+        with span("vector.query", cat="vector", backend=VECTOR_BACKEND, queries=len(query_embeddings), candidates=candidates):
+            response = vector_store.query(RULES_COLLECTION, query_embeddings, candidates)
+        searched = time.perf_counter()
+        for topic, hits in zip(vector_topics, response):
+            texts.update((doc_id, document) for doc_id, document, _ in hits)
+            # Smaller distance = more similar; negate so higher is better
+            vector_hits[topic] = [(doc_id, -distance) for doc_id, _, distance in hits]
+
+    results = {}
+    for topic in topics:
+        if topic in vector_hits and not fuse:
+            ids = [doc_id for doc_id, _ in vector_hits[topic][:k]]
+        else:
+            keyword_hits = bm25_index.search(topic, candidates)
+            ids = fuse_scores(keyword_hits, vector_hits.get(topic, []), k, alpha=HYBRID_ALPHA)
+        results[topic] = [(doc_id, texts.get(doc_id) or bm25_index.get_text(doc_id)) for doc_id in ids]
+    finished = time.perf_counter()
+
+    _record_timings(start, opened, embedded, searched, finished)
+    return results
+
+def _ensure_bm25_index(vector_store: VectorBackend):
+    """Builds the BM25 index from the collection if it predates the index."""
+    global _bm25_checked
+    if _bm25_checked:
+        return
+    _bm25_checked = True
+    if len(bm25_index):
+        return
+    ids, documents = vector_store.get_documents(RULES_COLLECTION)
+    if ids:
+        print(f"Building BM25 index over {len(ids)} existing chunks...")
+        bm25_index.add(ids, documents)
 
-    vector_store = Chroma(
-        persist_directory=DB_DIR,
-        embedding_function=embedding_function
-    )
+def _record_cache_hit(start: float):
+    _last_query_timings.clear()
+    _last_query_timings.update({
+        "cache_hit": 1.0,
+        "total_ms": (time.perf_counter() - start) * 1000,
+    })
 
-    print(f"Querying for: {topic}")
-    results = vector_store.similarity_search(topic, k=k)
-    return [doc.page_content for doc in results]
+def _record_timings(start: float, opened: float, embedded: float, searched: float, finished: float):
+    _last_query_timings.clear()
+    _last_query_timings.update({
+        "open_ms": (opened - start) * 1000,
+        "embed_ms": (embedded - opened) * 1000,
+        "search_ms": (searched - embedded) * 1000,
+        "keyword_ms": (finished - searched) * 1000,
+        "total_ms": (finished - start) * 1000,
+    })
+    print(f"Retrieval timings (ms): open={_last_query_timings['open_ms']:.1f} "
+          f"embed={_last_query_timings['embed_ms']:.1f} search={_last_query_timings['search_ms']:.1f} "
+          f"keyword={_last_query_timings['keyword_ms']:.1f}")
 
 if __name__ == "__main__":
     # For testing purposes
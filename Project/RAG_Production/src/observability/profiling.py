@@ -0,0 +1,290 @@
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import threading
+import functools
+import contextvars
+import tracemalloc
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from src.observability.tracing import TRACE_DIR
+
+# Fraction of runs that are profiled (PROFILE=1 profiles every run)
+PROFILE_SAMPLE_RATE = 1.0 if os.environ.get("PROFILE") == "1" else float(os.environ.get("PROFILE_SAMPLE_RATE", 0))
+# Stack sampling period. 5 ms costs well under 1% CPU.
+PROFILE_INTERVAL_MS = float(os.environ.get("PROFILE_INTERVAL_MS", 5))
+# tracemalloc roughly doubles allocation cost; PROFILE_MEMORY=0 keeps only CPU samples
+PROFILE_MEMORY = os.environ.get("PROFILE_MEMORY", "1") == "1"
+PROFILE_DIR = os.environ.get("PROFILE_DIR", TRACE_DIR)
+PROFILE_TOP = int(os.environ.get("PROFILE_TOP", 15))
+
+# cProfile cannot be used here: Python allows one profiler per interpreter, the
+# graph runs nodes concurrently (tasks and worker threads), and tracing every call
+# is too slow to leave on. Instead a background thread samples all stacks and
+# attributes each sample to the node whose code is on the stack.
+_node_codes: Dict[Any, str] = {}
+_thread_nodes: Dict[int, List[str]] = defaultdict(list)
+_current_node: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("profiled_node", default=None)
+_run_profile: contextvars.ContextVar[Optional["RunProfile"]] = contextvars.ContextVar("run_profile", default=None)
+_active_lock = threading.Lock()
+_active: Optional["RunProfile"] = None
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class RunProfile:
+    """CPU samples and allocation peaks of one graph run, per node."""
+
+    def __init__(self, run_id: str, interval_ms: float = PROFILE_INTERVAL_MS, memory: bool = PROFILE_MEMORY):
+        self.run_id = run_id
+        self.interval = interval_ms / 1000
+        self.memory = memory
+        self.started_tracemalloc = False
+        self.stacks: Dict[str, Counter] = defaultdict(Counter)
+        self.active: Counter = Counter()
+        self.wall_ms: Dict[str, float] = defaultdict(float)
+        self.mem_base: Dict[str, int] = {}
+        self.mem_peak: Dict[str, int] = defaultdict(int)
+        self._mem_lock = threading.Lock()
+        self.samples = 0
+        self.top_allocations: List[Dict[str, Any]] = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample_loop, name="profiler", daemon=True)
+
+    def start(self):
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start(1)
+            self.started_tracemalloc = True
+        self._start = time.perf_counter()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.elapsed_ms = (time.perf_counter() - self._start) * 1000
+        if self.memory and tracemalloc.is_tracing():
+            stats = tracemalloc.take_snapshot().statistics("lineno")[:PROFILE_TOP]
+            self.top_allocations = [{"where": str(stat.traceback), "kb": stat.size / 1024, "count": stat.count}
+                                    for stat in stats]
+            if self.started_tracemalloc:
+                tracemalloc.stop()
+
+    def enter(self, node: str):
+        with self._mem_lock:
+            current = self._observe_memory()
+            if not self.active[node] and current is not None:
+                self.mem_base[node] = current
+            self.active[node] += 1
+
+    def exit(self, node: str, wall_ms: float):
+        with self._mem_lock:
+            self._observe_memory()
+            self.active[node] -= 1
+        self.wall_ms[node] += wall_ms
+
+    def _observe_memory(self) -> Optional[int]:
+        """
+        Credits tracemalloc's peak since the previous call, above each node's traced
+        memory at entry, to every node active in that interval, then resets the peak.
+        Called at each node entry and exit (and by the sampler), so the set of active
+        nodes is fixed within an interval; nodes running concurrently share their peaks.
+        Returns the current traced memory. Caller holds _mem_lock.
+        """
+        if not (self.memory and tracemalloc.is_tracing()):
+            return None
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        for node, count in list(self.active.items()):
+            if count > 0:
+                self.mem_peak[node] = max(self.mem_peak[node], peak - self.mem_base.get(node, peak))
+        return current
+
+    def _sample_loop(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            with self._mem_lock:
+                self._observe_memory()
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                node = None
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    if node is None:
+                        node = _node_codes.get(frame.f_code)
+                    frame = frame.f_back
+                tagged = list(_thread_nodes.get(ident, ()))
+                node = node or (tagged[-1] if tagged else None)
+                # Frames of the same node in another (unprofiled) run cannot be told apart
+                if node is None or not self.active[node]:
+                    continue
+                self.samples += 1
+                self.stacks[node][";".join(reversed(stack))] += 1
+
+    def report(self) -> Dict[str, Any]:
+        nodes = {}
+        for node in sorted(set(self.wall_ms) | set(self.stacks)):
+            stacks = self.stacks[node]
+            self_counts: Counter = Counter()
+            cumulative: Counter = Counter()
+            for stack, count in stacks.items():
+                frames = stack.split(";")
+                self_counts[frames[-1]] += count
+                for frame in set(frames):
+                    cumulative[frame] += count
+            samples = sum(stacks.values())
+            nodes[node] = {
+                "wall_ms": self.wall_ms.get(node, 0.0),
+                "samples": samples,
+                # On the event loop thread a suspended coroutine is off the stack, so this
+                # is CPU time; in worker threads it also includes blocking I/O
+                "sampled_ms": samples * self.interval * 1000,
+                "mem_peak_kb": self.mem_peak[node] / 1024 if self.memory else None,
+                "top_self": [[frame, count] for frame, count in self_counts.most_common(PROFILE_TOP)],
+                "top_cumulative": [[frame, count] for frame, count in cumulative.most_common(PROFILE_TOP)],
+            }
+        return {
+            "run_id": self.run_id,
+            "interval_ms": self.interval * 1000,
+            "elapsed_ms": getattr(self, "elapsed_ms", None),
+            "samples": self.samples,
+            "nodes": nodes,
+            "top_allocations": self.top_allocations,
+        }
+
+    def export(self, profile_dir: str = PROFILE_DIR) -> Dict[str, str]:
+        """
+        Writes <run_id>.profile.json (per-node summary and allocations) and
+        <run_id>.folded (collapsed stacks rooted at the node, for speedscope or
+        flamegraph.pl). Returns the artifact paths.
+        """
+        if not profile_dir:
+            return {}
+        os.makedirs(profile_dir, exist_ok=True)
+        summary_path = os.path.join(profile_dir, f"{self.run_id}.profile.json")
+        with open(summary_path, "w") as f:
+            json.dump(self.report(), f, indent=2, default=str)
+        folded_path = os.path.join(profile_dir, f"{self.run_id}.folded")
+        with open(folded_path, "w") as f:
+            for node, stacks in self.stacks.items():
+                for stack, count in stacks.items():
+                    f.write(f"{node};{stack} {count}\n")
+        return {"profile": summary_path, "folded": folded_path}
+
+    def summary(self) -> str:
+        lines = []
+        for node, data in sorted(self.report()["nodes"].items(), key=lambda item: -item[1]["sampled_ms"]):
+            memory = f" mem_peak={data['mem_peak_kb']:.0f} KB" if data["mem_peak_kb"] is not None else ""
+            hottest = data["top_self"][0][0] if data["top_self"] else "-"
+            lines.append(f"{node:<20} wall={data['wall_ms']:8.1f} ms sampled={data['sampled_ms']:7.1f} ms"
+                         f"{memory} hottest={hottest}")
+        return "\n".join(lines)
+
+
+def should_profile(force: bool = None) -> bool:
+    if force is not None:
+        return force
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+@contextmanager
+def profile_run(run_id: str = None, force: bool = None) -> Iterator[Optional[RunProfile]]:
+    """
+    Profiles the graph run inside the block when it is sampled (or force=True).
+    Yields the RunProfile, or None when this run is not profiled. Only one run
+    per process is profiled at a time; overlapping runs are skipped.
+    """
+    global _active
+    if not should_profile(force):
+        yield None
+        return
+    with _active_lock:
+        if _active is not None:
+            profile = None
+        else:
+            profile = _active = RunProfile(run_id or time.strftime("run-%Y%m%d-%H%M%S"))
+    if profile is None:
+        yield None
+        return
+    token = _run_profile.set(profile)
+    profile.start()
+    try:
+        yield profile
+    finally:
+        profile.stop()
+        _run_profile.reset(token)
+        with _active_lock:
+            _active = None
+
+
+def profiled(node: str) -> Callable:
+    """Marks a graph node function so samples and allocations are attributed to it."""
+    def decorator(func: Callable) -> Callable:
+        _node_codes[func.__code__] = node
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                profile = _run_profile.get()
+                if profile is None:
+                    return await func(*args, **kwargs)
+                token = _current_node.set(node)
+                profile.enter(node)
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    profile.exit(node, (time.perf_counter() - start) * 1000)
+                    _current_node.reset(token)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profile = _run_profile.get()
+            if profile is None:
+                return func(*args, **kwargs)
+            with _node_thread(node):
+                profile.enter(node)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    profile.exit(node, (time.perf_counter() - start) * 1000)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def _node_thread(node: Optional[str]):
+    """Tags the calling thread with the node for the sampler."""
+    if node is None:
+        yield
+        return
+    ident = threading.get_ident()
+    token = _current_node.set(node)
+    _thread_nodes[ident].append(node)
+    try:
+        yield
+    finally:
+        _thread_nodes[ident].pop()
+        if not _thread_nodes[ident]:
+            del _thread_nodes[ident]
+        _current_node.reset(token)
+
+
+async def run_in_thread(func: Callable, *args, **kwargs):
+    """asyncio.to_thread that keeps the worker thread's samples attributed to the calling node."""
+    node = _current_node.get()
+
+    def call():
+        with _node_thread(node):
+            return func(*args, **kwargs)
+    return await asyncio.to_thread(call)
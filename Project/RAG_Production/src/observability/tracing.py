@@ -0,0 +1,333 @@
+import os
+import json
+import time
+import asyncio
+import tempfile
+import threading
+import functools
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory locks (Windows); writes are still atomic renames
+    fcntl = None
+
+# TRACE=0 turns span recording off entirely
+TRACE_ENABLED = os.environ.get("TRACE", "1") == "1"
+# Where runs write their trace and the cumulative histograms. Empty disables export.
+TRACE_DIR = os.environ.get("TRACE_DIR", os.path.join(os.getcwd(), 'traces'))
+# Run trace format: 'chrome' (chrome://tracing, Perfetto) or 'json' (flat span list)
+TRACE_FORMAT = os.environ.get("TRACE_FORMAT", "chrome")
+# Long-lived processes keep only the most recent spans; the scheduler folds and
+# clears them every cycle (fold_histograms) so none are dropped from histograms.json
+TRACE_MAX_SPANS = int(os.environ.get("TRACE_MAX_SPANS", 50000))
+
+# Histogram bucket upper bounds in milliseconds
+HISTOGRAM_BOUNDS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, float("inf")]
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """One timed operation. Attributes hold sizes, cache hit/miss, provider, etc."""
+
+    __slots__ = ("name", "cat", "start_ns", "end_ns", "attrs", "lane", "parent", "error")
+
+    def __init__(self, name: str, cat: str, attrs: Dict[str, Any], lane: int, parent: Optional[str]):
+        self.name = name
+        self.cat = cat
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns = None
+        self.attrs = attrs
+        self.lane = lane
+        self.parent = parent
+        self.error = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.perf_counter_ns()) - self.start_ns) / 1e6
+
+    def to_dict(self, origin_ns: int) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "cat": self.cat,
+            "start_ms": (self.start_ns - origin_ns) / 1e6,
+            "duration_ms": self.duration_ms,
+            "lane": self.lane,
+            "parent": self.parent,
+            "error": self.error,
+            "attrs": self.attrs,
+        }
+
+
+class _NoSpan:
+    """Stands in for a Span when tracing is off, so callers can always call .set()."""
+
+    def set(self, **attrs):
+        pass
+
+
+NO_SPAN = _NoSpan()
+
+
+class Tracer:
+    """Collects finished spans in memory and exports them."""
+
+    def __init__(self, max_spans: int = TRACE_MAX_SPANS):
+        self.max_spans = max_spans
+        self.origin_ns = time.perf_counter_ns()
+        self.origin_wall = time.time()
+        self.spans: List[Span] = []
+        self._lanes: Dict[Any, int] = {}
+        self._lock = threading.Lock()
+
+    def lane(self) -> int:
+        """Small stable id per asyncio task or thread (one row in the trace viewer)."""
+        try:
+            key = asyncio.current_task()
+        except RuntimeError:
+            key = None
+        key = key if key is not None else threading.get_ident()
+        with self._lock:
+            return self._lanes.setdefault(id(key), len(self._lanes) + 1)
+
+    def record(self, span: Span):
+        with self._lock:
+            self.spans.append(span)
+            if len(self.spans) > self.max_spans:
+                del self.spans[:len(self.spans) - self.max_spans]
+
+    def reset(self):
+        self.drain()
+
+    def drain(self) -> List[Span]:
+        """Clears the tracer and returns the spans it held, atomically with respect to record()."""
+        with self._lock:
+            spans = self.spans
+            self.spans = []
+            self._lanes = {}
+            self.origin_ns = time.perf_counter_ns()
+            self.origin_wall = time.time()
+        return spans
+
+    def export_json(self, path: str):
+        with self._lock:
+            spans = [span.to_dict(self.origin_ns) for span in self.spans]
+        _write_json(path, {"started_at": self.origin_wall, "spans": spans})
+
+    def export_chrome(self, path: str):
+        """Chrome trace event format: open in chrome://tracing or ui.perfetto.dev."""
+        with self._lock:
+            events = [{
+                "name": span.name,
+                "cat": span.cat,
+                "ph": "X",
+                "ts": (span.start_ns - self.origin_ns) / 1e3,
+                "dur": (span.end_ns - span.start_ns) / 1e3,
+                "pid": os.getpid(),
+                "tid": span.lane,
+                "args": dict(span.attrs, **({"error": span.error} if span.error else {})),
+            } for span in self.spans]
+        _write_json(path, {"traceEvents": events, "displayTimeUnit": "ms"})
+
+    def histograms(self, cat: str = None) -> Dict[str, Dict[str, Any]]:
+        """{span name: {count, sum_ms, max_ms, buckets}} where buckets[i] counts spans <= HISTOGRAM_BOUNDS_MS[i]."""
+        with self._lock:
+            spans = list(self.spans)
+        return _histograms(spans, cat)
+
+
+def _histograms(spans: List[Span], cat: str = None) -> Dict[str, Dict[str, Any]]:
+    result: Dict[str, Dict[str, Any]] = {}
+    for span in spans:
+        if cat is None or span.cat == cat:
+            _observe(result.setdefault(span.name, _empty_histogram()), span.duration_ms)
+    return result
+
+
+def _empty_histogram() -> Dict[str, Any]:
+    return {"count": 0, "sum_ms": 0.0, "max_ms": 0.0, "buckets": [0] * len(HISTOGRAM_BOUNDS_MS)}
+
+
+def _observe(hist: Dict[str, Any], ms: float):
+    hist["count"] += 1
+    hist["sum_ms"] += ms
+    hist["max_ms"] = max(hist["max_ms"], ms)
+    for i, bound in enumerate(HISTOGRAM_BOUNDS_MS):
+        if ms <= bound:
+            hist["buckets"][i] += 1
+            break
+
+
+def histogram_percentile(hist: Dict[str, Any], pct: float) -> float:
+    """Bucket upper bound containing the pct-th percentile (max_ms for the open bucket)."""
+    target = hist["count"] * pct / 100
+    seen = 0
+    for bound, count in zip(HISTOGRAM_BOUNDS_MS, hist["buckets"]):
+        seen += count
+        if count and seen >= target:
+            return min(bound, hist["max_ms"])
+    return hist["max_ms"]
+
+
+def _write_json(path: str, payload: Dict[str, Any]):
+    """Writes to a temporary file and renames it over `path`, so readers never see a partial file."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(payload, f, default=str)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+@contextmanager
+def _file_lock(path: str) -> Iterator[None]:
+    """Exclusive lock on <path>.lock, held across processes for a read-modify-write of `path`."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".lock", "a") as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+tracer = Tracer()
+
+
+@contextmanager
+def span(name: str, cat: str = "internal", **attrs) -> Iterator[Span]:
+    """
+    Times the enclosed block as a child of the current span.
+    Yields the Span (NO_SPAN when tracing is off) so callers can add attributes.
+    """
+    if not TRACE_ENABLED:
+        yield NO_SPAN
+        return
+    parent = _current_span.get()
+    current = Span(name, cat, attrs, tracer.lane(), parent.name if parent else None)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.end_ns = time.perf_counter_ns()
+        _current_span.reset(token)
+        tracer.record(current)
+
+
+def traced(name: str = None, cat: str = "internal") -> Callable:
+    """Decorator form of span() for sync and async functions."""
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__name__
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name, cat):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name, cat):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def start_span(name: str, cat: str = "internal", **attrs) -> Span:
+    """
+    Starts a span without making it current, for work that spans yields
+    (generators), where a context variable cannot be reset reliably.
+    Close it with finish_span().
+    """
+    if not TRACE_ENABLED:
+        return NO_SPAN
+    parent = _current_span.get()
+    return Span(name, cat, attrs, tracer.lane(), parent.name if parent else None)
+
+
+def finish_span(current: Span, error: BaseException = None):
+    if current is NO_SPAN or current.end_ns is not None:
+        return
+    current.end_ns = time.perf_counter_ns()
+    if error is not None:
+        current.error = f"{type(error).__name__}: {error}"
+    tracer.record(current)
+
+
+def fold_histograms(trace_dir: str = TRACE_DIR, reset: bool = False):
+    """
+    Adds the node/external/llm/vector spans to histograms.json, the latency histograms
+    across runs. The read-modify-write holds a file lock, so concurrent processes do not
+    lose each other's counts. reset=True clears the tracer in the same step, so a
+    long-lived process can fold periodically without counting a span twice.
+    """
+    if not trace_dir or not TRACE_ENABLED:
+        return
+    spans = tracer.drain() if reset else list(tracer.spans)
+    if not spans:
+        return
+    histogram_path = os.path.join(trace_dir, "histograms.json")
+    with _file_lock(histogram_path):
+        cumulative = {}
+        if os.path.exists(histogram_path):
+            try:
+                with open(histogram_path) as f:
+                    cumulative = json.load(f).get("histograms", {})
+            except (OSError, ValueError) as e:
+                # Keep the unreadable file for inspection instead of overwriting the history
+                print(f"Warning: could not read {histogram_path}: {e}")
+                os.replace(histogram_path, f"{histogram_path}.{int(time.time())}.bad")
+        for cat in ("node", "external", "llm", "vector"):
+            for name, hist in _histograms(spans, cat).items():
+                merged = cumulative.setdefault(f"{cat}:{name}", _empty_histogram())
+                merged["count"] += hist["count"]
+                merged["sum_ms"] += hist["sum_ms"]
+                merged["max_ms"] = max(merged["max_ms"], hist["max_ms"])
+                merged["buckets"] = [a + b for a, b in zip(merged["buckets"], hist["buckets"])]
+        _write_json(histogram_path, {"bounds_ms": HISTOGRAM_BOUNDS_MS[:-1] + ["inf"], "histograms": cumulative})
+
+
+def export_run(run_id: str = None, trace_dir: str = TRACE_DIR) -> Optional[str]:
+    """
+    Writes this process's spans as <run_id>.trace.json (TRACE_FORMAT) and folds them
+    into histograms.json (fold_histograms). Returns the trace path.
+    """
+    if not trace_dir or not TRACE_ENABLED or not tracer.spans:
+        return None
+    run_id = run_id or time.strftime("run-%Y%m%d-%H%M%S")
+    trace_path = os.path.join(trace_dir, f"{run_id}.trace.json")
+    if TRACE_FORMAT == "json":
+        tracer.export_json(trace_path)
+    else:
+        tracer.export_chrome(trace_path)
+    fold_histograms(trace_dir)
+    return trace_path
+
+
+def summary(cat: str = "node") -> str:
+    """One line per span name: count, mean and bucketed p50/p95 for this process."""
+    lines = []
+    for name, hist in sorted(tracer.histograms(cat).items(), key=lambda item: -item[1]["sum_ms"]):
+        lines.append(f"{name:<24} n={hist['count']:<4} mean={hist['sum_ms'] / hist['count']:8.1f} ms "
+                     f"p50<={histogram_percentile(hist, 50):.0f} ms p95<={histogram_percentile(hist, 95):.0f} ms")
+    return "\n".join(lines)
@@ -0,0 +1,85 @@
+from typing import Any, Dict, List, Optional
+
+from src.quant_engine.risk_rules import build_facts
+
+
+def net_credit(order: Dict[str, Any], option_chain) -> Optional[float]:
+    """Premium collected for the whole order (sold minus bought, times quantity) at chain LTPs."""
+    legs = order.get("legs") or []
+    if option_chain is None or getattr(option_chain, "empty", True) or not legs:
+        return None
+    credit = 0.0
+    for leg in legs:
+        column = f"{leg.get('type', 'CE').lower()}_ltp"
+        if column not in option_chain:
+            return None
+        row = option_chain[option_chain["strike"] == leg["strike"]]
+        if row.empty:
+            return None
+        premium = float(row[column].iloc[0]) * (leg.get("quantity") or 0)
+        credit += premium if leg.get("action") == "SELL" else -premium
+    return credit
+
+
+def score_candidate(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Flattens one scan's final state into a comparable trade candidate."""
+    market_data = result.get("market_data") or {}
+    order = result.get("final_order") or {}
+    expiry = market_data.get("expiry_date")
+    candidate = {
+        "symbol": market_data.get("symbol") or result.get("symbol"),
+        "expiry": expiry.strftime("%d-%b-%Y") if hasattr(expiry, "strftime") else result.get("user_selected_expiry"),
+        "dte": market_data.get("days_to_expiry"),
+        "spot": market_data.get("spot_price"),
+        "iv": market_data.get("iv"),
+        "strategy": order.get("strategy") or (result.get("strategy_decision") or {}).get("strategy"),
+        "risk_status": result.get("risk_status"),
+        "legs": order.get("legs") or [],
+        "net_credit": None,
+        "margin_estimate": None,
+        "return_on_margin": None,
+        "annualized_return": None,
+        "net_delta": None,
+        "degraded": sorted((result.get("degraded") or {}).keys()),
+        "error": result.get("error"),
+    }
+    if not order.get("legs"):
+        return candidate
+
+    facts = build_facts(order, market_data, result.get("research_data"))
+    candidate["margin_estimate"] = facts["margin_estimate"]
+    candidate["net_delta"] = facts["net_delta"]
+    credit = net_credit(order, market_data.get("option_chain"))
+    candidate["net_credit"] = credit
+    if credit is not None and facts["margin_estimate"]:
+        rom = credit / facts["margin_estimate"]
+        candidate["return_on_margin"] = rom
+        candidate["annualized_return"] = rom * 365 / max(candidate["dte"] or 1, 1)
+    return candidate
+
+
+def rank_candidates(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Orders scan results best first: approved orders, then orders the risk manager
+    did not reach a clean verdict on, then rejected or failed scans. Within a group,
+    higher annualized return on margin wins (so short- and long-dated expiries compare
+    fairly), and runs with degraded nodes sort after clean ones.
+    """
+    def sort_key(candidate: Dict[str, Any]):
+        status = str(candidate.get("risk_status") or "").lower()
+        if candidate.get("error") or not candidate["legs"]:
+            group = 3
+        elif status == "approved":
+            group = 0
+        elif status == "rejected":
+            group = 2
+        else:
+            group = 1
+        annualized = candidate.get("annualized_return")
+        return (group, bool(candidate["degraded"]), -(annualized if annualized is not None else float("-inf")))
+
+    candidates = [score_candidate(result) for result in results]
+    candidates.sort(key=sort_key)
+    for rank, candidate in enumerate(candidates, start=1):
+        candidate["rank"] = rank
+    return candidates
@@ -1,3 +1,4 @@
+import os
 import random
 
 def get_current_market_data():
@@ -12,3 +13,27 @@ def get_current_market_data():
         "iv": 15,              # 15%
         "days_to_expiry": 5
     }
+
+# A new scan only replaces the previous market snapshot when it differs materially;
+# smaller moves keep the snapshot (and everything computed from it) as is
+SPOT_CHANGE_PCT = float(os.environ.get("SPOT_CHANGE_PCT", 0.3))
+VIX_CHANGE = float(os.environ.get("VIX_CHANGE", 0.5))
+
+def market_changes(previous, current):
+    """
+    Names of the inputs that moved beyond their threshold between two scans:
+    'spot', 'vix', 'chain' (new expiry, days to expiry or data source).
+    Everything counts as changed when there is no previous scan.
+    """
+    if not previous or previous.get("option_chain") is None:
+        return ["spot", "vix", "chain"]
+    changes = []
+    old_spot = previous.get("spot_price") or 0
+    if not old_spot or abs(current["spot_price"] - old_spot) / old_spot * 100 >= SPOT_CHANGE_PCT:
+        changes.append("spot")
+    if abs((current.get("iv") or 0) - (previous.get("iv") or 0)) >= VIX_CHANGE:
+        changes.append("vix")
+    if any(current.get(field) != previous.get(field)
+           for field in ("symbol", "expiry_date", "days_to_expiry", "data_source")):
+        changes.append("chain")
+    return changes
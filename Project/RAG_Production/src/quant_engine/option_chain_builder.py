@@ -1,3 +1,4 @@
+import threading
 import pandas as pd
 from datetime import datetime, timedelta
 from src.integration.kite_app import kite_client
@@ -62,6 +63,23 @@ def get_expiry_date(chain_df):
     # All options in the chain should have same expiry
     return chain_df['expiry'].iloc[0]
 
+# Lot sizes only change at contract rollovers, so the NFO dump (tens of thousands
+# of rows) is downloaded once per process instead of once per executor call
+_kite_lot_sizes = None
+_lot_sizes_lock = threading.Lock()
+
+def _load_kite_lot_sizes():
+    global _kite_lot_sizes
+    with _lot_sizes_lock:
+        if _kite_lot_sizes is None:
+            instruments = kite_client.get_instruments()
+            if not instruments:
+                return {}
+            df = pd.DataFrame(instruments)
+            df = df[df['lot_size'] > 0].drop_duplicates('name')
+            _kite_lot_sizes = {name: int(lot) for name, lot in zip(df['name'], df['lot_size'])}
+        return _kite_lot_sizes
+
 def get_lot_size(symbol="NIFTY"):
     """
     Gets the lot size for the given symbol from Kite instruments.
@@ -76,15 +94,9 @@ def get_lot_size(symbol="NIFTY"):
     
     # Try to fetch from Kite API first
     try:
-        instruments = kite_client.get_instruments()
-        if instruments:
-            df = pd.DataFrame(instruments)
-            symbol_data = df[df['name'] == symbol]
-            if not symbol_data.empty:
-                # Get lot_size from first instrument
-                lot_size = symbol_data['lot_size'].iloc[0]
-                if lot_size:
-                    return int(lot_size)
+        lot_size = _load_kite_lot_sizes().get(symbol)
+        if lot_size:
+            return lot_size
     except Exception as e:
         print(f"Could not fetch lot size from API: {e}")
     
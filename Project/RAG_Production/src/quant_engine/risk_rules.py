@@ -0,0 +1,248 @@
+import os
+import re
+import json
+import math
+import time
+import operator
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.quant_engine.greeks import R
+
+# Limits from the risk desk's rules and the strategy rules PDF (generate_mock_pdf.py);
+# override any rule set with RISK_RULES_FILE=rules.json
+RISK_MIN_IV = float(os.environ.get("RISK_MIN_IV", 11))
+# PDF: "Maintain total delta within +/- 0.10"
+RISK_MAX_NET_DELTA = float(os.environ.get("RISK_MAX_NET_DELTA", 0.10))
+# PDF: "Hard Exit if < 2 DTE (Days to Expiry) and Spot is within 1% of Short Strike"
+RISK_GAMMA_DTE = int(os.environ.get("RISK_GAMMA_DTE", 2))
+RISK_GAMMA_STRIKE_PCT = float(os.environ.get("RISK_GAMMA_STRIKE_PCT", 1))
+
+# House limits the PDF does not state: a breach escalates to the LLM instead of rejecting.
+# The margin limit fits one lot of a NIFTY or BANKNIFTY straddle or strangle (two naked
+# shorts, about 4.5 lakh at NIFTY 25,000 x 75).
+RISK_MAX_MARGIN = float(os.environ.get("RISK_MAX_MARGIN", 500000))
+RISK_MAX_STRIKE_DISTANCE_PCT = float(os.environ.get("RISK_MAX_STRIKE_DISTANCE_PCT", 10))
+RISK_MAX_DTE = int(os.environ.get("RISK_MAX_DTE", 45))
+# Approximate SPAN + exposure margin for a naked short, as a fraction of notional
+NAKED_MARGIN_RATE = 0.12
+
+# Each rule fires when all of its conditions hold: [fact, op, value], where a value
+# of "$fact" compares against another fact. 'reject' rules decide on their own;
+# 'escalate' rules (and any condition on a missing fact) send the order to the LLM.
+RISK_RULES: List[Dict[str, Any]] = [
+    {"id": "no_legs", "if": [["legs", "==", 0]], "then": "reject",
+     "reason": "Order has no legs"},
+    {"id": "min_iv", "if": [["iv", "<", RISK_MIN_IV]], "then": "reject",
+     "reason": "IV {iv}% is below {RISK_MIN_IV}%: premium too thin for the risk"},
+    {"id": "strangle_volatile", "if": [["strategy", "==", "Short Strangle"], ["sentiment", "==", "Volatile"]],
+     "then": "reject", "reason": "Short Strangle in a Volatile market carries too much delta risk"},
+    {"id": "strike_distance", "if": [["max_strike_distance_pct", ">", RISK_MAX_STRIKE_DISTANCE_PCT]],
+     "then": "escalate", "reason": "A strike is {max_strike_distance_pct:.1f}% away from spot {spot}"},
+    {"id": "short_call_itm", "if": [["strategy", "==", "Short Strangle"], ["short_call_strike", "<", "$spot"]],
+     "then": "reject", "reason": "Short call {short_call_strike} is in the money (spot {spot})"},
+    {"id": "short_put_itm", "if": [["strategy", "==", "Short Strangle"], ["short_put_strike", ">", "$spot"]],
+     "then": "reject", "reason": "Short put {short_put_strike} is in the money (spot {spot})"},
+    {"id": "net_delta", "if": [["abs_net_delta", ">", RISK_MAX_NET_DELTA]], "then": "reject",
+     "reason": "Net delta {net_delta:+.2f} per unit exceeds +/-{RISK_MAX_NET_DELTA}"},
+    {"id": "gamma_exit", "if": [["dte", "<", RISK_GAMMA_DTE], ["short_strike_distance_pct", "<", RISK_GAMMA_STRIKE_PCT]],
+     "then": "reject", "reason": "{dte} days to expiry with spot {spot} within {short_strike_distance_pct:.2f}% "
+                                 "of a short strike (gamma risk exit)"},
+    {"id": "margin", "if": [["margin_estimate", ">", RISK_MAX_MARGIN]], "then": "escalate",
+     "reason": "Estimated margin {margin_estimate:,.0f} exceeds {RISK_MAX_MARGIN:,.0f}"},
+    {"id": "expiry_day_naked", "if": [["dte", "<", 1], ["naked_short", "==", True]], "then": "escalate",
+     "reason": "Naked short on expiry day (gamma risk)"},
+    {"id": "sentiment_unknown", "if": [["strategy", "==", "Short Strangle"], ["sentiment", "==", None]],
+     "then": "escalate", "reason": "No sentiment tag to rule out a Volatile market"},
+    {"id": "long_dated", "if": [["dte", ">", RISK_MAX_DTE]], "then": "escalate",
+     "reason": "{dte} days to expiry is outside the weekly/monthly playbook"},
+]
+
+OPERATORS: Dict[str, Callable[[Any, Any], bool]] = {
+    "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge,
+    "==": operator.eq, "!=": operator.ne,
+}
+
+SENTIMENT_TAGS = ("Bullish", "Bearish", "Neutral", "Volatile")
+_SENTIMENT_TAG_RE = re.compile(r"sentiment\s*tag\W*(%s)" % "|".join(SENTIMENT_TAGS), re.IGNORECASE)
+
+_MISSING = object()
+
+
+def _compile_condition(fact: str, op: str, value: Any) -> Tuple[Callable[[Dict[str, Any]], Any], List[str]]:
+    """Returns (predicate, facts it reads). The predicate returns _MISSING if a fact is absent."""
+    compare = OPERATORS[op]
+    if isinstance(value, str) and value.startswith("$"):
+        other = value[1:]
+
+        def predicate(facts: Dict[str, Any]):
+            left, right = facts.get(fact), facts.get(other)
+            if left is None or right is None:
+                return _MISSING
+            return compare(left, right)
+        return predicate, [fact, other]
+
+    if value is None:
+        # Explicit test for a missing fact
+        return (lambda facts: compare(facts.get(fact), None)), [fact]
+
+    def predicate(facts: Dict[str, Any]):
+        left = facts.get(fact)
+        if left is None:
+            return _MISSING
+        return compare(left, value)
+    return predicate, [fact]
+
+
+def compile_rules(rules: List[Dict[str, Any]]) -> List[Tuple[str, str, str, List[Callable], List[str]]]:
+    """Turns the rule table into (id, verdict, reason, predicates, facts) once, at import."""
+    compiled = []
+    for rule in rules:
+        if rule["then"] not in ("reject", "escalate"):
+            raise ValueError(f"Unknown verdict for risk rule {rule['id']}: {rule['then']}")
+        predicates, reads = [], []
+        for fact, op, value in rule["if"]:
+            predicate, facts = _compile_condition(fact, op, value)
+            predicates.append(predicate)
+            reads.extend(facts)
+        compiled.append((rule["id"], rule["then"], rule["reason"], predicates, reads))
+    return compiled
+
+
+def load_rules() -> List[Dict[str, Any]]:
+    path = os.environ.get("RISK_RULES_FILE")
+    if path:
+        with open(path) as f:
+            return json.load(f)
+    return RISK_RULES
+
+
+COMPILED_RULES = compile_rules(load_rules())
+
+
+def extract_sentiment(research: Any) -> Optional[str]:
+    """
+    The researcher's explicit 'Sentiment Tag', or None without one. Sentiment words
+    elsewhere in the text ("not Volatile") are not a verdict; None lets the
+    sentiment_unknown rule escalate.
+    """
+    if not isinstance(research, str):
+        return None
+    match = _SENTIMENT_TAG_RE.search(research)
+    return match.group(1).capitalize() if match else None
+
+
+def _delta(spot: float, strike: float, days: float, iv: float, option_type: str) -> float:
+    """Black-Scholes delta as in greeks.calculate_greeks, with math.erf instead of scipy (~1 us)."""
+    t = days / 365.0
+    v = iv / 100.0
+    d1 = (math.log(spot / strike) + (R + 0.5 * v ** 2) * t) / (v * math.sqrt(t))
+    call_delta = 0.5 * (1.0 + math.erf(d1 / math.sqrt(2.0)))
+    return call_delta if option_type == "CE" else call_delta - 1
+
+
+def build_facts(order: Dict[str, Any], market_data: Dict[str, Any], research: Any) -> Dict[str, Any]:
+    """Flat facts the rules read; anything that cannot be derived is None."""
+    spot = market_data.get("spot_price")
+    iv = market_data.get("iv")
+    dte = market_data.get("days_to_expiry")
+    legs = order.get("legs", []) or []
+
+    facts: Dict[str, Any] = {
+        "RISK_MIN_IV": RISK_MIN_IV,
+        "RISK_MAX_MARGIN": RISK_MAX_MARGIN,
+        "RISK_MAX_NET_DELTA": RISK_MAX_NET_DELTA,
+        "strategy": order.get("strategy"),
+        "sentiment": extract_sentiment(research),
+        "spot": spot,
+        "iv": iv,
+        "dte": dte,
+        "legs": len(legs),
+        "short_call_strike": None,
+        "short_put_strike": None,
+        "max_strike_distance_pct": None,
+        "short_strike_distance_pct": None,
+        "net_delta": None,
+        "abs_net_delta": None,
+        "margin_estimate": None,
+        "naked_short": None,
+    }
+    if not legs:
+        return facts
+
+    shorts = [leg for leg in legs if leg.get("action") == "SELL"]
+    longs = [leg for leg in legs if leg.get("action") == "BUY"]
+    for leg in shorts:
+        key = "short_call_strike" if leg.get("type") == "CE" else "short_put_strike"
+        facts[key] = leg.get("strike")
+    # Defined risk needs a long wing on each side that has a short
+    naked = any(not any(l.get("type") == s.get("type") for l in longs) for s in shorts)
+    facts["naked_short"] = naked
+
+    if not spot:
+        return facts
+    facts["max_strike_distance_pct"] = max(abs(leg["strike"] - spot) / spot * 100 for leg in legs)
+    if shorts:
+        facts["short_strike_distance_pct"] = min(abs(leg["strike"] - spot) / spot * 100 for leg in shorts)
+
+    if iv and dte is not None:
+        net_delta = 0.0
+        for leg in legs:
+            delta = _delta(spot, leg["strike"], max(dte, 1), iv, leg.get("type", "CE"))
+            net_delta += delta if leg.get("action") == "BUY" else -delta
+        facts["net_delta"] = net_delta
+        facts["abs_net_delta"] = abs(net_delta)
+
+    # Every short leg needs margin: a naked one NAKED_MARGIN_RATE of its notional, one
+    # hedged by a long wing on its side at most the wing width (its maximum loss)
+    margin = 0.0
+    for short in shorts:
+        quantity = short.get("quantity") or 0
+        naked_margin = spot * quantity * NAKED_MARGIN_RATE
+        wings = [abs(l["strike"] - short["strike"]) for l in longs if l.get("type") == short.get("type")]
+        margin += min(naked_margin, min(wings) * quantity) if wings else naked_margin
+    facts["margin_estimate"] = margin
+    return facts
+
+
+def evaluate_rules(facts: Dict[str, Any], compiled=None) -> Dict[str, Any]:
+    """
+    Runs the compiled rules over the facts.
+    Returns:
+        {decision: 'approved' | 'rejected' | 'inconclusive', reasons, fired, elapsed_us}
+    """
+    start = time.perf_counter()
+    rejections, escalations, fired = [], [], []
+    for rule_id, verdict, reason, predicates, reads in compiled or COMPILED_RULES:
+        missing = False
+        holds = True
+        for predicate in predicates:
+            result = predicate(facts)
+            if result is _MISSING:
+                missing = True
+            elif not result:
+                holds = False
+                break
+        if not holds:
+            continue
+        if missing:
+            # Could fire but a fact is unknown: only the LLM can judge it
+            absent = sorted({f for f in reads if facts.get(f) is None})
+            escalations.append(f"{rule_id}: missing {', '.join(absent)}")
+            fired.append(rule_id)
+            continue
+        fired.append(rule_id)
+        message = reason.format(**facts)
+        (rejections if verdict == "reject" else escalations).append(message)
+
+    if rejections:
+        decision, reasons = "rejected", rejections
+    elif escalations:
+        decision, reasons = "inconclusive", escalations
+    else:
+        decision, reasons = "approved", ["All risk rules passed"]
+    return {
+        "decision": decision,
+        "reasons": reasons,
+        "fired": fired,
+        "elapsed_us": (time.perf_counter() - start) * 1e6,
+    }
@@ -16,6 +16,9 @@ from main_graph import app
 from src.quant_engine.greeks import calculate_greeks
 from src.integration.kite_app import kite_client
 from src.integration.yfinance_client import fetch_nifty_spot, fetch_india_vix
+from src.integration.llm_client import stream_listener, run_async
+from src.observability.profiling import profile_run
+from src.integration.graph_checkpoints import run_config, arerun_with_override
 
 st.set_page_config(page_title="Agentic RAG Trader", layout="wide")
 
@@ -49,7 +52,14 @@ strategy_map = {
 }
 user_strategy = strategy_map[strategy_mode]
 
-if st.sidebar.button("Run Agent Simulation"):
+# Per-node CPU/memory profile of the next run (otherwise PROFILE_SAMPLE_RATE decides)
+profile_next_run = st.sidebar.checkbox("Profile run (CPU + memory)", value=False)
+
+run_clicked = st.sidebar.button("Run Agent Simulation")
+# Replays the last run from the strategist with the selected strategy (scan and research are reused)
+rerun_clicked = 'thread_id' in st.session_state and st.sidebar.button("Re-run Strategy Only")
+
+if run_clicked or rerun_clicked:
     with st.spinner("Agents are analyzing market data..."):
         # Construct Initial State
         initial_state = {
@@ -62,11 +72,37 @@ if st.sidebar.button("Run Agent Simulation"):
             "user_selected_strategy": user_strategy
         }
         
+        # Show each agent's answer and key fields as they stream in
+        live = st.empty()
+        streams = {}
+        
+        def on_stream_event(event):
+            agent = streams.setdefault(event["agent"], {"text": "", "fields": {}})
+            if event["type"] == "token":
+                agent["text"] += event["text"]
+            elif event["type"] == "field":
+                agent["fields"][event["field"]] = event["value"]
+            with live.container():
+                for name, data in streams.items():
+                    fields = ", ".join(f"{k}: `{v}`" for k, v in data["fields"].items())
+                    st.markdown(f"**{name}** {fields}")
+                    st.caption(data["text"][-500:])
+        
         # Run Graph
-        result = app.invoke(initial_state)
+        with stream_listener(on_stream_event), profile_run(force=True if profile_next_run else None) as profile:
+            if rerun_clicked:
+                result = run_async(arerun_with_override(app, st.session_state['thread_id'], user_strategy))
+            else:
+                config = run_config()
+                st.session_state['thread_id'] = config["configurable"]["thread_id"]
+                result = run_async(app.ainvoke(initial_state, config))
+        live.empty()
         
         # Store result in session state to persist across reruns
         st.session_state['result'] = result
+        st.session_state.pop('profile', None)
+        if profile:
+            st.session_state['profile'] = {"report": profile.report(), "artifacts": profile.export()}
         st.success("Simulation Complete!") # Added success message
         
 # Display Results
@@ -205,3 +241,17 @@ if 'result' in st.session_state:
             st.plotly_chart(fig, use_container_width=True)
         else:
             st.info("No legs to display payoff diagram.")
+
+    if 'profile' in st.session_state:
+        profile = st.session_state['profile']
+        with st.expander("Run Profile (CPU + memory per node)"):
+            rows = [{
+                "node": node,
+                "wall ms": round(data["wall_ms"], 1),
+                "sampled ms": round(data["sampled_ms"], 1),
+                "mem peak KB": round(data["mem_peak_kb"], 1) if data["mem_peak_kb"] is not None else None,
+                "hottest": data["top_self"][0][0] if data["top_self"] else "",
+            } for node, data in profile["report"]["nodes"].items()]
+            st.dataframe(pd.DataFrame(rows), use_container_width=True)
+            for name, path in profile["artifacts"].items():
+                st.caption(f"{name}: {path}")
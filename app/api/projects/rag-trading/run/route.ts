@@ -1,5 +1,5 @@
 import { NextResponse } from 'next/server';
-import { spawn } from 'child_process';
+import { spawn, ChildProcessWithoutNullStreams } from 'child_process';
 import path from 'path';
 
 export async function POST(req: Request) {
@@ -18,6 +18,8 @@ export async function POST(req: Request) {
         console.log(`📂 Project path: ${pythonProjectPath}`);
         console.log(`🐍 Python: ${pythonCmd}`);
 
+        const stream = Boolean(body.stream);
+
         // Call the Python main_graph.py script
         const pythonProcess = spawn(pythonCmd, [
             'main_graph.py'
@@ -25,10 +27,16 @@ export async function POST(req: Request) {
             cwd: pythonProjectPath,
             env: {
                 ...process.env,
-                USER_SELECTED_STRATEGY: strategyOverride || ''
+                USER_SELECTED_STRATEGY: strategyOverride || '',
+                // Streaming mode: Python prints live token/field events as __EVENT__ lines
+                LLM_STREAM_EVENTS: stream ? '1' : ''
             }
         });
 
+        if (stream) {
+            return streamRun(pythonProcess);
+        }
+
         let pythonOutput = '';
         let pythonError = '';
 
@@ -53,21 +61,7 @@ export async function POST(req: Request) {
 
                 if (code === 0) {
                     try {
-                        // Extract JSON from output (look for __JSON_START__)
-                        const startMarker = '__JSON_START__';
-                        const endMarker = '__JSON_END__';
-
-                        const startIndex = pythonOutput.indexOf(startMarker);
-                        const endIndex = pythonOutput.indexOf(endMarker);
-
-                        if (startIndex !== -1 && endIndex !== -1) {
-                            const jsonText = pythonOutput.substring(startIndex + startMarker.length, endIndex);
-                            const data = JSON.parse(jsonText);
-                            resolve(data);
-                        } else {
-                            console.log('Full Python output:', pythonOutput);
-                            reject(new Error('No JSON delimiters found in Python output'));
-                        }
+                        resolve(extractResult(pythonOutput));
                     } catch (e: any) {
                         console.error('JSON parse error:', e.message);
                         console.log('Output extraction failed. Raw:', pythonOutput.substring(0, 500));
@@ -90,65 +84,7 @@ export async function POST(req: Request) {
             }, 60000);
         });
 
-        // Transform Python output to UI format
-        const marketData = result.market_data || {};
-        const strategyDecision = result.strategy_decision || {};
-        const finalOrder = result.final_order || {};
-        const riskStatus = result.risk_status || 'unknown';
-        const riskAnalysis = result.risk_analysis || '';
-
-        // Build steps for UI
-        const steps = [
-            {
-                id: 1,
-                agent: "Market Scanner",
-                status: "completed",
-                message: `Fetched NIFTY Spot: ${marketData.spot_price?.toFixed(2) || 'N/A'}, India VIX: ${marketData.iv?.toFixed(2) || 'N/A'}%`
-            },
-            {
-                id: 2,
-                agent: "Market Researcher (Llama 3)",
-                status: "completed",
-                message: `${result.research_data || 'N/A'}`
-            },
-            {
-                id: 3,
-                agent: "Strategist (GPT-4 + RAG)",
-                status: "completed",
-                message: `Strategy: ${strategyDecision.strategy || 'N/A'}. Sigma: ${strategyDecision.recommended_sigma || 1.0}. ${strategyDecision.rationale || ''}`
-            },
-            {
-                id: 4,
-                agent: "Risk Manager (Llama 3)",
-                status: "completed",
-                message: `Risk: ${riskStatus}. ${riskAnalysis}`
-            }
-        ];
-
-        // Generate payoff data
-        const payoffData = generatePayoffData(finalOrder, marketData.spot_price || 22000);
-
-        return NextResponse.json({
-            success: true,
-            marketData: {
-                spotPrice: marketData.spot_price,
-                vix: marketData.iv,
-                trend: marketData.spot_price > 22000 ? 'BULLISH' : 'BEARISH'
-            },
-            steps,
-            finalDecision: {
-                strategy: finalOrder.strategy,
-                legs: finalOrder.legs || []
-            },
-            riskAnalysis: {
-                status: riskStatus,
-                details: riskAnalysis,
-                margin: 125000
-            },
-            payoffData,
-            llmAnalysis: strategyDecision.llm_analysis,
-            timestamp: new Date().toISOString()
-        });
+        return NextResponse.json(buildPayload(result));
 
     } catch (error: any) {
         console.error("❌ [RAG API] Error:", error);
@@ -159,6 +95,168 @@ export async function POST(req: Request) {
     }
 }
 
+// Helper: Extract the result JSON printed between the __JSON_START__/__JSON_END__ markers
+function extractResult(pythonOutput: string) {
+    const startMarker = '__JSON_START__';
+    const endMarker = '__JSON_END__';
+
+    const startIndex = pythonOutput.indexOf(startMarker);
+    const endIndex = pythonOutput.indexOf(endMarker);
+
+    if (startIndex === -1 || endIndex === -1) {
+        console.log('Full Python output:', pythonOutput);
+        throw new Error('No JSON delimiters found in Python output');
+    }
+    return JSON.parse(pythonOutput.substring(startIndex + startMarker.length, endIndex));
+}
+
+// Helper: Transform Python output to UI format
+function buildPayload(result: any) {
+    const marketData = result.market_data || {};
+    const strategyDecision = result.strategy_decision || {};
+    const finalOrder = result.final_order || {};
+    const riskStatus = result.risk_status || 'unknown';
+    const riskAnalysis = result.risk_analysis || '';
+
+    // Build steps for UI
+    const steps = [
+        {
+            id: 1,
+            agent: "Market Scanner",
+            status: "completed",
+            message: `Fetched NIFTY Spot: ${marketData.spot_price?.toFixed(2) || 'N/A'}, India VIX: ${marketData.iv?.toFixed(2) || 'N/A'}%`
+        },
+        {
+            id: 2,
+            agent: "Market Researcher (Llama 3)",
+            status: "completed",
+            message: `${result.research_data || 'N/A'}`
+        },
+        {
+            id: 3,
+            agent: "Strategist (GPT-4 + RAG)",
+            status: "completed",
+            message: `Strategy: ${strategyDecision.strategy || 'N/A'}. Sigma: ${strategyDecision.recommended_sigma || 1.0}. ${strategyDecision.rationale || ''}`
+        },
+        {
+            id: 4,
+            agent: "Risk Manager (Llama 3)",
+            status: "completed",
+            message: `Risk: ${riskStatus}. ${riskAnalysis}`
+        }
+    ];
+
+    // Generate payoff data
+    const payoffData = generatePayoffData(finalOrder, marketData.spot_price || 22000);
+
+    return {
+        success: true,
+        marketData: {
+            spotPrice: marketData.spot_price,
+            vix: marketData.iv,
+            trend: marketData.spot_price > 22000 ? 'BULLISH' : 'BEARISH'
+        },
+        steps,
+        finalDecision: {
+            strategy: finalOrder.strategy,
+            legs: finalOrder.legs || []
+        },
+        riskAnalysis: {
+            status: riskStatus,
+            details: riskAnalysis,
+            margin: 125000
+        },
+        payoffData,
+        llmAnalysis: strategyDecision.llm_analysis,
+        timestamp: new Date().toISOString()
+    };
+}
+
+// Helper: NDJSON stream of live agent events ({type: "token" | "field" | "done"}),
+// ending with {type: "result", ...payload} or {type: "error", error}
+function streamRun(pythonProcess: ChildProcessWithoutNullStreams) {
+    const encoder = new TextEncoder();
+    const eventMarker = '__EVENT__';
+
+    const body = new ReadableStream({
+        start(controller) {
+            let pythonOutput = '';
+            let pythonError = '';
+            let pending = '';
+            let closed = false;
+
+            const send = (message: any) => {
+                if (!closed) controller.enqueue(encoder.encode(JSON.stringify(message) + '\n'));
+            };
+            const finish = (message: any) => {
+                send(message);
+                if (!closed) {
+                    closed = true;
+                    clearTimeout(timer);
+                    controller.close();
+                }
+            };
+
+            pythonProcess.stdout.on('data', (data) => {
+                const output = data.toString();
+                pythonOutput += output;
+                pending += output;
+                const lines = pending.split('\n');
+                pending = lines.pop() || '';
+                for (const line of lines) {
+                    if (line.startsWith(eventMarker)) {
+                        try {
+                            send(JSON.parse(line.substring(eventMarker.length)));
+                        } catch {
+                            // Partial or malformed event line; the final result still follows
+                        }
+                    }
+                }
+            });
+
+            pythonProcess.stderr.on('data', (data) => {
+                const error = data.toString();
+                console.error('[Python Error]:', error);
+                pythonError += error;
+            });
+
+            pythonProcess.on('close', (code) => {
+                console.log(`Python process exited with code ${code}`);
+                if (code !== 0) {
+                    finish({ type: 'error', error: `Python exited with code ${code}. Error: ${pythonError}` });
+                    return;
+                }
+                try {
+                    finish({ type: 'result', ...buildPayload(extractResult(pythonOutput)) });
+                } catch (e: any) {
+                    finish({ type: 'error', error: e.message });
+                }
+            });
+
+            pythonProcess.on('error', (err: any) => {
+                console.error('Failed to start Python:', err);
+                finish({ type: 'error', error: err.message });
+            });
+
+            // Set timeout (60 seconds)
+            const timer = setTimeout(() => {
+                pythonProcess.kill();
+                finish({ type: 'error', error: 'Python execution timeout after 60s' });
+            }, 60000);
+        },
+        cancel() {
+            pythonProcess.kill();
+        }
+    });
+
+    return new Response(body, {
+        headers: {
+            'Content-Type': 'application/x-ndjson; charset=utf-8',
+            'Cache-Control': 'no-cache'
+        }
+    });
+}
+
 // Helper: Generate payoff data
 function generatePayoffData(order: any, spotPrice: number) {
     const legs = order?.legs || [];